@@ -1,5 +1,6 @@
 import os
 import logging
+import click
 from flask import Flask, redirect, url_for, render_template, session, flash, make_response
 from dotenv import load_dotenv
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
@@ -50,7 +51,22 @@ def create_app(testing=False):
             MAIL_USE_TLS=True,
             MAIL_USERNAME=os.getenv('MAIL_USERNAME'),
             MAIL_PASSWORD=os.getenv('MAIL_PASSWORD'),
-            SECRET_KEY=os.getenv('FLASK_SECRET_KEY', 'clave_de_desarrollo')
+            SECRET_KEY=os.getenv('FLASK_SECRET_KEY', 'clave_de_desarrollo'),
+            IDEMPOTENCIA_TTL=int(os.getenv('IDEMPOTENCIA_TTL', 24 * 60 * 60)),
+            IDEMPOTENCIA_BLOQUEO=int(os.getenv('IDEMPOTENCIA_BLOQUEO', 120)),
+            PDF_CACHE_DIR=os.getenv('PDF_CACHE_DIR'),
+            PDF_CACHE_MAX_BYTES=int(os.getenv('PDF_CACHE_MAX_BYTES', 512 * 1024 * 1024)),
+            PDF_CACHE_INTERVALO_BARRIDO=int(os.getenv('PDF_CACHE_INTERVALO_BARRIDO', 300)),
+            PDF_POOL_PROCESOS=int(os.getenv('PDF_POOL_PROCESOS', 2)),
+            PDF_POOL_MAX_PENDIENTES=int(os.getenv('PDF_POOL_MAX_PENDIENTES', 16)),
+            PDF_POOL_TIMEOUT=float(os.getenv('PDF_POOL_TIMEOUT', 30)),
+            PDF_PREVIO=os.getenv('PDF_PREVIO', 'true').lower() == 'true',
+            DASHBOARD_CACHE_TTL=int(os.getenv('DASHBOARD_CACHE_TTL', 30)),
+            SSE_MAX_SUSCRIPTORES=int(os.getenv('SSE_MAX_SUSCRIPTORES', 8)),
+            CATALOGO_CACHE_TTL=int(os.getenv('CATALOGO_CACHE_TTL', 60)),
+            CATALOGO_VERSION_TTL=float(os.getenv('CATALOGO_VERSION_TTL', 5)),
+            CATALOGO_STOCK_SEGUNDOS=int(os.getenv('CATALOGO_STOCK_SEGUNDOS', 60)),
+            AUTOCOMPLETADO_MEMORIA_MB=int(os.getenv('AUTOCOMPLETADO_MEMORIA_MB', 256))
         )
 
     if os.getenv("FLASK_ENV") == "production":
@@ -241,12 +257,67 @@ def create_app(testing=False):
     app.register_blueprint(producto_bp, url_prefix='/api')
     app.register_blueprint(dashboard_ventas_bp)
 
+    if not testing:
+        # El barrido arranca con la primera petición de cada worker: los comandos
+        # de la CLI (relay-outbox, backfill-resumen-ventas, ...) también crean la app
+        from app.services.idempotencia import iniciar_barrido
+        intervalo_barrido = int(os.getenv('IDEMPOTENCIA_BARRIDO_SEGUNDOS', 300))
+
+        @app.before_request
+        def iniciar_barrido_idempotencia():
+            iniciar_barrido(app, intervalo=intervalo_barrido)
+
     @app.cli.command("create-db")
     def create_db():
         with app.app_context():
             db.create_all()
             print("✅ Base de datos creada correctamente.")
 
+    @app.cli.command("relay-outbox")
+    @click.option("--lote", default=100, show_default=True, help="Eventos publicados por lote.")
+    @click.option("--intervalo", default=1.0, show_default=True, help="Segundos de espera cuando no hay pendientes.")
+    @click.option("--una-vez", is_flag=True, help="Vaciar el outbox y terminar.")
+    def relay_outbox(lote, intervalo, una_vez):
+        from app.services.outbox import ejecutar_relay
+        from app.services.publicador import obtener_publicador
+        with app.app_context():
+            total = ejecutar_relay(obtener_publicador(), lote=lote, intervalo=intervalo, una_vez=una_vez)
+            print(f"✅ {total} eventos publicados desde el outbox.")
+
+    @app.cli.command("backfill-resumen-ventas")
+    @click.option("--lote", default=1000, show_default=True, help="Filas del resumen escritas por lote.")
+    def backfill_resumen_ventas(lote):
+        from app.services.resumen_ventas import reconstruir_resumen
+        with app.app_context():
+            total = reconstruir_resumen(lote=lote)
+            print(f"✅ Resumen de ventas reconstruido: {total} filas.")
+
+    @app.cli.command("reconstruir-busqueda")
+    def reconstruir_busqueda():
+        from app.services.busqueda import reconstruir_indice_busqueda
+        with app.app_context():
+            reconstruir_indice_busqueda()
+            print("✅ Índices de búsqueda de productos listos.")
+
+    @app.cli.command("exportar-ventas")
+    @click.option("--formato", type=click.Choice(["csv", "jsonl"]), default="csv", show_default=True)
+    @click.option("--desde", type=click.DateTime(formats=["%Y-%m-%d"]), help="Fecha local inicial (inclusive).")
+    @click.option("--hasta", type=click.DateTime(formats=["%Y-%m-%d"]), help="Fecha local final (inclusive).")
+    @click.option("--vendedor", "vendedor_id", type=int, help="Solo ventas de productos de este usuario.")
+    @click.option("--lote", default=1000, show_default=True, help="Filas leídas de la base por vez.")
+    @click.option("--salida", type=click.File("w", encoding="utf-8"), default="-", help="Archivo destino (por defecto stdout).")
+    def exportar_ventas_cli(formato, desde, hasta, vendedor_id, lote, salida):
+        from app.services.exportar_ventas import exportar_ventas
+        with app.app_context():
+            for parte in exportar_ventas(
+                formato,
+                desde.date() if desde else None,
+                hasta.date() if hasta else None,
+                vendedor_id,
+                lote=lote
+            ):
+                salida.write(parte)
+
     return app
 
 app = create_app()
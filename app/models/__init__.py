@@ -8,6 +8,11 @@ from .compra_producto import CompraProducto
 from .usuario import Usuario
 from .categoria import Categoria
 from .tipo_comprobante import TipoComprobante
+from .outbox import Outbox
+from .idempotencia import ClaveIdempotencia
+from .resumen_ventas import ResumenVentaHora
+from .estado_resumen_ventas import EstadoResumenVentas
+from .estado_catalogo import EstadoCatalogo
 
 __all__ = [
     "Producto",
@@ -15,5 +20,10 @@ __all__ = [
     "CompraProducto",
     "Usuario",
     "Categoria",
-    "TipoComprobante"
+    "TipoComprobante",
+    "Outbox",
+    "ClaveIdempotencia",
+    "ResumenVentaHora",
+    "EstadoResumenVentas",
+    "EstadoCatalogo"
 ]
@@ -0,0 +1,24 @@
+# Modelo EstadoCatalogo: versión del catálogo compartida por todos los procesos
+from datetime import datetime
+from sqlalchemy import BigInteger, DDL, event
+from app.extensions import db
+
+class EstadoCatalogo(db.Model):
+    __tablename__ = "estado_catalogo"
+
+    # Una sola fila (id = 1); sube con cada commit que escribe productos o categorías
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(BigInteger, nullable=False, default=0)
+    modificado_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Representación legible
+    def __repr__(self):
+        return f"<EstadoCatalogo version={self.version} modificado_en={self.modificado_en}>"
+
+
+# La fila se crea junto con la tabla (init_db.sql hace lo mismo en PostgreSQL)
+event.listen(
+    EstadoCatalogo.__table__,
+    "after_create",
+    DDL("INSERT INTO estado_catalogo (id, version, modificado_en) VALUES (1, 0, CURRENT_TIMESTAMP)")
+)
@@ -0,0 +1,32 @@
+# Modelo EstadoResumenVentas: desde cuándo resumen_ventas_hora tiene todas las ventas
+from sqlalchemy import DDL, event
+from app.extensions import db
+
+class EstadoResumenVentas(db.Model):
+    __tablename__ = "estado_resumen_ventas"
+
+    # Una sola fila (id = 1). El resumen incluye toda venta con fecha_venta >= completo_desde
+    # (UTC); NULL = todas, tras backfill-resumen-ventas
+    id = db.Column(db.Integer, primary_key=True)
+    completo_desde = db.Column(db.DateTime, nullable=True)
+
+    # Representación legible
+    def __repr__(self):
+        return f"<EstadoResumenVentas completo_desde={self.completo_desde}>"
+
+
+# La fila se crea junto con la tabla: desde ese momento registrar_lineas mantiene el resumen
+# (init_db.sql hace lo mismo en PostgreSQL)
+event.listen(
+    EstadoResumenVentas.__table__,
+    "after_create",
+    DDL("INSERT INTO estado_resumen_ventas (id, completo_desde) VALUES (1, CURRENT_TIMESTAMP)").execute_if(dialect="sqlite")
+)
+event.listen(
+    EstadoResumenVentas.__table__,
+    "after_create",
+    DDL(
+        "INSERT INTO estado_resumen_ventas (id, completo_desde) VALUES (1, now() AT TIME ZONE 'utc') "
+        "ON CONFLICT (id) DO NOTHING"
+    ).execute_if(dialect="postgresql")
+)
@@ -3,6 +3,10 @@ from app.extensions import db
 
 class HistorialVenta(db.Model):
     __tablename__ = "historial_ventas"
+    __table_args__ = (
+        # Paginación por cursor del historial de cada cliente (más recientes primero)
+        db.Index("ix_historial_ventas_cliente_fecha_id", "cliente_id", "fecha_venta", "id"),
+    )
 
     # Columnas principales
     id = db.Column(db.Integer, primary_key=True)
@@ -11,7 +15,7 @@ class HistorialVenta(db.Model):
     cantidad = db.Column(db.Integer, nullable=False)
     total_venta = db.Column(db.Float, nullable=False)
     tipo_comprobante_id = db.Column(db.Integer, db.ForeignKey("tipos_comprobante.id"))
-    fecha_venta = db.Column(db.DateTime, server_default=db.func.now())
+    fecha_venta = db.Column(db.DateTime, server_default=db.func.now(), index=True)
 
     # Relaciones
     cliente = db.relationship("Usuario", backref="historial_ventas")
@@ -0,0 +1,23 @@
+# Modelo ClaveIdempotencia: respuestas guardadas por cabecera Idempotency-Key
+from datetime import datetime
+from app.extensions import db
+
+class ClaveIdempotencia(db.Model):
+    __tablename__ = "claves_idempotencia"
+    __table_args__ = (db.UniqueConstraint("ambito", "clave", name="uq_idempotencia_ambito_clave"),)
+
+    # Columnas principales
+    id = db.Column(db.Integer, primary_key=True)
+    ambito = db.Column(db.String(120), nullable=False)  # endpoint + usuario
+    clave = db.Column(db.String(255), nullable=False)
+    hash_solicitud = db.Column(db.String(32), nullable=False)
+    estado_http = db.Column(db.Integer, nullable=True)  # None mientras se procesa
+    cuerpo = db.Column(db.LargeBinary, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    bloqueado_hasta = db.Column(db.DateTime, nullable=True)  # fin de la reserva mientras se procesa
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expira_en = db.Column(db.DateTime, nullable=False, index=True)
+
+    # Representación legible
+    def __repr__(self):
+        return f"<ClaveIdempotencia ambito={self.ambito} clave={self.clave} estado={self.estado_http}>"
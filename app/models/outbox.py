@@ -0,0 +1,36 @@
+# Modelo Outbox: eventos pendientes de publicar en RabbitMQ (patrón transactional outbox)
+import json
+from datetime import datetime
+from app.extensions import db
+
+class Outbox(db.Model):
+    __tablename__ = "outbox"
+
+    # Columnas principales
+    id = db.Column(db.Integer, primary_key=True)
+    cola = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    enviado_en = db.Column(db.DateTime, nullable=True, index=True)
+    intentos = db.Column(db.Integer, default=0, nullable=False)
+    ultimo_error = db.Column(db.Text, nullable=True)
+
+    # Contenido del mensaje como diccionario
+    @property
+    def mensaje(self):
+        return json.loads(self.payload)
+
+    # Conversión a diccionario
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "cola": self.cola,
+            "mensaje": self.mensaje,
+            "creado_en": self.creado_en.isoformat() if self.creado_en else None,
+            "enviado_en": self.enviado_en.isoformat() if self.enviado_en else None,
+            "intentos": self.intentos,
+        }
+
+    # Representación legible
+    def __repr__(self):
+        return f"<Outbox id={self.id} cola={self.cola} enviado={self.enviado_en is not None}>"
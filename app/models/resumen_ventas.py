@@ -0,0 +1,29 @@
+# Modelo ResumenVentaHora: historial_ventas acumulado por hora (UTC) y dimensión
+from app.extensions import db
+
+class ResumenVentaHora(db.Model):
+    __tablename__ = "resumen_ventas_hora"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "hora", "tipo_comprobante_id", "producto_id", "marca", "categoria_id",
+            name="uq_resumen_ventas_hora"
+        ),
+    )
+
+    # Clave: hora truncada + dimensiones (0 / "" cuando la venta no las tiene).
+    # Sin claves foráneas: los acumulados sobreviven al borrado de productos
+    id = db.Column(db.Integer, primary_key=True)
+    hora = db.Column(db.DateTime, nullable=False, index=True)
+    tipo_comprobante_id = db.Column(db.Integer, nullable=False, default=0)
+    producto_id = db.Column(db.Integer, nullable=False, default=0)
+    marca = db.Column(db.String(100), nullable=False, default="")
+    categoria_id = db.Column(db.Integer, nullable=False, default=0)
+
+    # Acumulados
+    monto = db.Column(db.Float, nullable=False, default=0)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ventas = db.Column(db.Integer, nullable=False, default=0)  # filas de historial_ventas
+
+    # Representación legible
+    def __repr__(self):
+        return f"<ResumenVentaHora hora={self.hora} producto_id={self.producto_id} monto={self.monto}>"
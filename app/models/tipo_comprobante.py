@@ -9,7 +9,7 @@ class TipoComprobante(db.Model):
     nombre = db.Column(db.String(20), unique=True, nullable=False)
 
     # Relaciones
-    compras = db.relationship('Compra', back_populates='tipo_comprobante', lazy='subquery')
+    compras = db.relationship('Compra', back_populates='tipo_comprobante', lazy='select')
 
     # Representación legible
     def __repr__(self):
@@ -1,4 +1,5 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, Response, stream_with_context, jsonify
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 from functools import wraps
@@ -6,6 +7,8 @@ from flask_mail import Message
 
 from app.extensions import db, mail
 from app.models.usuario import Usuario as UsuarioDB
+from app.services.exportar_comprobantes import generar_zip
+from app.services.exportar_ventas import FORMATOS, exportar_ventas
 
 bp_admin = Blueprint("bp_admin", __name__, url_prefix="/admin")
 
@@ -119,3 +122,50 @@ def cambiar_estado(id):
     db.session.commit()
     flash("Estado actualizado")
     return redirect(url_for("bp_admin.listar_clientes"))
+
+# Exportar comprobantes (PDF) de un rango de fechas en un ZIP
+@bp_admin.route("/comprobantes/exportar")
+@admin_required
+def exportar_comprobantes():
+    tipo = request.args.get("tipo", "").strip().lower() or None
+    try:
+        desde = datetime.strptime(request.args["desde"], "%Y-%m-%d").date()
+        hasta = datetime.strptime(request.args["hasta"], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return jsonify({"msg": "Parámetros desde/hasta requeridos (AAAA-MM-DD)"}), 400
+    if hasta < desde:
+        return jsonify({"msg": "La fecha hasta debe ser mayor o igual a desde"}), 400
+    if tipo not in (None, "boleta", "factura"):
+        return jsonify({"msg": "Tipo de comprobante inválido"}), 400
+
+    nombre = f"comprobantes_{tipo or 'todos'}_{desde}_{hasta}.zip"
+    return Response(
+        stream_with_context(generar_zip(desde, hasta, tipo)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={nombre}"}
+    )
+
+# Exportar historial de ventas (CSV o JSON Lines) con filtros de fecha y vendedor
+@bp_admin.route("/ventas/exportar")
+@admin_required
+def exportar_historial_ventas():
+    formato = request.args.get("formato", "csv").strip().lower()
+    if formato not in FORMATOS:
+        return jsonify({"msg": "Formato inválido, use csv o jsonl"}), 400
+    try:
+        desde = request.args.get("desde")
+        hasta = request.args.get("hasta")
+        desde = datetime.strptime(desde, "%Y-%m-%d").date() if desde else None
+        hasta = datetime.strptime(hasta, "%Y-%m-%d").date() if hasta else None
+        vendedor_id = int(request.args["vendedor_id"]) if request.args.get("vendedor_id") else None
+    except ValueError:
+        return jsonify({"msg": "Parámetros inválidos: fechas AAAA-MM-DD y vendedor_id numérico"}), 400
+    if desde and hasta and hasta < desde:
+        return jsonify({"msg": "La fecha hasta debe ser mayor o igual a desde"}), 400
+
+    nombre = f"ventas_{desde or 'inicio'}_{hasta or 'hoy'}.{formato}"
+    return Response(
+        stream_with_context(exportar_ventas(formato, desde, hasta, vendedor_id)),
+        mimetype=FORMATOS[formato],
+        headers={"Content-Disposition": f"attachment; filename={nombre}"}
+    )
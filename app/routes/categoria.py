@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, abort
 from flask_login import login_required, current_user
 from app.extensions import db
 from app.models.categoria import Categoria
+from app.services.catalogo import respuesta_condicional
 
 bp_categoria = Blueprint("bp_categoria", __name__, url_prefix="/categorias")
 
@@ -46,6 +47,7 @@ def borrar_categoria(id):
 
 # Listar todas las categorías (público)
 @bp_categoria.route("/", methods=["GET"])
+@respuesta_condicional
 def listar_categorias():
     categorias = Categoria.query.all()
     return jsonify([c.to_dict() for c in categorias])
@@ -4,7 +4,9 @@ from functools import wraps
 from flask_mail import Message
 from app.extensions import db, mail
 from app.models.producto import Producto
-from app.models.historial_ventas import HistorialVenta
+from app.services.catalogo import respuesta_condicional
+from app.services.historial import pagina_historial
+from app.services.paginacion import CursorInvalido, leer_limite
 # from app.models.cliente import Cliente  # Descomenta si tienes el modelo
 
 bp_cliente = Blueprint("bp_cliente", __name__, url_prefix="/cliente")
@@ -76,18 +78,32 @@ def borrar_producto(id):
 @bp_cliente.route("/ventas", methods=["GET"])
 @cliente_required
 def mi_historial_ventas():
-    ventas = HistorialVenta.query.filter_by(cliente_id=current_user.id).all()
-    return jsonify([{
+    try:
+        limite = leer_limite(request.args.get("limite"))
+        ventas, siguiente_cursor = pagina_historial(current_user.id, limite, request.args.get("cursor"))
+    except CursorInvalido:
+        return jsonify({"msg": "Cursor de paginación inválido"}), 400
+    except ValueError:
+        return jsonify({"msg": "El límite debe ser un número entero"}), 400
+
+    # El cuerpo sigue siendo una lista; la página siguiente va en las cabeceras
+    response = jsonify([{
         "id": v.id,
         "producto_id": v.producto_id,
         "cantidad": v.cantidad,
         "total_venta": v.total_venta,
         "fecha": v.fecha_venta.isoformat()
-    } for v in ventas]), 200
+    } for v in ventas])
+    if siguiente_cursor:
+        siguiente_url = url_for("bp_cliente.mi_historial_ventas", cursor=siguiente_cursor, limite=limite, _external=True)
+        response.headers["Link"] = f'<{siguiente_url}>; rel="next"'
+        response.headers["X-Siguiente-Cursor"] = siguiente_cursor
+    return response, 200
 
 
 #Prueba locust 
 @bp_cliente.route("/test/productos_clientes", methods=["GET"])
+@respuesta_condicional
 def listar_productos_clientes_test():
     productos = Producto.query.limit(50).all()
     return jsonify([
@@ -1,21 +1,27 @@
 import json
-import os
-import pika
-from flask import Blueprint, request, jsonify, session, render_template, url_for, make_response
+from collections import defaultdict
+from flask import Blueprint, request, jsonify, session, render_template, make_response, current_app
 from flask_login import login_required, current_user
-from weasyprint import HTML
 from app.extensions import db
 from app.models.compra import Compra
-from app.models.compra_producto import CompraProducto
-from app.models.historial_ventas import HistorialVenta
 from app.models.producto import Producto
 from app.models.usuario import Usuario
 from app.models.tipo_comprobante import TipoComprobante
+from app.services.compra import registrar_lineas
+from app.services.comprobantes import (
+    clave_pdf, esperar_pdf_pendiente, generar_pdf, opciones_comprobante, plantilla_pdf
+)
+from app.services.idempotencia import idempotente
+from app.services.outbox import encolar_evento
+from app.services.pdf_pool import ColaPDFLlena, TiempoAgotadoPDF
+from app.services.publicador import COLAS_COMPROBANTE
+from app.services.stock import cargar_productos, reservar_stock
 
 compra_bp = Blueprint("compra", __name__)
 
 @compra_bp.route("/comprar", methods=["POST"])
 @login_required
+@idempotente
 def comprar():
     print("---- Inicio de compra ----")
     try:
@@ -56,13 +62,16 @@ def comprar():
             except json.JSONDecodeError as e:
                 return jsonify({"msg": "Formato del estante virtual inválido", "error": str(e)}), 400
         elif isinstance(items, dict):
-            items = [items]
+            # El estante virtual se guarda como {producto_id: cantidad}
+            if "producto_id" in items:
+                items = [items]
+            else:
+                items = [{"producto_id": pid, "cantidad": cantidad} for pid, cantidad in items.items()]
 
         if not items or not isinstance(items, list):
             return jsonify({"msg": "El estante virtual está vacío o tiene formato inválido"}), 400
 
-        converted_items = []
-        total = 0
+        lineas = []
 
         for item in items:
             if not isinstance(item, dict):
@@ -81,13 +90,27 @@ def comprar():
             except (ValueError, TypeError):
                 return jsonify({"msg": "producto_id o cantidad no numéricos"}), 400
 
-            prod = Producto.query.get(producto_id)
+            lineas.append((producto_id, cantidad))
+
+        # Una sola consulta (con bloqueo de filas en PostgreSQL) para todo el carrito
+        productos = cargar_productos(pid for pid, _ in lineas)
+
+        solicitado = defaultdict(int)
+        for producto_id, cantidad in lineas:
+            solicitado[producto_id] += cantidad
+
+        for producto_id, cantidad in solicitado.items():
+            prod = productos.get(producto_id)
             if not prod:
                 return jsonify({"msg": f"Producto {producto_id} no existe"}), 400
-
             if prod.stock < cantidad:
                 return jsonify({"msg": f"Stock insuficiente para producto {producto_id}"}), 400
 
+        converted_items = []
+        total = 0
+
+        for producto_id, cantidad in lineas:
+            prod = productos[producto_id]
             total += prod.precio * cantidad
 
             converted_items.append({
@@ -107,51 +130,22 @@ def comprar():
             dni=dni if tipo_nombre == "boleta" else None  
         )
 
-        db.session.add(compra)
-        db.session.flush()  # Para obtener compra.id sin commit
-
-        for item in converted_items:
-            prod = item["producto"]
-            prod.stock -= item["cantidad"]
-
-            compra_producto = CompraProducto(
-                compra_id=compra.id,
-                producto_id=prod.id,
-                cantidad=item["cantidad"]
-            )
-            db.session.add(compra_producto)
-
-            historial = HistorialVenta(
-                cliente_id=cliente_id,
-                producto_id=prod.id,
-                cantidad=item["cantidad"],
-                total_venta=prod.precio * item["cantidad"],
-                tipo_comprobante_id=tipo_comprobante_id
-            )
-            db.session.add(historial)
-
-        session.pop("carrito", None)
-        db.session.commit()
+        fallidos = reservar_stock(solicitado)
+        if fallidos:
+            db.session.rollback()
+            return jsonify({"msg": f"Stock insuficiente para producto {fallidos[0]}", "productos": fallidos}), 400
 
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error procesando la compra: {e}")
-        return jsonify({"msg": "Error procesando la compra", "error": str(e)}), 500
+        db.session.add(compra)
+        db.session.flush()  # INSERT ... RETURNING id en PostgreSQL
 
-    try:
-        rabbit_host = os.getenv("RABBITMQ_HOST", "rabbitmq")
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(
-                host=rabbit_host,
-                port=5672,
-                credentials=pika.PlainCredentials("guest", "guest")
-            )
+        registrar_lineas(
+            compra,
+            [(item["producto"], item["cantidad"]) for item in converted_items],
+            cliente_id,
+            tipo_comprobante_id
         )
-        channel = connection.channel()
-
-        queue_name = "cola_boletas" if tipo_nombre == "boleta" else "cola_facturas"
-        channel.queue_declare(queue=queue_name, durable=True)
 
+        # El mensaje del comprobante se publica desde el outbox (flask relay-outbox)
         msg = {
             "compra_id": compra.id,
             "tipo_comprobante": tipo_nombre,
@@ -162,18 +156,15 @@ def comprar():
             msg["ruc"] = ruc
         if tipo_nombre == "boleta":
             msg["dni"] = dni
+        encolar_evento(COLAS_COMPROBANTE[tipo_nombre], msg)
 
-        channel.basic_publish(
-            exchange="",
-            routing_key=queue_name,
-            body=json.dumps(msg),
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
-        connection.close()
+        session.pop("carrito", None)
+        db.session.commit()
 
     except Exception as e:
-        print(f"[PUBLISH] Error enviando a RabbitMQ: {e}")
-        return "Compra guardada, pero falló el envío a la cola", 202
+        db.session.rollback()
+        print(f"Error procesando la compra: {e}")
+        return jsonify({"msg": "Error procesando la compra", "error": str(e)}), 500
 
     return "✅COMPRA CONFIRMADA CORRECTAMENTE", 200
 
@@ -181,21 +172,38 @@ def comprar():
 @compra_bp.route("/compra/<int:id>/pdf")
 @login_required
 def compra_pdf(id):
-    compra = Compra.query.get_or_404(id)
-    plantilla = 'factura_pdf.html' if compra.tipo_comprobante and compra.tipo_comprobante.nombre.lower() == 'factura' else 'boleta_pdf.html'
-    html = render_template(plantilla, compra=compra)
-    pdf = HTML(string=html, base_url=url_for('static', filename='', _external=True)).write_pdf()
+    compra = Compra.query.options(*opciones_comprobante()).get_or_404(id)
+    plantilla = plantilla_pdf(compra)
+
+    # Una compra no cambia: el PDF se identifica por (id, versión de plantilla)
+    etag = clave_pdf(compra)
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        return response
+
+    # Si se está generando tras la compra, se espera en lugar de renderizar dos veces
+    esperar_pdf_pendiente(compra.id, timeout=current_app.config.get("PDF_POOL_TIMEOUT", 30))
+    try:
+        pdf = generar_pdf(compra)
+    except (ColaPDFLlena, TiempoAgotadoPDF) as e:
+        response = jsonify({"msg": "El servicio de PDFs está ocupado, intente nuevamente", "error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
     response = make_response(pdf)
     response.headers['Content-Type'] = 'application/pdf'
     response.headers['Content-Disposition'] = f'inline; filename={plantilla.replace("_pdf.html", "")}_{id}.pdf'
+    response.headers['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    response.set_etag(etag)
     return response
 
 
 @compra_bp.route("/detalle/<int:compra_id>")
 @login_required
 def detalle_compra(compra_id):
-    compra = Compra.query.get_or_404(compra_id)
-    productos = CompraProducto.query.filter_by(compra_id=compra.id).all()
+    compra = Compra.query.options(*opciones_comprobante()).get_or_404(compra_id)
+    productos = compra.productos
 
     if compra.tipo_comprobante and compra.tipo_comprobante.nombre.lower() == "factura":
         plantilla = "facturas.html"
@@ -206,6 +214,7 @@ def detalle_compra(compra_id):
 
 
 @compra_bp.route("/test/compra", methods=["POST"])
+@idempotente
 def compra_test_publica():
     try:
         data = request.get_json()
@@ -249,26 +258,15 @@ def compra_test_publica():
             email_destino=email_destino,
             dni=dni
         )
+        if reservar_stock({producto.id: cantidad}):
+            db.session.rollback()
+            return jsonify({"msg": f"Stock insuficiente para producto {producto.id}"}), 400
+
         db.session.add(compra)
         db.session.flush()
 
         # Asociar producto
-        producto.stock -= cantidad
-        compra_producto = CompraProducto(
-            compra_id=compra.id,
-            producto_id=producto.id,
-            cantidad=cantidad
-        )
-        historial = HistorialVenta(
-            cliente_id=cliente_id,
-            producto_id=producto.id,
-            cantidad=cantidad,
-            total_venta=total,
-            tipo_comprobante_id=tipo_comprobante.id
-        )
-
-        db.session.add(compra_producto)
-        db.session.add(historial)
+        registrar_lineas(compra, [(producto, cantidad)], cliente_id, tipo_comprobante.id)
         db.session.commit()
 
         return jsonify({"msg": "✅ Compra de prueba registrada", "compra_id": compra.id}), 200
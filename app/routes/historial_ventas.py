@@ -1,11 +1,20 @@
-from flask import Blueprint, request, render_template, jsonify
+from flask import Blueprint, Response, request, render_template, jsonify
 from flask_login import login_required, current_user
-from app.models.historial_ventas import HistorialVenta
 from app.models.usuario import Usuario
+from app.models.tipo_comprobante import TipoComprobante
 from collections import defaultdict, Counter
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.extensions import db
-import pytz
+from app.services.cache_dashboard import obtener_cache_dashboard, obtener_cache_series
+from app.services.eventos_ventas import DemasiadosSuscriptores, formato_sse, obtener_difusor
+from app.services.notificaciones import iniciar_escucha
+from app.services.fechas import ZONA_LOCAL, ahora_local, inicio_dia
+from app.services.paginacion import CursorInvalido, leer_limite
+from app.services.historial import pagina_historial
+from app.services.resumen_ventas import (
+    DIMENSIONES, serie_densa, serie_ventas, totales_por_comprobante, totales_por_dimension
+)
+from app.services.ventas_agregadas import GRANULARIDADES, cantidad_buckets, ventana_agrupacion
 import logging
 
 
@@ -31,81 +40,83 @@ def mostrar_historial_ventas():
         logger.warning(f"[mostrar_historial_ventas] Usuario {usuario.id} inactivo intentó acceder")
         return jsonify({"msg": "Usuario inactivo"}), 403
 
-    historial = HistorialVenta.query.filter_by(cliente_id=usuario.id).all()
+    cursor = request.args.get("cursor")
+    try:
+        limite = leer_limite(request.args.get("limite"))
+        historial, siguiente_cursor = pagina_historial(usuario.id, limite, cursor)
+    except CursorInvalido:
+        return jsonify({"msg": "Cursor de paginación inválido"}), 400
+    except ValueError:
+        return jsonify({"msg": "El límite debe ser un número entero"}), 400
     logger.info(f"[mostrar_historial_ventas] Usuario {usuario.id} visualiza {len(historial)} ventas")
 
-    return render_template("historial_ventas.html", historial=historial)
+    return render_template(
+        "historial_ventas.html",
+        historial=historial,
+        siguiente_cursor=siguiente_cursor,
+        es_primera_pagina=not cursor,
+        limite=limite
+    )
+
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def _semana_del_mes(dia):
+    if dia <= 7:
+        return 'Semana 1'
+    elif dia <= 14:
+        return 'Semana 2'
+    elif dia <= 21:
+        return 'Semana 3'
+    return 'Semana 4'
 
 
 @dashboard_ventas_bp.route('/dashboard_ventas')
 @login_required
 def dashboard_ventas():
     agrupacion = request.args.get('agrupacion', 'dia')
-    ventas = db.session.query(HistorialVenta).all()
     filtro = request.args.get('filtro', 'tipo_comprobante')
 
-    datos_agrupados = defaultdict(float)
-    etiquetas = []
+    ahora = ahora_local()
+    datos = obtener_cache_dashboard().obtener(
+        ('dashboard_ventas', agrupacion, filtro, ahora.date()),
+        lambda: _datos_dashboard(agrupacion, filtro, ahora)
+    )
+    return render_template('dashboard_ventas.html', **datos)
 
-    zona_local = pytz.timezone('America/Lima')
-    hoy = datetime.now(zona_local)
 
-    if agrupacion == 'dia':
-        etiquetas = [f'{hora:02d}:00' for hora in range(24)]
-        for venta in ventas:
-            fecha_local = venta.fecha_venta.astimezone(zona_local)
-            if fecha_local.date() == hoy.date():
-                hora = fecha_local.hour
-                datos_agrupados[f'{hora:02d}:00'] += venta.total_venta  
-
-    elif agrupacion == 'semana':
-        dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        etiquetas = dias_semana
-        for venta in ventas:
-            fecha_local = venta.fecha_venta.astimezone(zona_local)
-            if (hoy - fecha_local).days < 7:
-                nombre_dia = fecha_local.strftime('%A')
-                traducciones = {
-                    'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles',
-                    'Thursday': 'Jueves', 'Friday': 'Viernes',
-                    'Saturday': 'Sábado', 'Sunday': 'Domingo'
-                }
-                nombre_dia = traducciones.get(nombre_dia, nombre_dia)
-                datos_agrupados[nombre_dia] += venta.total_venta  
+def _datos_dashboard(agrupacion, filtro, ahora):
+    # Se lee el resumen horario de la ventana visible, no las ventas individuales
+    inicio, fin, granularidad = ventana_agrupacion(agrupacion, ahora)
+    serie = serie_ventas(inicio, fin, granularidad)
 
+    datos_agrupados = defaultdict(float)
+    etiquetas = []
+
+    if agrupacion == 'semana':
+        etiquetas = DIAS_SEMANA
+        for bucket, monto, _, _ in serie:
+            datos_agrupados[DIAS_SEMANA[bucket.weekday()]] += monto
     elif agrupacion == 'mes':
         etiquetas = ['Semana 1', 'Semana 2', 'Semana 3', 'Semana 4']
-        for venta in ventas:
-            fecha_local = venta.fecha_venta.astimezone(zona_local)
-            if fecha_local.month == hoy.month and fecha_local.year == hoy.year:
-                dia = fecha_local.day
-                if dia <= 7:
-                    semana = 'Semana 1'
-                elif dia <= 14:
-                    semana = 'Semana 2'
-                elif dia <= 21:
-                    semana = 'Semana 3'
-                else:
-                    semana = 'Semana 4'
-                datos_agrupados[semana] += venta.total_venta  
+        for bucket, monto, _, _ in serie:
+            datos_agrupados[_semana_del_mes(bucket.day)] += monto
+    else:
+        etiquetas = [f'{hora:02d}:00' for hora in range(24)]
+        for bucket, monto, _, _ in serie:
+            datos_agrupados[f'{bucket.hour:02d}:00'] += monto
 
     montos = [round(datos_agrupados.get(etiqueta, 0), 2) for etiqueta in etiquetas]
 
     # Gráficos de comprobantes
-    comprobantes_montos = defaultdict(float)
-    comprobantes_conteo = Counter()
+    comprobantes = totales_por_comprobante(inicio, fin)
 
-    for venta in ventas:
-        if hasattr(venta, "tipo_comprobante") and venta.tipo_comprobante:
-            nombre = venta.tipo_comprobante.nombre
-            comprobantes_montos[nombre] += venta.total_venta
-            comprobantes_conteo[nombre] += 1
+    nombres_comprobantes = [nombre for nombre, _, _ in comprobantes]
+    totales_comprobantes = [monto for _, monto, _ in comprobantes]
 
-    nombres_comprobantes = list(comprobantes_montos.keys())
-    totales_comprobantes = list(comprobantes_montos.values())
-
-    nombres_conteo = list(comprobantes_conteo.keys())
-    valores_conteo = list(comprobantes_conteo.values())
+    nombres_conteo = nombres_comprobantes
+    valores_conteo = [ventas for _, _, ventas in comprobantes]
     total_conteos = sum(valores_conteo) or 1
     conteos = [round((v / total_conteos) * 100, 2) for v in valores_conteo]
 
@@ -113,34 +124,24 @@ def dashboard_ventas():
     agrupaciones_montos = defaultdict(float)
     agrupaciones_conteo = Counter()
 
-    for venta in ventas:
-        key = None
-
-        if filtro == 'tipo_comprobante' and hasattr(venta, 'tipo_comprobante') and venta.tipo_comprobante:
-            key = venta.tipo_comprobante.nombre
-            if key:
-                agrupaciones_montos[key] += venta.total_venta
-                agrupaciones_conteo[key] += 1
-        elif filtro == 'producto' and hasattr(venta, 'producto') and venta.producto:
-            key = venta.producto.nombre
-        elif filtro == 'marca' and hasattr(venta, 'producto') and venta.producto and venta.producto.marca:
-            key = venta.producto.marca
-        elif filtro == 'categoria' and hasattr(venta, 'producto') and venta.producto and venta.producto.categoria:
-            key = venta.producto.categoria.nombre
-
-        if key and filtro != 'tipo_comprobante':
-            agrupaciones_montos[key] += venta.total_venta
-            agrupaciones_conteo[key] += venta.cantidad
+    if filtro == 'tipo_comprobante':
+        for nombre, monto, ventas in comprobantes:
+            agrupaciones_montos[nombre] += monto
+            agrupaciones_conteo[nombre] += ventas
+    elif filtro in DIMENSIONES:
+        for nombre, monto, cantidad in totales_por_dimension(inicio, fin, filtro):
+            agrupaciones_montos[nombre] += monto
+            agrupaciones_conteo[nombre] += cantidad
 
     nombres_grafico = list(agrupaciones_montos.keys())
     montos_grafico = list(agrupaciones_montos.values())
-    valores_conteo_grafico = list(agrupaciones_conteo.values())
+    valores_conteo_grafico = [agrupaciones_conteo[nombre] for nombre in nombres_grafico]
     total_conteo_grafico = sum(valores_conteo_grafico) or 1
     porcentajes_grafico = [round((v / total_conteo_grafico) * 100, 2) for v in valores_conteo_grafico]
     cantidades_grafico = valores_conteo_grafico 
 
-    return render_template(
-        'dashboard_ventas.html',
+    return dict(
+        hoy=ahora.date().isoformat(),
         fechas=etiquetas,
         montos=montos,
         nombres_comprobantes=nombres_comprobantes,
@@ -156,28 +157,129 @@ def dashboard_ventas():
     )
 
 
+INTERVALO_PING = 15
+
+
+# Ventas confirmadas en vivo (Server-Sent Events): el dashboard suma los deltas a sus gráficos
+@dashboard_ventas_bp.route('/dashboard_ventas/stream')
+@login_required
+def stream_dashboard_ventas():
+    nombres = {tipo.id: tipo.nombre for tipo in TipoComprobante.query.all()}
+    iniciar_escucha()
+    try:
+        suscripcion = obtener_difusor().suscribir()
+    except DemasiadosSuscriptores:
+        # Cada stream ocupa un hilo: sin este tope los dashboards abiertos dejarían sin hilos al resto
+        logger.warning("[stream_dashboard_ventas] Máximo de streams alcanzado en este worker")
+        response = jsonify({'msg': 'Demasiadas conexiones en vivo, intenta más tarde'})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    # El stream no vuelve a usar la base: liberar la conexión mientras dure
+    db.session.close()
+
+    def eventos():
+        with suscripcion:
+            yield "retry: 5000\n\n"
+            while True:
+                if suscripcion.desbordada:
+                    yield formato_sse("recargar", {})
+                    return
+                evento = suscripcion.siguiente(timeout=INTERVALO_PING)
+                if evento is None:
+                    yield ": ping\n\n"
+                    continue
+                evento = dict(evento, comprobante=nombres.get(evento["tipo_comprobante_id"]))
+                yield formato_sse("venta", evento)
+
+    return Response(eventos(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
 #Pruebas con locust
 @dashboard_ventas_bp.route('/api/dashboard/ventas')
 def api_dashboard_ventas():
-    from collections import defaultdict
-    from datetime import datetime
-    import pytz
-
-    zona_local = pytz.timezone('America/Lima')
-    hoy = datetime.now(zona_local)
-
-    ventas = HistorialVenta.query.all()
-    datos = defaultdict(float)
-
-    for venta in ventas:
-        fecha_local = venta.fecha_venta.astimezone(zona_local)
-        if fecha_local.date() == hoy.date():
-            hora = fecha_local.hour
-            datos[f'{hora:02d}:00'] += venta.total_venta
-
-    return jsonify({
-        "fechas": list(datos.keys()),
-        "montos": list(datos.values()),
-        "total_ventas": round(sum(datos.values()), 2),
-        "cantidad_ventas": len(ventas)
-    }), 200
+    ahora = ahora_local()
+    datos = obtener_cache_dashboard().obtener(
+        ('api_dashboard_ventas', 'dia', None, ahora.date()),
+        lambda: _datos_api_dashboard(ahora)
+    )
+    return jsonify(datos), 200
+
+
+def _datos_api_dashboard(ahora):
+    inicio, fin, granularidad = ventana_agrupacion('dia', ahora)
+    serie = serie_ventas(inicio, fin, granularidad)
+
+    fechas = [f'{bucket.hour:02d}:00' for bucket, _, _, _ in serie]
+    montos = [monto for _, monto, _, _ in serie]
+
+    return {
+        "fechas": fechas,
+        "montos": montos,
+        "total_ventas": round(sum(montos), 2),
+        "cantidad_ventas": sum(ventas for _, _, _, ventas in serie)
+    }
+
+
+# Aciertos/fallos de la caché del dashboard (monitoreo)
+@dashboard_ventas_bp.route('/api/dashboard/cache')
+def estadisticas_cache_dashboard():
+    return jsonify(obtener_cache_dashboard().estadisticas()), 200
+
+
+MAX_BUCKETS_SERIE = 50_000
+
+
+# Serie de ventas para cualquier rango y granularidad (hora local, buckets sin ventas en cero)
+@dashboard_ventas_bp.route('/api/dashboard/serie')
+@login_required
+def api_serie_ventas():
+    granularidad = request.args.get('granularidad', 'dia')
+    try:
+        desde = datetime.strptime(request.args["desde"], "%Y-%m-%d").date()
+        hasta = datetime.strptime(request.args["hasta"], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return jsonify({"msg": "Parámetros desde/hasta requeridos (AAAA-MM-DD)"}), 400
+    if hasta < desde:
+        return jsonify({"msg": "La fecha hasta debe ser mayor o igual a desde"}), 400
+    if granularidad not in GRANULARIDADES:
+        return jsonify({"msg": f"Granularidad inválida, use una de: {', '.join(GRANULARIDADES)}"}), 400
+
+    inicio, fin = inicio_dia(desde), inicio_dia(hasta + timedelta(days=1))
+    if cantidad_buckets(inicio, fin, granularidad) > MAX_BUCKETS_SERIE:
+        return jsonify({"msg": f"El rango supera {MAX_BUCKETS_SERIE} puntos; use una granularidad mayor"}), 400
+
+    # Un periodo que terminó antes de hoy ya no recibe ventas: se guarda sin vencimiento
+    cerrado = hasta < ahora_local().date()
+    cache = obtener_cache_series() if cerrado else obtener_cache_dashboard()
+    datos = cache.obtener(
+        ('api_serie_ventas', desde, hasta, granularidad),
+        lambda: _datos_serie(desde, hasta, granularidad)
+    )
+
+    response = jsonify(datos)
+    if cerrado:
+        response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response, 200
+
+
+def _datos_serie(desde, hasta, granularidad):
+    serie = serie_densa(inicio_dia(desde), inicio_dia(hasta + timedelta(days=1)), granularidad)
+    montos = [round(monto, 2) for _, monto, _, _ in serie]
+    ventas = [n for _, _, _, n in serie]
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "granularidad": granularidad,
+        "zona_horaria": ZONA_LOCAL.zone,
+        "fechas": [bucket.isoformat() for bucket, _, _, _ in serie],
+        "montos": montos,
+        "cantidades": [cantidad for _, _, cantidad, _ in serie],
+        "ventas": ventas,
+        "total_ventas": round(sum(montos), 2),
+        "cantidad_ventas": sum(ventas)
+    }
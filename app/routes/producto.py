@@ -9,6 +9,12 @@ from flask_login import login_required, current_user
 from app.models.producto import Producto
 from app.models.categoria import Categoria
 from app.extensions import db
+from app.services.autocompletado import obtener_indice
+from app.services.busqueda import buscar_productos
+from app.services.catalogo import productos_publicos, respuesta_condicional
+from app.services.facetas import facetas_productos
+from app.services.notificaciones import iniciar_escucha
+from app.services.paginacion import CursorInvalido, leer_limite
 
 producto_bp = Blueprint('producto', __name__)
 
@@ -317,40 +323,86 @@ def eliminar_producto_carrito(producto_id):
 @login_required
 @validate_active_cliente
 def filtro_productos():
-    query = db.session.query(Producto).join(Categoria)
-
-    nombre = request.args.get('nombre', '').strip()
-    marca = request.args.get('marca', '').strip()
-    categoria_texto = request.args.get('categoria', '').strip()
-    precio_min = request.args.get('precio_min', type=float)
-    precio_max = request.args.get('precio_max', type=float)
+    filtros = {
+        'nombre': request.args.get('nombre', '').strip(),
+        'marca': request.args.get('marca', '').strip(),
+        'categoria': request.args.get('categoria', '').strip(),
+        'precio_min': request.args.get('precio_min', type=float),
+        'precio_max': request.args.get('precio_max', type=float),
+    }
+    texto = request.args.get('q', '').strip()
     orden_stock = request.args.get('orden_stock')
+    cursor = request.args.get('cursor')
+
+    try:
+        limite = leer_limite(request.args.get('limite'))
+        productos, siguiente_cursor = buscar_productos(texto, filtros, orden_stock, limite, cursor)
+    except CursorInvalido:
+        return jsonify({'msg': 'Cursor de paginación inválido'}), 400
+    except ValueError:
+        return jsonify({'msg': 'El límite debe ser un número entero'}), 400
+
+    # Los enlaces de página y de facetas conservan la búsqueda y los filtros activos
+    parametros = {k: v for k, v in request.args.items() if k != 'cursor'}
+    # Las facetas vienen de la caché compartida: se copian al agregarles el enlace
+    conteos = facetas_productos(texto, filtros)
+    facetas = {
+        faceta: [
+            {**item, 'url': url_for('producto.filtro_productos', **{**parametros, faceta: item['valor']})}
+            for item in conteos[faceta]
+        ]
+        for faceta in ('categoria', 'marca')
+    }
+    facetas['precio'] = []
+    for item in conteos['precio']:
+        rango = {'precio_min': item['desde']}
+        if item['hasta'] is not None:
+            rango['precio_max'] = item['hasta'] - 0.01  # precios con 2 decimales; el tope es inclusivo
+        facetas['precio'].append({**item, 'url': url_for('producto.filtro_productos', **{**parametros, **rango})})
+
+    return render_template(
+        'mis_productos.html',
+        productos=productos,
+        facetas=facetas,
+        primera_url=url_for('producto.filtro_productos', **parametros) if cursor else None,
+        siguiente_url=url_for('producto.filtro_productos', cursor=siguiente_cursor, **parametros) if siguiente_cursor else None
+    )
 
-    if nombre:
-        query = query.filter(Producto.nombre.ilike(f'%{nombre}%'))
-    if marca:
-        query = query.filter(Producto.marca.ilike(f'%{marca}%'))
-    if categoria_texto:
-        query = query.filter(Categoria.nombre.ilike(f'%{categoria_texto}%'))
-    if precio_min is not None:
-        query = query.filter(Producto.precio >= precio_min)
-    if precio_max is not None:
-        query = query.filter(Producto.precio <= precio_max)
-
-    if orden_stock == 'asc':
-        query = query.order_by(Producto.stock.asc())
-    elif orden_stock == 'desc':
-        query = query.order_by(Producto.stock.desc())
-
-    productos = query.all()
-    return render_template('mis_productos.html', productos=productos)
 
 
+# Sugerencias para el buscador: se responden desde memoria, sin consultar la base
+@producto_bp.route('/productos/autocompletar', methods=['GET'])
+def autocompletar_productos():
+    prefijo = request.args.get('q', '')
+    try:
+        limite = leer_limite(request.args.get('limite'), por_defecto=10, maximo=20)
+    except ValueError:
+        return jsonify({'msg': 'El límite debe ser un número entero'}), 400
+
+    iniciar_escucha()
+    response = jsonify({'sugerencias': obtener_indice().buscar(prefijo, limite)})
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
 
 #Prueba con Locust 
 
 @producto_bp.route('/productos', methods=['GET'])
+@respuesta_condicional
 def api_productos_publicos():
-    productos = Producto.query.all()
-    resultado = [p.to_dict() for p in productos]
-    return jsonify(resultado), 200
+    cursor = request.args.get('cursor')
+    try:
+        limite = leer_limite(request.args.get('limite'))
+        cuerpo, siguiente_cursor = productos_publicos(limite, cursor)
+    except CursorInvalido:
+        return jsonify({'msg': 'Cursor de paginación inválido'}), 400
+    except ValueError:
+        return jsonify({'msg': 'El límite debe ser un número entero'}), 400
+
+    # El cuerpo sigue siendo una lista; la página siguiente va en las cabeceras
+    response = current_app.response_class(cuerpo, mimetype='application/json')
+    if siguiente_cursor:
+        siguiente_url = url_for('producto.api_productos_publicos', cursor=siguiente_cursor, limite=limite, _external=True)
+        response.headers['Link'] = f'<{siguiente_url}>; rel="next"'
+        response.headers['X-Siguiente-Cursor'] = siguiente_cursor
+    return response, 200
@@ -0,0 +1,326 @@
+# Autocompletado de nombres y marcas de productos con un índice de prefijos en memoria
+import json
+import logging
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models.producto import Producto
+from app.services.notificaciones import al_notificar, es_postgres, notificar
+
+logger = logging.getLogger("flask_backend")
+
+CANAL_POSTGRES = "autocompletado"
+MEMORIA_POR_DEFECTO_MB = 256   # ~200 mil productos con nombre y marca
+LARGO_CLAVE = 32            # nadie escribe más que esto antes de elegir una sugerencia
+MAX_PAYLOAD_NOTIFY = 7000   # NOTIFY admite hasta 8000 bytes; si no cabe, se reconstruye
+TIPOS = ("nombre", "marca")
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: "Audífonos" y "audifonos" comparten clave."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+def claves(texto):
+    """Una clave por palabra: "Mouse gamer" se encuentra por "mou" y por "gam"."""
+    normal = " ".join(normalizar(texto).split())
+    inicios = [0] + [i + 1 for i, c in enumerate(normal) if c == " "]
+    return {normal[i:i + LARGO_CLAVE] for i in inicios if normal[i:]}
+
+
+class IndicePrefijos:
+    """Arreglo ordenado de (clave, tipo, texto) consultado con bisect.
+
+    Cada sugerencia guarda los id de los productos que la usan, así agregar y
+    quitar son idempotentes y la sugerencia desaparece con su último producto.
+    Mientras se reconstruye desde la base, los cambios que llegan se guardan
+    y se aplican al terminar, sobre la foto recién leída.
+
+    `max_bytes` es un presupuesto aproximado (sys.getsizeof); al alcanzarlo
+    las sugerencias nuevas se descartan hasta la próxima reconstrucción.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.obsoleto = True    # hay que (re)leer el catálogo antes de usarlo
+        self.descartadas = 0
+        self._lock = threading.Lock()
+        self._claves = []
+        self._productos = {}    # (tipo, texto) -> {producto_id}
+        self._bytes = 0
+        self._construyendo = False
+        self._pendientes = []
+
+    # ---------- Escritura ----------
+
+    def agregar(self, producto_id, nombre, marca):
+        with self._lock:
+            if self._construyendo:
+                self._pendientes.append(("+", producto_id, nombre, marca))
+                return
+            self._agregar(producto_id, nombre, marca, self._insertar_clave)
+
+    def quitar(self, producto_id, nombre, marca):
+        with self._lock:
+            if self._construyendo:
+                self._pendientes.append(("-", producto_id, nombre, marca))
+                return
+            self._quitar(producto_id, nombre, marca)
+
+    def _agregar(self, producto_id, nombre, marca, insertar):
+        for tipo, texto in zip(TIPOS, (nombre, marca)):
+            if not texto:
+                continue
+            sugerencia = (tipo, texto)
+            ids = self._productos.get(sugerencia)
+            if ids is None:
+                nuevas = [(clave, tipo, texto) for clave in claves(texto)]
+                costo = self._costo(texto, nuevas)
+                if self._bytes + costo > self.max_bytes:
+                    self.descartadas += 1
+                    continue
+                ids = self._productos[sugerencia] = set()
+                self._bytes += costo
+                for entrada in nuevas:
+                    insertar(entrada)
+            ids.add(producto_id)
+
+    def _quitar(self, producto_id, nombre, marca):
+        for tipo, texto in zip(TIPOS, (nombre, marca)):
+            sugerencia = (tipo, texto)
+            ids = self._productos.get(sugerencia)
+            if ids is None:
+                continue
+            ids.discard(producto_id)
+            if ids:
+                continue
+            del self._productos[sugerencia]
+            entradas = [(clave, tipo, texto) for clave in claves(texto)]
+            self._bytes -= self._costo(texto, entradas)
+            for entrada in entradas:
+                i = bisect_left(self._claves, entrada)
+                if i < len(self._claves) and self._claves[i] == entrada:
+                    del self._claves[i]
+
+    def _insertar_clave(self, entrada):
+        i = bisect_left(self._claves, entrada)
+        if i == len(self._claves) or self._claves[i] != entrada:
+            self._claves.insert(i, entrada)
+
+    @staticmethod
+    def _costo(texto, entradas):
+        # Entrada del arreglo + sugerencia en el diccionario + su conjunto de ids
+        return (
+            sum(sys.getsizeof(e) + sys.getsizeof(e[0]) + 8 for e in entradas)
+            + sys.getsizeof(texto) + sys.getsizeof(set()) + 100
+        )
+
+    def cargar(self, filas):
+        """Reemplaza el contenido con `filas` (id, nombre, marca) ordenando una sola vez."""
+        with self._lock:
+            self._construyendo = True
+            self._pendientes = []
+        nuevo = IndicePrefijos(self.max_bytes)
+        try:
+            entradas = []
+            for producto_id, nombre, marca in filas:
+                nuevo._agregar(producto_id, nombre, marca, entradas.append)
+            entradas.sort()
+        except Exception:
+            with self._lock:
+                self._terminar_construccion()
+            raise
+        with self._lock:
+            self._claves, self._productos = entradas, nuevo._productos
+            self._bytes, self.descartadas = nuevo._bytes, nuevo.descartadas
+            self._terminar_construccion()
+
+    def _terminar_construccion(self):
+        # Los cambios llegados durante la lectura se aplican sobre la foto nueva
+        self._construyendo = False
+        for operacion, *datos in self._pendientes:
+            if operacion == "+":
+                self._agregar(*datos, self._insertar_clave)
+            else:
+                self._quitar(*datos)
+        self._pendientes = []
+
+    # ---------- Lectura ----------
+
+    def buscar(self, prefijo, limite=10):
+        """Sugerencias cuyo nombre o marca tiene una palabra que empieza con `prefijo`."""
+        prefijo = " ".join(normalizar(prefijo).split())[:LARGO_CLAVE]
+        if not prefijo:
+            return []
+        sugerencias, vistas = [], set()
+        with self._lock:
+            i = bisect_left(self._claves, (prefijo,))
+            while i < len(self._claves) and len(sugerencias) < limite:
+                clave, tipo, texto = self._claves[i]
+                if not clave.startswith(prefijo):
+                    break
+                if (tipo, texto) not in vistas:
+                    vistas.add((tipo, texto))
+                    sugerencias.append({"texto": texto, "tipo": tipo})
+                i += 1
+        return sugerencias
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "claves": len(self._claves),
+                "sugerencias": len(self._productos),
+                "bytes_estimados": self._bytes,
+                "max_bytes": self.max_bytes,
+                "descartadas": self.descartadas,
+            }
+
+
+_lock_construccion = threading.Lock()
+
+
+def construir_indice(indice, lote=1000):
+    """Carga el catálogo completo en el índice si está marcado como obsoleto."""
+    with _lock_construccion:
+        if not indice.obsoleto:
+            return indice
+        # Se baja antes de leer: si otro aviso lo marca durante la lectura, se vuelve a construir
+        indice.obsoleto = False
+        try:
+            filas = db.session.query(Producto.id, Producto.nombre, Producto.marca).yield_per(lote)
+            indice.cargar(tuple(fila) for fila in filas)
+        except Exception:
+            indice.obsoleto = True
+            raise
+        finally:
+            db.session.commit()
+        logger.info(f"[autocompletado] Índice construido: {indice.estadisticas()}")
+    return indice
+
+
+def obtener_indice():
+    """Índice del proceso; se construye con la primera consulta y tras cambios masivos.
+
+    No se precarga en create_app: los comandos de la CLI (relay-outbox,
+    exportar-ventas, ...) también crean la app y no deben pagar la carga.
+    """
+    indice = current_app.extensions.get("autocompletado")
+    if indice is None:
+        megas = current_app.config.get("AUTOCOMPLETADO_MEMORIA_MB", MEMORIA_POR_DEFECTO_MB)
+        indice = current_app.extensions.setdefault("autocompletado", IndicePrefijos(megas * 1024 * 1024))
+    if indice.obsoleto:
+        construir_indice(indice)
+    return indice
+
+
+def _indice_existente():
+    try:
+        return current_app.extensions.get("autocompletado")
+    except RuntimeError:
+        return None
+
+
+# ---------- Actualización incremental: cambios confirmados de productos ----------
+
+@event.listens_for(Session, "after_flush")
+def registrar_cambios_autocompletado(session, flush_context):
+    cambios = []
+    for obj in session.new:
+        if isinstance(obj, Producto):
+            cambios.append(("+", obj.id, obj.nombre, obj.marca))
+    for obj in session.deleted:
+        if isinstance(obj, Producto):
+            cambios.append(("-", obj.id, obj.nombre, obj.marca))
+    for obj in session.dirty:
+        if not isinstance(obj, Producto):
+            continue
+        estado = inspect(obj).attrs
+        nombre, marca = estado.nombre.history, estado.marca.history
+        if nombre.has_changes() or marca.has_changes():
+            cambios.append((
+                "-", obj.id,
+                nombre.deleted[0] if nombre.deleted else obj.nombre,
+                marca.deleted[0] if marca.deleted else obj.marca,
+            ))
+            cambios.append(("+", obj.id, obj.nombre, obj.marca))
+    if cambios:
+        session.info.setdefault("autocompletado", []).extend(cambios)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def registrar_escritura_masiva(orm_execute_state):
+    # UPDATE/DELETE en bloque sobre productos: si puede tocar nombre o marca se reconstruye
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    tabla = getattr(orm_execute_state.statement, "table", None)
+    if getattr(tabla, "name", None) != Producto.__tablename__:
+        return
+    if orm_execute_state.is_update:
+        valores = getattr(orm_execute_state.statement, "_values", None)
+        columnas = {getattr(c, "key", c) for c in valores} if valores else None
+        if columnas is not None and not columnas & {"nombre", "marca"}:
+            return
+    orm_execute_state.session.info["autocompletado_reconstruir"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def notificar_cambios_autocompletado(session):
+    # En PostgreSQL todos los procesos (incluido este) aplican los cambios al recibir NOTIFY
+    if not es_postgres(session):
+        return
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    cambios = session.info.pop("autocompletado", None)
+    reconstruir = session.info.pop("autocompletado_reconstruir", False)
+    if not cambios and not reconstruir:
+        return
+    payload = "" if reconstruir else json.dumps(cambios)
+    notificar(session, CANAL_POSTGRES, payload if len(payload) <= MAX_PAYLOAD_NOTIFY else "")
+
+
+@event.listens_for(Session, "after_commit")
+def aplicar_cambios_autocompletado(session):
+    # Sin NOTIFY (SQLite) solo se actualiza el índice de este proceso
+    cambios = session.info.pop("autocompletado", None)
+    reconstruir = session.info.pop("autocompletado_reconstruir", False)
+    indice = _indice_existente()
+    if indice is None:
+        return
+    if reconstruir:
+        indice.obsoleto = True  # la próxima consulta relee el catálogo
+    elif cambios:
+        aplicar(indice, cambios)
+
+
+@event.listens_for(Session, "after_rollback")
+def descartar_cambios_autocompletado(session):
+    session.info.pop("autocompletado", None)
+    session.info.pop("autocompletado_reconstruir", None)
+
+
+def aplicar(indice, cambios):
+    for operacion, producto_id, nombre, marca in cambios:
+        if operacion == "+":
+            indice.agregar(producto_id, nombre, marca)
+        else:
+            indice.quitar(producto_id, nombre, marca)
+
+
+@al_notificar(CANAL_POSTGRES)
+def recibir_cambios_autocompletado(payload):
+    # None al (re)conectar o "" si el cambio no cupo en el aviso: se relee el catálogo
+    indice = current_app.extensions.get("autocompletado")
+    if indice is None:
+        return
+    if payload:
+        aplicar(indice, json.loads(payload))
+    else:
+        indice.obsoleto = True
+        construir_indice(indice)
+
@@ -0,0 +1,166 @@
+# Búsqueda de productos: texto completo + trigramas en PostgreSQL, FTS5 en SQLite
+import re
+from sqlalchemy import DDL, Float, event, func, literal_column, or_, table, column, type_coerce
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.producto import Producto
+from app.services.paginacion import paginar
+
+# Debe coincidir con la expresión del índice ix_productos_busqueda (init_db.sql)
+DOCUMENTO_POSTGRES = func.to_tsvector(
+    "simple", func.coalesce(Producto.nombre, "") + " " + func.coalesce(Producto.marca, "")
+)
+
+DDL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_productos_busqueda ON productos USING GIN "
+    "(to_tsvector('simple', coalesce(nombre, '') || ' ' || coalesce(marca, '')))",
+    "CREATE INDEX IF NOT EXISTS ix_productos_nombre_trgm ON productos USING GIN (nombre gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_productos_marca_trgm ON productos USING GIN (marca gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_categorias_nombre_trgm ON categorias USING GIN (nombre gin_trgm_ops)",
+]
+
+# Tabla FTS5 de contenido externo: guarda solo el índice; los triggers la mantienen al día
+DDL_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5("
+    "nombre, marca, content='productos', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN "
+    "INSERT INTO productos_fts(rowid, nombre, marca) VALUES (new.id, new.nombre, new.marca); END",
+    "CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN "
+    "INSERT INTO productos_fts(productos_fts, rowid, nombre, marca) VALUES ('delete', old.id, old.nombre, old.marca); END",
+    "CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, marca ON productos BEGIN "
+    "INSERT INTO productos_fts(productos_fts, rowid, nombre, marca) VALUES ('delete', old.id, old.nombre, old.marca); "
+    "INSERT INTO productos_fts(rowid, nombre, marca) VALUES (new.id, new.nombre, new.marca); END",
+]
+
+# Sin esto, un drop_all()/create_all() deja el índice FTS5 con el mapeo rowid -> texto anterior
+DDL_SQLITE_BORRAR = [
+    "DROP TRIGGER IF EXISTS productos_fts_ai",
+    "DROP TRIGGER IF EXISTS productos_fts_ad",
+    "DROP TRIGGER IF EXISTS productos_fts_au",
+    "DROP TABLE IF EXISTS productos_fts",
+]
+
+productos_fts = table("productos_fts", column("rowid"))
+
+
+def crear_indices_busqueda(conexion):
+    """Crea (si faltan) los índices de búsqueda del dialecto de `conexion`."""
+    dialecto = conexion.dialect.name
+    if dialecto == "sqlite":
+        for sentencia in DDL_SQLITE:
+            conexion.execute(DDL(sentencia))
+    elif dialecto == "postgresql":
+        for sentencia in DDL_POSTGRES:
+            conexion.execute(DDL(sentencia))
+
+
+@event.listens_for(Producto.__table__, "after_create")
+def _crear_indices_busqueda(target, conexion, **kw):
+    crear_indices_busqueda(conexion)
+
+
+@event.listens_for(Producto.__table__, "before_drop")
+def _borrar_indices_busqueda(target, conexion, **kw):
+    # Los índices de PostgreSQL caen con sus tablas; la tabla FTS5 de SQLite no
+    if conexion.dialect.name == "sqlite":
+        for sentencia in DDL_SQLITE_BORRAR:
+            conexion.execute(DDL(sentencia))
+
+
+def reconstruir_indice_busqueda():
+    """Crea los índices que falten y, en SQLite, reindexa el catálogo existente."""
+    conexion = db.session.connection()
+    crear_indices_busqueda(conexion)
+    if conexion.dialect.name == "sqlite":
+        conexion.exec_driver_sql("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')")
+    db.session.commit()
+
+
+def terminos(texto):
+    """Palabras del texto buscado, en minúsculas; se descarta la puntuación."""
+    return re.findall(r"\w+", (texto or "").lower())
+
+
+def _relevancia_postgres(texto, palabras):
+    # Cada palabra como prefijo ("aud" encuentra "audifonos"); los trigramas
+    # toleran errores de tipeo en el nombre
+    consulta = func.to_tsquery("simple", " & ".join(f"{p}:*" for p in palabras))
+    condicion = or_(DOCUMENTO_POSTGRES.op("@@")(consulta), Producto.nombre.op("%")(texto))
+    relevancia = func.ts_rank(DOCUMENTO_POSTGRES, consulta) + func.similarity(Producto.nombre, texto)
+    return condicion, relevancia
+
+
+def _relevancia_sqlite(palabras):
+    consulta = " ".join(f'"{p}"*' for p in palabras)
+    condicion = literal_column("productos_fts").op("MATCH")(consulta)
+    # bm25 es menor cuanto más relevante
+    relevancia = -func.bm25(literal_column("productos_fts"))
+    return condicion, relevancia
+
+
+def filtrar_productos(query, nombre="", marca="", categoria="", precio_min=None, precio_max=None):
+    """Aplica los filtros por campo del formulario a una consulta sobre Producto ⋈ Categoria.
+
+    En PostgreSQL los ILIKE '%x%' usan los índices de trigramas (pg_trgm).
+    """
+    if nombre:
+        query = query.filter(Producto.nombre.ilike(f"%{nombre}%"))
+    if marca:
+        query = query.filter(Producto.marca.ilike(f"%{marca}%"))
+    if categoria:
+        query = query.filter(Categoria.nombre.ilike(f"%{categoria}%"))
+    if precio_min is not None:
+        query = query.filter(Producto.precio >= precio_min)
+    if precio_max is not None:
+        query = query.filter(Producto.precio <= precio_max)
+    return query
+
+
+def consulta_filtrada(texto, filtros, *columnas):
+    """Consulta de `columnas` sobre Producto ⋈ Categoria con la búsqueda y los filtros aplicados.
+
+    Devuelve (query, relevancia); relevancia es None si no hay texto que buscar.
+    """
+    palabras = terminos(texto)
+    query = filtrar_productos(db.session.query(*columnas).join(Categoria), **(filtros or {}))
+    if not palabras:
+        return query, None
+    if db.session.get_bind().dialect.name == "postgresql":
+        condicion, relevancia = _relevancia_postgres(texto.strip(), palabras)
+    else:
+        query = query.join(productos_fts, productos_fts.c.rowid == Producto.id)
+        condicion, relevancia = _relevancia_sqlite(palabras)
+    return query.filter(condicion), type_coerce(relevancia, Float)
+
+
+def buscar_productos(texto="", filtros=None, orden_stock=None, limite=50, cursor=None):
+    """Página de productos filtrados: (productos, siguiente_cursor).
+
+    Con `texto` los resultados van por relevancia (nombre y marca, por prefijo);
+    si no, por stock cuando se pide o por id. Primero se pagina sobre las
+    columnas de orden y luego se cargan solo los productos de la página con su
+    categoría.
+    """
+    query, relevancia = consulta_filtrada(texto, filtros, Producto.id)
+
+    if relevancia is not None:
+        # La subconsulta fija la relevancia como columna: el cursor la compara sin recalcular el orden
+        ranking = query.add_columns(relevancia.label("relevancia")).subquery()
+        columnas, descendente = [ranking.c.relevancia, ranking.c.id], True
+        query = db.session.query(*columnas)
+    elif orden_stock in ("asc", "desc"):
+        columnas, descendente = [Producto.stock, Producto.id], orden_stock == "desc"
+        query = query.add_columns(Producto.stock)
+    else:
+        columnas, descendente = [Producto.id], False
+
+    filas, siguiente = paginar(query, columnas, limite, cursor, descendente=descendente)
+
+    ids = [fila.id for fila in filas]
+    por_id = {
+        p.id: p
+        for p in Producto.query.options(joinedload(Producto.categoria)).filter(Producto.id.in_(ids))
+    } if ids else {}
+    return [por_id[i] for i in ids if i in por_id], siguiente
@@ -0,0 +1,80 @@
+# Caché en memoria con vencimiento, límite de entradas y cálculo único por clave
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """Valores calculados por clave que vencen a los `ttl` segundos.
+
+    Si varias peticiones piden a la vez una clave vencida, solo una la calcula
+    (single-flight) y las demás esperan su resultado. `invalidar()` descarta
+    todo, incluido lo que se esté calculando en ese momento: un cálculo que
+    empezó antes de la invalidación se devuelve, pero no se guarda.
+    Con `ttl=None` las entradas no vencen; con `max_entradas` se descartan
+    las menos usadas.
+    """
+
+    def __init__(self, ttl, reloj=time.monotonic, max_entradas=None):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (vence_en, valor)
+        self._en_curso = {}  # clave -> threading.Event
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.esperas = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave, calcular):
+        """Devuelve el valor de `clave`, llamando a `calcular()` si no está o venció."""
+        while True:
+            with self._lock:
+                entrada = self._entradas.get(clave)
+                if entrada is not None and (entrada[0] is None or entrada[0] > self._reloj()):
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return entrada[1]
+                listo = self._en_curso.get(clave)
+                if listo is None:
+                    listo = self._en_curso[clave] = threading.Event()
+                    generacion = self._generacion
+                    self.fallos += 1
+                    break
+                self.esperas += 1
+            # Otra petición está calculando la clave: esperar y volver a mirar
+            listo.wait()
+
+        try:
+            valor = calcular()
+            with self._lock:
+                if generacion == self._generacion:
+                    vence_en = None if self.ttl is None else self._reloj() + self.ttl
+                    self._entradas[clave] = (vence_en, valor)
+                    self._entradas.move_to_end(clave)
+                    if self.max_entradas is not None and len(self._entradas) > self.max_entradas:
+                        self._entradas.popitem(last=False)
+            return valor
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
+            listo.set()
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._generacion += 1
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "esperas": self.esperas,
+                "invalidaciones": self.invalidaciones,
+                "entradas": len(self._entradas),
+                "ttl": self.ttl,
+            }
@@ -0,0 +1,86 @@
+# Caché con TTL de las respuestas del dashboard de ventas, invalidada al registrar ventas
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.historial_ventas import HistorialVenta
+from app.services.cache import CacheTTL
+from app.services.notificaciones import al_notificar, es_postgres, iniciar_escucha, notificar
+
+CANAL_POSTGRES = "cache_dashboard"
+TTL_POR_DEFECTO = 30
+MAX_SERIES_CERRADAS = 256
+
+
+def obtener_cache_dashboard():
+    """Caché del proceso, configurada con DASHBOARD_CACHE_TTL (segundos).
+
+    Arranca la escucha de PostgreSQL: las ventas de otros workers la invalidan.
+    """
+    iniciar_escucha()
+    cache = current_app.extensions.get("cache_dashboard")
+    if cache is None:
+        ttl = current_app.config.get("DASHBOARD_CACHE_TTL", TTL_POR_DEFECTO)
+        cache = current_app.extensions["cache_dashboard"] = CacheTTL(ttl)
+    return cache
+
+
+def obtener_cache_series():
+    """Caché sin vencimiento para series de periodos ya cerrados (no cambian con ventas nuevas)."""
+    cache = current_app.extensions.get("cache_series_cerradas")
+    if cache is None:
+        max_entradas = current_app.config.get("SERIES_CACHE_MAX_ENTRADAS", MAX_SERIES_CERRADAS)
+        cache = current_app.extensions["cache_series_cerradas"] = CacheTTL(ttl=None, max_entradas=max_entradas)
+    return cache
+
+
+# ---------- Invalidación al confirmar ventas nuevas ----------
+# El proceso que confirma invalida su caché al instante; en PostgreSQL un
+# NOTIFY en la misma transacción invalida la de los demás workers.
+
+@event.listens_for(Session, "after_flush")
+def registrar_ventas_nuevas(session, flush_context):
+    if any(isinstance(obj, HistorialVenta) for obj in session.new):
+        session.info["ventas_nuevas"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def registrar_insert_ventas(orm_execute_state):
+    # registrar_lineas inserta el historial en bloque, sin pasar por session.new
+    mapper = orm_execute_state.bind_mapper
+    if orm_execute_state.is_insert and mapper is not None and mapper.class_ is HistorialVenta:
+        orm_execute_state.session.info["ventas_nuevas"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def notificar_ventas_nuevas(session):
+    # before_commit corre antes del flush final: se adelanta para ver el historial pendiente
+    if session.new:
+        session.flush()
+    if session.info.get("ventas_nuevas") and es_postgres(session):
+        notificar(session, CANAL_POSTGRES)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidar_tras_commit(session):
+    if not session.info.pop("ventas_nuevas", False):
+        return
+    try:
+        cache = current_app.extensions.get("cache_dashboard")
+    except RuntimeError:
+        # Sin contexto de aplicación (scripts): no hay caché que invalidar
+        return
+    if cache is not None:
+        cache.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def descartar_ventas_nuevas(session):
+    session.info.pop("ventas_nuevas", None)
+
+
+@al_notificar(CANAL_POSTGRES)
+def recibir_ventas_nuevas(payload):
+    # También al (re)conectar (payload None): pudo haberse perdido un aviso
+    cache = current_app.extensions.get("cache_dashboard")
+    if cache is not None:
+        cache.invalidar()
@@ -0,0 +1,262 @@
+# Catálogo público de productos: páginas por id, caché versionada y GET condicional
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import current_app, g, has_app_context, make_response, request
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, joinedload
+from app.extensions import db
+from app.models.estado_catalogo import EstadoCatalogo
+from app.models.producto import Producto
+from app.services.cache import CacheTTL
+from app.services.notificaciones import al_notificar, es_postgres, iniciar_escucha, notificar
+from app.services.paginacion import decodificar_cursor, paginar
+
+TABLAS_CATALOGO = {"productos", "categorias"}
+CANAL_POSTGRES = "catalogo"
+TTL_POR_DEFECTO = 60
+VERSION_TTL_POR_DEFECTO = 5
+STOCK_SEGUNDOS_POR_DEFECTO = 60
+MAX_PAGINAS_EN_CACHE = 1024
+
+
+class VersionCatalogo:
+    """Versión del catálogo guardada en la fila única de estado_catalogo.
+
+    Sube en la misma transacción que escribe productos o categorías, así
+    todos los workers (y todos los procesos) ven el mismo valor. Las claves
+    de caché y los ETag la llevan: al subirla, lo guardado deja de usarse
+    sin tener que recorrerlo.
+
+    Cada proceso recuerda la última lectura CATALOGO_VERSION_TTL segundos,
+    así un 304 no va a la base. El commit que la sube la olvida en su
+    proceso y, en PostgreSQL, avisa por NOTIFY a los demás; el TTL acota el
+    retraso si se pierde un aviso.
+
+    El descuento de stock de una compra no la sube: serializaría todos los
+    checkouts sobre la misma fila. En su lugar los ETag y la caché de
+    páginas llevan una ventana de CATALOGO_STOCK_SEGUNDOS, y el stock
+    publicado se atrasa como mucho eso. Con 0 el stock también sube la versión.
+    """
+
+    def __init__(self, reloj=time.time):
+        self.reloj = reloj
+
+    def _cache(self):
+        cache = current_app.extensions.get("version_catalogo")
+        if cache is None:
+            ttl = current_app.config.get("CATALOGO_VERSION_TTL", VERSION_TTL_POR_DEFECTO)
+            cache = current_app.extensions["version_catalogo"] = CacheTTL(ttl)
+        return cache
+
+    @staticmethod
+    def _leer_fila():
+        fila = db.session.query(EstadoCatalogo.version, EstadoCatalogo.modificado_en).filter_by(id=1).first()
+        return tuple(fila) if fila else (0, None)
+
+    def leer(self):
+        """(version, modificado_en) actuales."""
+        if "estado_catalogo" in g:
+            return g.estado_catalogo
+        return self._cache().obtener("estado", self._leer_fila)
+
+    @property
+    def actual(self):
+        return self.leer()[0]
+
+    @property
+    def modificado_en(self):
+        """Hora UTC (naive) de la última escritura, con microsegundos.
+
+        Si la ventana de stock empezó después, cuenta como modificación: el
+        stock pudo cambiar sin subir la versión.
+        """
+        modificado_en = self.leer()[1]
+        inicio = self.ventana_stock()[1]
+        if modificado_en is None or inicio is None:
+            return modificado_en
+        return max(modificado_en, inicio)
+
+    @staticmethod
+    def segundos_stock():
+        if not has_app_context():
+            return 0
+        return current_app.config.get("CATALOGO_STOCK_SEGUNDOS", STOCK_SEGUNDOS_POR_DEFECTO)
+
+    def ventana_stock(self):
+        """(número, inicio UTC naive) de la ventana de stock actual; (None, None) sin ventanas."""
+        segundos = self.segundos_stock()
+        if not segundos:
+            return None, None
+        numero = int(self.reloj() // segundos)
+        return numero, datetime.utcfromtimestamp(numero * segundos)
+
+    def ahora(self):
+        return datetime.utcfromtimestamp(self.reloj())
+
+    def incrementar(self, session):
+        """UPDATE de la fila dentro de la transacción de `session`."""
+        valores = {"version": EstadoCatalogo.version + 1, "modificado_en": self.ahora()}
+        resultado = session.execute(update(EstadoCatalogo).where(EstadoCatalogo.id == 1).values(**valores))
+        if resultado.rowcount == 0:
+            session.add(EstadoCatalogo(id=1, version=1, modificado_en=valores["modificado_en"]))
+
+    def olvidar(self):
+        if has_app_context():
+            g.pop("estado_catalogo", None)
+            cache = current_app.extensions.get("version_catalogo")
+            if cache is not None:
+                cache.invalidar()
+
+    def etag(self, *partes):
+        """ETag fuerte para la versión actual; `partes` distinguen recurso y parámetros.
+
+        La hora de modificación también entra: si la base se recrea, la
+        versión vuelve a 0 pero el ETag no coincide con los anteriores.
+        """
+        version, modificado_en = self.leer()
+        base = ":".join(str(p) for p in (version, modificado_en, self.ventana_stock()[0], *partes))
+        return hashlib.sha1(base.encode()).hexdigest()[:32]
+
+
+version_catalogo = VersionCatalogo()
+
+
+def obtener_cache_catalogo():
+    """Caché del proceso, configurada con CATALOGO_CACHE_TTL (segundos)."""
+    cache = current_app.extensions.get("cache_catalogo")
+    if cache is None:
+        ttl = current_app.config.get("CATALOGO_CACHE_TTL", TTL_POR_DEFECTO)
+        cache = current_app.extensions["cache_catalogo"] = CacheTTL(ttl, max_entradas=MAX_PAGINAS_EN_CACHE)
+    return cache
+
+
+def pagina_productos(limite, cursor=None):
+    """Productos por id ascendente con su categoría en el mismo SELECT: (productos, siguiente_cursor)."""
+    query = Producto.query.options(joinedload(Producto.categoria))
+    return paginar(query, [Producto.id], limite, cursor, descendente=False)
+
+
+def productos_publicos(limite, cursor=None):
+    """Página del catálogo ya serializada a JSON: (cuerpo, siguiente_cursor).
+
+    Se valida el cursor antes de consultar la caché para no guardar errores.
+    """
+    if cursor:
+        decodificar_cursor(cursor, [Producto.id])
+
+    def calcular():
+        productos, siguiente = pagina_productos(limite, cursor)
+        return current_app.json.dumps([p.to_dict() for p in productos]), siguiente
+
+    clave = (version_catalogo.actual, version_catalogo.ventana_stock()[0], limite, cursor)
+    return obtener_cache_catalogo().obtener(clave, calcular)
+
+
+def respuesta_condicional(vista):
+    """GET condicional por versión del catálogo (ETag + Last-Modified).
+
+    Si el cliente ya tiene la versión actual responde 304 antes de ejecutar
+    la vista, con la versión que el proceso ya conoce: sin consultas.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        iniciar_escucha()
+        g.estado_catalogo = version_catalogo.leer()
+        try:
+            return _responder(vista, args, kwargs)
+        finally:
+            g.pop("estado_catalogo", None)
+    return envoltura
+
+
+def _responder(vista, args, kwargs):
+    etag = version_catalogo.etag(request.endpoint, request.query_string.decode())
+    modificado_en = version_catalogo.modificado_en
+
+    if request.if_none_match:
+        vigente = request.if_none_match.contains(etag)
+    else:
+        desde = request.if_modified_since
+        vigente = (
+            desde is not None and modificado_en is not None
+            and modificado_en <= desde.astimezone(timezone.utc).replace(tzinfo=None)
+        )
+    if vigente:
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(vista(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    # Last-Modified tiene resolución de segundos: solo se envía cuando el
+    # segundo de la última escritura ya terminó, o una escritura posterior
+    # en ese mismo segundo quedaría oculta tras un 304
+    if modificado_en is not None:
+        segundo = modificado_en.replace(microsecond=0)
+        if segundo < modificado_en:
+            segundo += timedelta(seconds=1)
+        if version_catalogo.ahora() >= segundo:
+            response.last_modified = segundo.replace(tzinfo=timezone.utc)
+    return response
+
+
+# ---------- Versión: sube al confirmar escrituras del catálogo ----------
+
+@event.listens_for(Session, "after_flush")
+def registrar_cambios_catalogo(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if getattr(obj, "__tablename__", None) in TABLAS_CATALOGO:
+            session.info["catalogo_modificado"] = True
+            return
+
+
+def _solo_stock(sentencia):
+    valores = getattr(sentencia, "_values", None)
+    return bool(valores) and {getattr(c, "key", c) for c in valores} == {"stock"}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def registrar_escritura_catalogo(orm_execute_state):
+    # INSERT/UPDATE/DELETE en bloque; el descuento de stock de una compra
+    # queda cubierto por la ventana de stock
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        sentencia = orm_execute_state.statement
+        if getattr(getattr(sentencia, "table", None), "name", None) not in TABLAS_CATALOGO:
+            return
+        if orm_execute_state.is_update and _solo_stock(sentencia) and version_catalogo.segundos_stock():
+            return
+        orm_execute_state.session.info["catalogo_modificado"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def incrementar_version_catalogo(session):
+    # before_commit corre antes del flush final: se adelanta para ver los cambios
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    if session.info.pop("catalogo_modificado", False):
+        version_catalogo.incrementar(session)
+        session.info["catalogo_version_subida"] = True
+        if es_postgres(session):
+            notificar(session, CANAL_POSTGRES)
+
+
+@event.listens_for(Session, "after_commit")
+def olvidar_version_catalogo(session):
+    if session.info.pop("catalogo_version_subida", False):
+        version_catalogo.olvidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def descartar_cambios_catalogo(session):
+    session.info.pop("catalogo_modificado", None)
+    session.info.pop("catalogo_version_subida", None)
+
+
+@al_notificar(CANAL_POSTGRES)
+def recibir_version_catalogo(payload):
+    # También al (re)conectar (payload None): pudo haberse perdido un aviso
+    version_catalogo.olvidar()
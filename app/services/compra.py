@@ -0,0 +1,51 @@
+# Escritura de las líneas de una compra
+from datetime import datetime
+from sqlalchemy import insert
+from app.extensions import db
+from app.models.compra_producto import CompraProducto
+from app.models.historial_ventas import HistorialVenta
+from app.services.eventos_ventas import anotar_venta
+from app.services.resumen_ventas import acumular_ventas
+
+
+def registrar_lineas(compra, lineas, cliente_id, tipo_comprobante_id):
+    """Inserta el detalle y el historial de ventas de una compra en bloque.
+
+    `lineas` es una lista de (producto, cantidad). Cada tabla se escribe con
+    un único INSERT multi-fila (executemany), así la cantidad de sentencias
+    por compra no crece con el tamaño del carrito. En la misma transacción
+    se suman las ventas al resumen horario que lee el dashboard y se anota el
+    evento que reciben los dashboards conectados en vivo.
+    """
+    if not lineas:
+        return
+
+    # Misma fecha en el historial y en el resumen (la hora del servidor de base
+    # puede no coincidir con la de la aplicación)
+    fecha_venta = datetime.utcnow()
+    db.session.execute(insert(CompraProducto), [
+        {
+            "compra_id": compra.id,
+            "producto_id": producto.id,
+            "cantidad": cantidad
+        }
+        for producto, cantidad in lineas
+    ])
+    db.session.execute(insert(HistorialVenta), [
+        {
+            "cliente_id": cliente_id,
+            "producto_id": producto.id,
+            "cantidad": cantidad,
+            "total_venta": producto.precio * cantidad,
+            "tipo_comprobante_id": tipo_comprobante_id,
+            "fecha_venta": fecha_venta
+        }
+        for producto, cantidad in lineas
+    ])
+    acumular_ventas(fecha_venta, tipo_comprobante_id, lineas)
+    anotar_venta(
+        fecha_venta,
+        tipo_comprobante_id,
+        sum(producto.precio * cantidad for producto, cantidad in lineas),
+        len(lineas)
+    )
@@ -0,0 +1,124 @@
+# Generación de PDFs de comprobantes: bajo demanda y anticipada tras cada compra
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from flask import current_app, render_template
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.extensions import db
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.services.pdf_cache import obtener_cache_pdf, version_plantilla
+from app.services.pdf_pool import renderizar_pdf
+
+logger = logging.getLogger("flask_backend")
+
+
+def opciones_comprobante():
+    """Carga compra + tipo (JOIN) y líneas + productos (un SELECT IN): dos consultas en total,
+    sin importar cuántas líneas tenga la compra."""
+    return (
+        joinedload(Compra.tipo_comprobante),
+        selectinload(Compra.productos).joinedload(CompraProducto.producto),
+    )
+
+
+def plantilla_pdf(compra):
+    if compra.tipo_comprobante and compra.tipo_comprobante.nombre.lower() == 'factura':
+        return 'factura_pdf.html'
+    return 'boleta_pdf.html'
+
+
+def clave_pdf(compra):
+    """Clave en la caché (y ETag) del PDF de una compra."""
+    return obtener_cache_pdf().clave(compra.id, version_plantilla(plantilla_pdf(compra)))
+
+
+def generar_pdf(compra):
+    """Devuelve el PDF de la compra desde la caché o lo renderiza y lo guarda."""
+    cache = obtener_cache_pdf()
+    clave = clave_pdf(compra)
+    pdf = cache.obtener(clave)
+    if pdf is None:
+        html = render_template(plantilla_pdf(compra), compra=compra)
+        pdf = renderizar_pdf(html)
+        cache.guardar(clave, pdf)
+    return pdf
+
+
+# ---------- Generación anticipada ----------
+
+_executor = None
+_executor_pid = None
+_pendientes = {}  # compra_id -> Future
+_lock = threading.Lock()
+
+
+def _obtener_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-previo")
+        _executor_pid = os.getpid()
+        _pendientes.clear()
+    return _executor
+
+
+def _generar_en_segundo_plano(app, compra_id):
+    with app.app_context():
+        try:
+            compra = db.session.get(Compra, compra_id, options=opciones_comprobante())
+            if compra is not None:
+                generar_pdf(compra)
+        except Exception as e:
+            logger.error(f"[pdf_previo] Error generando PDF de compra {compra_id}: {e}")
+        finally:
+            with _lock:
+                _pendientes.pop(compra_id, None)
+
+
+def programar_pdfs(compra_ids):
+    """Encola la generación en segundo plano de los PDFs de las compras indicadas."""
+    app = current_app._get_current_object()
+    with _lock:
+        executor = _obtener_executor()
+        for compra_id in compra_ids:
+            if compra_id not in _pendientes:
+                _pendientes[compra_id] = executor.submit(_generar_en_segundo_plano, app, compra_id)
+
+
+def esperar_pdf_pendiente(compra_id, timeout):
+    """Si el PDF de la compra se está generando, espera a que termine (como máximo timeout)."""
+    with _lock:
+        futuro = _pendientes.get(compra_id)
+    if futuro is None:
+        return
+    try:
+        futuro.result(timeout=timeout)
+    except FuturesTimeoutError:
+        pass
+
+
+@event.listens_for(Session, "after_flush")
+def registrar_compras_nuevas(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Compra) and obj.id is not None:
+            session.info.setdefault("compras_nuevas", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def generar_pdfs_tras_commit(session):
+    compra_ids = session.info.pop("compras_nuevas", None)
+    if not compra_ids:
+        return
+    try:
+        if current_app.config.get("PDF_PREVIO", False):
+            programar_pdfs(sorted(compra_ids))
+    except RuntimeError:
+        # Sin contexto de aplicación (scripts); se generará bajo demanda
+        pass
+
+
+@event.listens_for(Session, "after_rollback")
+def descartar_compras_nuevas(session):
+    session.info.pop("compras_nuevas", None)
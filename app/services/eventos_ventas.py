@@ -0,0 +1,150 @@
+# Eventos de ventas en vivo para el dashboard (Server-Sent Events)
+import json
+import queue
+import threading
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.services.fechas import a_local
+from app.services.notificaciones import al_notificar, es_postgres, notificar
+
+CANAL_POSTGRES = "ventas_dashboard"
+MAX_PENDIENTES = 100
+# Cada stream abierto ocupa un hilo del worker (gthread) mientras dure; con
+# --threads 32 quedan al menos 24 para el resto de las peticiones
+MAX_SUSCRIPTORES = 8
+
+
+class DemasiadosSuscriptores(Exception):
+    """El worker ya tiene el máximo de streams abiertos."""
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente conectado al stream."""
+
+    def __init__(self, difusor, max_pendientes):
+        self._difusor = difusor
+        self.cola = queue.Queue(maxsize=max_pendientes)
+        self.desbordada = False
+
+    def siguiente(self, timeout):
+        """Próximo evento, o None si no llegó ninguno en `timeout` segundos."""
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cancelar(self):
+        self._difusor._quitar(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cancelar()
+
+
+class DifusorVentas:
+    """Reparte cada evento publicado entre todas las suscripciones del proceso.
+
+    Publicar nunca bloquea: si un cliente lento llena su cola se marca como
+    desbordada y se le quita; el stream le pide recargar la página.
+    Con `max_suscriptores` se rechazan las suscripciones que lo superen.
+    """
+
+    def __init__(self, max_suscriptores=None):
+        self.max_suscriptores = max_suscriptores
+        self._lock = threading.Lock()
+        self._suscripciones = set()
+
+    def suscribir(self, max_pendientes=MAX_PENDIENTES):
+        suscripcion = Suscripcion(self, max_pendientes)
+        with self._lock:
+            if self.max_suscriptores is not None and len(self._suscripciones) >= self.max_suscriptores:
+                raise DemasiadosSuscriptores(f"Máximo de {self.max_suscriptores} streams por worker")
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def _quitar(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    @property
+    def suscriptores(self):
+        with self._lock:
+            return len(self._suscripciones)
+
+    def publicar(self, evento):
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.cola.put_nowait(evento)
+            except queue.Full:
+                suscripcion.desbordada = True
+                self._quitar(suscripcion)
+
+
+def obtener_difusor():
+    """Difusor del proceso, limitado a SSE_MAX_SUSCRIPTORES streams."""
+    difusor = current_app.extensions.get("difusor_ventas")
+    if difusor is None:
+        maximo = current_app.config.get("SSE_MAX_SUSCRIPTORES", MAX_SUSCRIPTORES)
+        difusor = current_app.extensions["difusor_ventas"] = DifusorVentas(maximo)
+    return difusor
+
+
+# ---------- Productor: ventas confirmadas ----------
+
+def anotar_venta(fecha_venta, tipo_comprobante_id, monto, ventas):
+    """Registra en la sesión el delta de una compra; se difunde si la transacción se confirma."""
+    local = a_local(fecha_venta)
+    db.session.info.setdefault("eventos_ventas", []).append({
+        "fecha": local.date().isoformat(),
+        "hora": local.hour,
+        "tipo_comprobante_id": tipo_comprobante_id,
+        "monto": round(monto, 2),
+        "ventas": ventas,
+    })
+
+
+@event.listens_for(Session, "before_commit")
+def notificar_ventas(session):
+    # En PostgreSQL NOTIFY se entrega solo si la transacción se confirma y llega
+    # a todos los procesos que escuchan el canal
+    eventos = session.info.get("eventos_ventas")
+    if eventos and es_postgres(session):
+        for evento in eventos:
+            notificar(session, CANAL_POSTGRES, json.dumps(evento))
+        session.info.pop("eventos_ventas")
+
+
+@event.listens_for(Session, "after_commit")
+def difundir_ventas(session):
+    # Sin NOTIFY (SQLite) solo se entera el proceso que hizo la compra
+    eventos = session.info.pop("eventos_ventas", None)
+    if not eventos:
+        return
+    try:
+        difusor = obtener_difusor()
+    except RuntimeError:
+        return
+    for evento in eventos:
+        difusor.publicar(evento)
+
+
+@event.listens_for(Session, "after_rollback")
+def descartar_eventos_ventas(session):
+    session.info.pop("eventos_ventas", None)
+
+
+@al_notificar(CANAL_POSTGRES)
+def recibir_ventas(payload):
+    # Compras confirmadas por cualquier proceso; None = reconexión, no hay delta que enviar
+    if payload:
+        obtener_difusor().publicar(json.loads(payload))
+
+
+def formato_sse(nombre, datos):
+    return f"event: {nombre}\ndata: {json.dumps(datos)}\n\n"
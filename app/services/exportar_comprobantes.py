@@ -0,0 +1,109 @@
+# Exportación masiva de comprobantes en un ZIP generado por partes
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import render_template
+from app.models.compra import Compra
+from app.models.tipo_comprobante import TipoComprobante
+from app.services.comprobantes import clave_pdf, opciones_comprobante, plantilla_pdf
+from app.services.fechas import rango_utc
+from app.services.pdf_cache import obtener_cache_pdf
+from app.services.pdf_pool import obtener_pool_pdf, renderizar_en
+
+
+class _BufferZip(io.RawIOBase):
+    """Destino no 'seekable' para ZipFile: acumula bytes hasta que el generador los entrega."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _compras_por_lotes(inicio, fin, tipo, lote):
+    """Recorre las compras del rango por keyset (id) en lotes de tamaño fijo."""
+    tipo_id = None
+    if tipo:
+        tipo_obj = TipoComprobante.query.filter_by(nombre=tipo).first()
+        if tipo_obj is None:
+            return
+        tipo_id = tipo_obj.id
+
+    ultimo_id = 0
+    while True:
+        query = (
+            Compra.query
+            .options(*opciones_comprobante())
+            .filter(Compra.fecha >= inicio, Compra.fecha < fin, Compra.id > ultimo_id)
+        )
+        if tipo_id:
+            query = query.filter(Compra.tipo_comprobante_id == tipo_id)
+        compras = query.order_by(Compra.id).limit(lote).all()
+        if not compras:
+            return
+        yield compras
+        ultimo_id = compras[-1].id
+
+
+def generar_zip(desde, hasta, tipo=None, lote=20):
+    """Generador de bytes de un ZIP con los PDFs de las compras del rango.
+
+    Solo se mantiene en memoria un lote de PDFs a la vez. Los que ya están en
+    la caché se leen de disco; el resto se renderiza en paralelo en el pool de
+    procesos y se guarda en la caché para la próxima vez.
+    """
+    inicio, fin = rango_utc(desde, hasta)
+    cache = obtener_cache_pdf()
+    # Se resuelve aquí: los hilos del executor no tienen contexto de aplicación
+    pool = obtener_pool_pdf()
+    hilos = pool.procesos if pool else 1
+
+    def renderizar(html, clave):
+        pdf = renderizar_en(pool, html)
+        cache.guardar(clave, pdf)
+        return pdf
+
+    buffer = _BufferZip()
+    errores = []
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="exportar-zip") as executor, \
+            zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archivo:
+        for compras in _compras_por_lotes(inicio, fin, tipo, lote):
+            trabajos = []
+            for compra in compras:
+                clave = clave_pdf(compra)
+                nombre = f"{plantilla_pdf(compra).replace('_pdf.html', '')}_{compra.id}.pdf"
+                if cache.existe(clave):
+                    trabajos.append((nombre, clave, None))
+                else:
+                    html = render_template(plantilla_pdf(compra), compra=compra)
+                    trabajos.append((nombre, clave, executor.submit(renderizar, html, clave)))
+
+            for nombre, clave, futuro in trabajos:
+                try:
+                    pdf = futuro.result() if futuro else cache.obtener(clave)
+                    if pdf is None:  # expulsado de la caché entre la consulta y la lectura
+                        raise FileNotFoundError(clave)
+                except Exception as e:
+                    errores.append(f"{nombre}: {e}")
+                    continue
+                archivo.writestr(nombre, pdf)
+                yield buffer.vaciar()
+
+        if errores:
+            archivo.writestr("errores.txt", "\n".join(errores))
+    yield buffer.vaciar()
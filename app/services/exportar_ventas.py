@@ -0,0 +1,100 @@
+# Exportación de historial_ventas en CSV o JSON Lines, generada por partes
+import csv
+import io
+import json
+from datetime import timedelta
+from sqlalchemy import select
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.services.fechas import a_utc, inicio_dia
+
+FORMATOS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+COLUMNAS = (
+    "id", "fecha_venta_utc", "cliente_id", "producto_id", "producto", "marca",
+    "categoria", "vendedor_id", "tipo_comprobante", "cantidad", "total_venta",
+)
+
+
+def consulta_ventas(desde=None, hasta=None, vendedor_id=None):
+    """SELECT plano (sin ORM) de las ventas con sus dimensiones, en orden de id.
+
+    `desde`/`hasta` son fechas locales inclusivas; `vendedor_id` es el dueño del producto.
+    """
+    query = (
+        select(
+            HistorialVenta.id,
+            HistorialVenta.fecha_venta,
+            HistorialVenta.cliente_id,
+            HistorialVenta.producto_id,
+            Producto.nombre,
+            Producto.marca,
+            Categoria.nombre,
+            Producto.cliente_id,
+            TipoComprobante.nombre,
+            HistorialVenta.cantidad,
+            HistorialVenta.total_venta,
+        )
+        .select_from(HistorialVenta)
+        .outerjoin(Producto, HistorialVenta.producto_id == Producto.id)
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+        .outerjoin(TipoComprobante, HistorialVenta.tipo_comprobante_id == TipoComprobante.id)
+        .order_by(HistorialVenta.id)
+    )
+    if desde is not None:
+        query = query.where(HistorialVenta.fecha_venta >= a_utc(inicio_dia(desde)))
+    if hasta is not None:
+        query = query.where(HistorialVenta.fecha_venta < a_utc(inicio_dia(hasta + timedelta(days=1))))
+    if vendedor_id is not None:
+        query = query.where(Producto.cliente_id == vendedor_id)
+    return query
+
+
+def _filas(query, lote):
+    # yield_per: cursor del lado del servidor en PostgreSQL, se leen `lote` filas por vez
+    resultado = db.session.execute(query.execution_options(yield_per=lote))
+    try:
+        for fila in resultado:
+            fila = list(fila)
+            fila[1] = fila[1].isoformat() if fila[1] else None
+            fila[10] = float(fila[10]) if fila[10] is not None else None
+            yield fila
+    finally:
+        resultado.close()
+
+
+def _csv(filas, lote):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    for i, fila in enumerate(filas, 1):
+        escritor.writerow(fila)
+        if i % lote == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl(filas, lote):
+    partes = []
+    for fila in filas:
+        partes.append(json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False))
+        if len(partes) == lote:
+            yield "\n".join(partes) + "\n"
+            partes = []
+    if partes:
+        yield "\n".join(partes) + "\n"
+
+
+def exportar_ventas(formato, desde=None, hasta=None, vendedor_id=None, lote=1000):
+    """Generador de texto CSV o JSON Lines; en memoria hay como máximo un lote de filas."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+    filas = _filas(consulta_ventas(desde, hasta, vendedor_id), lote)
+    if formato == "csv":
+        return _csv(filas, lote)
+    return _jsonl(filas, lote)
@@ -0,0 +1,73 @@
+# Conteos por categoría, marca y rango de precio para la página de filtro de productos
+from sqlalchemy import String, case, cast, func, literal, select, union_all
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.producto import Producto
+from app.services.busqueda import consulta_filtrada
+from app.services.catalogo import obtener_cache_catalogo, version_catalogo
+
+# Límites de los rangos de precio: [0, 50), [50, 100), ..., [1000, ∞)
+RANGOS_PRECIO = (0, 50, 100, 250, 500, 1000)
+MAX_VALORES = 10
+
+
+def _rango_precio():
+    return case(
+        *[(Producto.precio < hasta, i) for i, hasta in enumerate(RANGOS_PRECIO[1:])],
+        else_=len(RANGOS_PRECIO) - 1
+    )
+
+
+def calcular_facetas(texto="", filtros=None, max_valores=MAX_VALORES):
+    """Conteos de los productos que cumplen la búsqueda y los filtros activos.
+
+    Una sola sentencia: los productos filtrados en un CTE y un GROUP BY por
+    faceta unidos con UNION ALL. Categorías y marcas se devuelven de mayor a
+    menor cantidad (las `max_valores` primeras); los rangos de precio, en orden.
+    """
+    query, _ = consulta_filtrada(
+        texto, filtros,
+        Categoria.nombre.label("categoria"), Producto.marca.label("marca"), _rango_precio().label("rango")
+    )
+    filtrados = query.cte("filtrados")
+    por_faceta = [
+        select(literal(faceta).label("faceta"), cast(columna, String).label("valor"), func.count().label("cantidad"))
+        .select_from(filtrados)
+        .where(columna.is_not(None))
+        .group_by(columna)
+        for faceta, columna in (
+            ("categoria", filtrados.c.categoria),
+            ("marca", filtrados.c.marca),
+            ("precio", filtrados.c.rango),
+        )
+    ]
+
+    facetas = {"categoria": [], "marca": [], "precio": []}
+    for faceta, valor, cantidad in db.session.execute(union_all(*por_faceta)):
+        facetas[faceta].append((valor, cantidad))
+
+    resultado = {
+        faceta: [
+            {"valor": valor, "cantidad": cantidad}
+            for valor, cantidad in sorted(facetas[faceta], key=lambda v: (-v[1], v[0]))[:max_valores]
+        ]
+        for faceta in ("categoria", "marca")
+    }
+    conteo_rangos = {int(valor): cantidad for valor, cantidad in facetas["precio"]}
+    resultado["precio"] = [
+        {
+            "desde": desde,
+            "hasta": RANGOS_PRECIO[i + 1] if i + 1 < len(RANGOS_PRECIO) else None,
+            "cantidad": conteo_rangos[i],
+        }
+        for i, desde in enumerate(RANGOS_PRECIO)
+        if i in conteo_rangos
+    ]
+    return resultado
+
+
+def facetas_productos(texto="", filtros=None):
+    """calcular_facetas con la caché del catálogo: se invalida con cada escritura de productos."""
+    filtros = filtros or {}
+    clave = ("facetas", version_catalogo.actual, texto.strip().lower(), tuple(sorted(filtros.items())))
+    return obtener_cache_catalogo().obtener(clave, lambda: calcular_facetas(texto, filtros))
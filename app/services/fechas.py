@@ -0,0 +1,38 @@
+# Conversión entre la hora local de la tienda (Lima) y las fechas UTC guardadas en la base
+from datetime import datetime, time, timedelta
+import pytz
+
+ZONA_LOCAL = pytz.timezone('America/Lima')
+
+
+def ahora_local():
+    return datetime.now(ZONA_LOCAL)
+
+
+def a_utc(fecha_local):
+    """Datetime local (con o sin tzinfo) -> datetime UTC naive, como se guarda en la base."""
+    if fecha_local.tzinfo is None:
+        fecha_local = ZONA_LOCAL.localize(fecha_local)
+    return fecha_local.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def a_local(fecha_utc):
+    """Datetime UTC naive (como se guarda en la base) -> datetime local naive."""
+    return pytz.utc.localize(fecha_utc).astimezone(ZONA_LOCAL).replace(tzinfo=None)
+
+
+def inicio_dia(fecha):
+    """Medianoche local (naive) de una fecha."""
+    return datetime.combine(fecha, time.min)
+
+
+def rango_utc(desde, hasta):
+    """Convierte fechas locales (inclusivas) al rango UTC [inicio, fin)."""
+    return a_utc(inicio_dia(desde)), a_utc(inicio_dia(hasta + timedelta(days=1)))
+
+
+def desfase_minutos(fecha_local):
+    """Minutos a sumar a una fecha UTC para obtener la hora local (Lima: -300, sin horario de verano)."""
+    if fecha_local.tzinfo is None:
+        fecha_local = ZONA_LOCAL.localize(fecha_local)
+    return int(fecha_local.utcoffset().total_seconds() // 60)
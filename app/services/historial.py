@@ -0,0 +1,18 @@
+# Historial de ventas de un cliente, paginado por (fecha_venta, id)
+from sqlalchemy.orm import joinedload
+from app.models.historial_ventas import HistorialVenta
+from app.services.paginacion import paginar
+
+
+def pagina_historial(cliente_id, limite, cursor=None):
+    """Ventas del cliente de la más reciente a la más antigua: (ventas, siguiente_cursor).
+
+    Recorre el índice (cliente_id, fecha_venta, id); el tipo de comprobante
+    llega en el mismo SELECT.
+    """
+    query = (
+        HistorialVenta.query
+        .options(joinedload(HistorialVenta.tipo_comprobante))
+        .filter(HistorialVenta.cliente_id == cliente_id)
+    )
+    return paginar(query, [HistorialVenta.fecha_venta, HistorialVenta.id], limite, cursor)
@@ -0,0 +1,178 @@
+# Soporte de la cabecera Idempotency-Key para endpoints que crean compras
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, make_response, current_app
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.idempotencia import ClaveIdempotencia
+
+logger = logging.getLogger("flask_backend")
+
+CABECERA = "Idempotency-Key"
+TTL_POR_DEFECTO = 24 * 60 * 60  # segundos
+BLOQUEO_POR_DEFECTO = 120  # segundos; debe superar la solicitud más lenta
+
+
+def hash_solicitud():
+    """Hash compacto (128 bits) del método, ruta y cuerpo de la solicitud."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(request.method.encode())
+    h.update(request.path.encode())
+    h.update(request.get_data(cache=True))
+    return h.hexdigest()
+
+
+def _ambito():
+    usuario = current_user.id if current_user and current_user.is_authenticated else "anonimo"
+    return f"{request.endpoint}:{usuario}"
+
+
+def _respuesta_guardada(registro):
+    response = make_response(registro.cuerpo, registro.estado_http)
+    response.mimetype = registro.mimetype
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _reservar_clave(ambito, clave, hash_actual):
+    """Registra la clave como 'en proceso'. Devuelve la respuesta a enviar si ya existía.
+
+    La reserva dura IDEMPOTENCIA_BLOQUEO segundos (bloqueado_hasta): si el
+    worker que la tomó muere sin guardar la respuesta, un reintento posterior
+    la retoma en lugar de recibir 409 hasta que venza el TTL.
+    """
+    ahora = datetime.utcnow()
+    bloqueo = timedelta(seconds=current_app.config.get("IDEMPOTENCIA_BLOQUEO", BLOQUEO_POR_DEFECTO))
+    registro = ClaveIdempotencia.query.filter_by(ambito=ambito, clave=clave).first()
+    if registro and registro.expira_en <= ahora:
+        db.session.delete(registro)
+        db.session.commit()
+        registro = None
+
+    if registro is None:
+        ttl = current_app.config.get("IDEMPOTENCIA_TTL", TTL_POR_DEFECTO)
+        registro = ClaveIdempotencia(
+            ambito=ambito,
+            clave=clave,
+            hash_solicitud=hash_actual,
+            bloqueado_hasta=ahora + bloqueo,
+            expira_en=ahora + timedelta(seconds=ttl)
+        )
+        db.session.add(registro)
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            # Otra solicitud con la misma clave ganó la carrera
+            db.session.rollback()
+            registro = ClaveIdempotencia.query.filter_by(ambito=ambito, clave=clave).first()
+
+    if registro.hash_solicitud != hash_actual:
+        return jsonify({"msg": f"{CABECERA} ya fue usada con otra solicitud"}), 422
+    if registro.estado_http is None:
+        if _retomar_clave(registro, ahora, bloqueo):
+            logger.warning(f"[idempotente] Reserva vencida de {ambito} con clave {clave}: se retoma")
+            return None
+        return jsonify({"msg": "Solicitud con la misma Idempotency-Key en proceso"}), 409
+    return _respuesta_guardada(registro)
+
+
+def _retomar_clave(registro, ahora, bloqueo):
+    """Toma una reserva cuyo bloqueo venció; solo un reintento concurrente lo logra."""
+    anterior = registro.bloqueado_hasta
+    if anterior is not None and anterior > ahora:
+        return False
+    # UPDATE condicionado al bloqueo leído: si otro reintento lo renovó primero, no cambia filas
+    retomada = ClaveIdempotencia.query.filter(
+        ClaveIdempotencia.id == registro.id,
+        ClaveIdempotencia.estado_http.is_(None),
+        ClaveIdempotencia.bloqueado_hasta.is_(None) if anterior is None else ClaveIdempotencia.bloqueado_hasta == anterior
+    ).update({"bloqueado_hasta": ahora + bloqueo}, synchronize_session=False)
+    db.session.commit()
+    return retomada == 1
+
+
+def idempotente(func):
+    """Decorador: si llega Idempotency-Key, una repetición devuelve la respuesta guardada
+    sin volver a validar, descontar stock ni publicar eventos."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        clave = request.headers.get(CABECERA, "").strip()
+        if not clave:
+            return func(*args, **kwargs)
+        if len(clave) > 255:
+            return jsonify({"msg": f"{CABECERA} demasiado larga"}), 400
+
+        ambito = _ambito()
+        previa = _reservar_clave(ambito, clave, hash_solicitud())
+        if previa is not None:
+            logger.info(f"[idempotente] Repetición de {ambito} con clave {clave}")
+            return previa
+
+        try:
+            response = make_response(func(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            ClaveIdempotencia.query.filter_by(ambito=ambito, clave=clave).delete()
+            db.session.commit()
+            raise
+
+        registro = ClaveIdempotencia.query.filter_by(ambito=ambito, clave=clave).first()
+        if response.status_code >= 400:
+            # Los errores no se guardan: dependen del estado (p. ej. stock insuficiente)
+            # y el cliente puede reintentar con la misma clave cuando cambie
+            db.session.delete(registro)
+        else:
+            registro.estado_http = response.status_code
+            registro.cuerpo = response.get_data()
+            registro.mimetype = response.mimetype
+            registro.bloqueado_hasta = None
+        db.session.commit()
+        return response
+    return wrapper
+
+
+def purgar_claves_vencidas():
+    """Elimina las claves cuyo TTL ya venció. Devuelve cuántas se borraron."""
+    borradas = ClaveIdempotencia.query.filter(ClaveIdempotencia.expira_en <= datetime.utcnow()).delete()
+    db.session.commit()
+    return borradas
+
+
+_barrido = None
+_barrido_pid = None
+_barrido_lock = threading.Lock()
+
+
+def iniciar_barrido(app, intervalo=300):
+    """Hilo en segundo plano que purga periódicamente las claves vencidas.
+
+    Arranca uno por proceso aunque se llame varias veces (p. ej. desde cada
+    petición de un worker recién creado).
+    """
+    global _barrido, _barrido_pid
+
+    def barrer():
+        while True:
+            time.sleep(intervalo)
+            with app.app_context():
+                try:
+                    borradas = purgar_claves_vencidas()
+                    if borradas:
+                        logger.info(f"[barrido_idempotencia] {borradas} claves vencidas eliminadas")
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"[barrido_idempotencia] Error purgando claves: {e}")
+
+    with _barrido_lock:
+        if _barrido is None or _barrido_pid != os.getpid() or not _barrido.is_alive():
+            _barrido = threading.Thread(target=barrer, name="barrido-idempotencia", daemon=True)
+            _barrido_pid = os.getpid()
+            _barrido.start()
+        return _barrido
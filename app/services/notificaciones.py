@@ -0,0 +1,88 @@
+# LISTEN/NOTIFY de PostgreSQL: un hilo por proceso entrega cada canal a su función
+import logging
+import select
+import threading
+from flask import current_app
+from sqlalchemy import text
+from app.extensions import db
+
+logger = logging.getLogger("flask_backend")
+
+_funciones = {}  # canal -> función(payload)
+_hilo = None
+_lock = threading.Lock()
+
+
+def al_notificar(canal):
+    """Registra la función que recibe los payload del canal.
+
+    También se la llama con None cada vez que la escucha (re)conecta: pudo
+    haberse perdido alguna notificación mientras no había conexión.
+    """
+    def registrar(funcion):
+        _funciones[canal] = funcion
+        return funcion
+    return registrar
+
+
+def es_postgres(session=None):
+    return (session or db.session).get_bind().dialect.name == "postgresql"
+
+
+def notificar(session, canal, payload=""):
+    """pg_notify dentro de la transacción de `session`: llega solo si se confirma."""
+    session.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": canal, "payload": payload})
+
+
+def _entregar(app, canal, payload):
+    try:
+        with app.app_context():
+            _funciones[canal](payload)
+    except Exception as e:
+        logger.error(f"[notificaciones] Error procesando canal {canal}: {e}")
+
+
+def _escuchar(app):
+    conexion = None
+    while True:
+        try:
+            if conexion is None:
+                with app.app_context():
+                    conexion = db.engine.raw_connection()
+                conexion.driver_connection.autocommit = True
+                with conexion.cursor() as cursor:
+                    for canal in _funciones:
+                        cursor.execute(f"LISTEN {canal}")
+                for canal in _funciones:
+                    _entregar(app, canal, None)
+            pg = conexion.driver_connection
+            if select.select([pg], [], [], 30) == ([], [], []):
+                continue
+            pg.poll()
+            while pg.notifies:
+                notificacion = pg.notifies.pop(0)
+                if notificacion.channel in _funciones:
+                    _entregar(app, notificacion.channel, notificacion.payload)
+        except Exception as e:
+            logger.error(f"[notificaciones] Escucha de PostgreSQL interrumpida: {e}")
+            if conexion is not None:
+                try:
+                    conexion.invalidate()
+                except Exception:
+                    pass
+            conexion = None
+            threading.Event().wait(5)
+
+
+def iniciar_escucha():
+    """Arranca (una vez por proceso) el hilo de escucha; sin PostgreSQL no hace nada."""
+    global _hilo
+    if not es_postgres():
+        return
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(
+                target=_escuchar, args=(current_app._get_current_object(),),
+                name="escucha-postgres", daemon=True
+            )
+            _hilo.start()
@@ -0,0 +1,73 @@
+# Transactional outbox: los eventos se guardan junto con la compra y un relay los publica
+import json
+import logging
+import time
+from datetime import datetime
+from app.extensions import db
+from app.models.outbox import Outbox
+from app.services.stock import soporta_bloqueo_filas
+
+logger = logging.getLogger("flask_backend")
+
+
+def encolar_evento(cola, mensaje):
+    """Agrega el evento a la sesión actual; se confirma en el mismo commit que la compra."""
+    evento = Outbox(cola=cola, payload=json.dumps(mensaje))
+    db.session.add(evento)
+    return evento
+
+
+def drenar_outbox(publicador, lote=100):
+    """Publica un lote de eventos pendientes y los marca como enviados.
+
+    En PostgreSQL usa FOR UPDATE SKIP LOCKED para que varios relays puedan
+    trabajar en paralelo sin publicar el mismo evento dos veces. Si el broker
+    falla se detiene el lote (el orden se conserva) y se reintenta luego.
+    Devuelve la cantidad de eventos publicados.
+    """
+    query = (
+        Outbox.query
+        .filter(Outbox.enviado_en.is_(None))
+        .order_by(Outbox.id)
+        .limit(lote)
+    )
+    if soporta_bloqueo_filas():
+        query = query.with_for_update(skip_locked=True)
+
+    enviados = 0
+    for evento in query.all():
+        try:
+            publicador.publicar(evento.cola, evento.payload)
+        except Exception as e:
+            evento.intentos += 1
+            evento.ultimo_error = str(e)
+            logger.error(f"[drenar_outbox] Error publicando evento {evento.id}: {e}")
+            break
+        evento.enviado_en = datetime.utcnow()
+        evento.intentos += 1
+        enviados += 1
+
+    db.session.commit()
+    return enviados
+
+
+def ejecutar_relay(publicador, lote=100, intervalo=1.0, una_vez=False):
+    """Bucle del relay: drena lotes seguidos y espera cuando no quedan pendientes.
+
+    Con una_vez=True termina al vaciar la tabla y devuelve el total publicado.
+    """
+    total = 0
+    while True:
+        try:
+            enviados = drenar_outbox(publicador, lote=lote)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"[ejecutar_relay] Error drenando outbox: {e}")
+            enviados = 0
+        if enviados:
+            total += enviados
+            logger.info(f"[ejecutar_relay] {enviados} eventos publicados")
+        if enviados < lote:
+            if una_vez:
+                return total
+            time.sleep(intervalo)
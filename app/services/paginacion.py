@@ -0,0 +1,61 @@
+# Paginación por cursor (keyset): la página siguiente empieza después de la última fila vista
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, literal, tuple_
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def leer_limite(valor, por_defecto=LIMITE_POR_DEFECTO, maximo=LIMITE_MAXIMO):
+    """Tamaño de página pedido, acotado a [1, maximo]. ValueError si no es un entero."""
+    if valor in (None, ""):
+        return por_defecto
+    return max(1, min(int(valor), maximo))
+
+
+def codificar_cursor(valores):
+    crudo = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(crudo).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor, columnas):
+    """Valores del cursor convertidos al tipo de cada columna."""
+    try:
+        crudo = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(crudo, list) or len(crudo) != len(columnas):
+            raise CursorInvalido("Cursor inválido")
+        return [
+            datetime.fromisoformat(valor) if isinstance(columna.type, DateTime) else columna.type.python_type(valor)
+            for columna, valor in zip(columnas, crudo)
+        ]
+    except CursorInvalido:
+        raise
+    except (ValueError, TypeError):
+        raise CursorInvalido("Cursor inválido")
+
+
+def paginar(query, columnas, limite, cursor=None, descendente=True):
+    """Aplica orden y filtro keyset por `columnas` (la última debe ser única, p. ej. id).
+
+    Devuelve (filas, siguiente_cursor); siguiente_cursor es None en la última página.
+    Cada página cuesta lo mismo sin importar cuán lejos esté del inicio.
+    """
+    if cursor:
+        valores = decodificar_cursor(cursor, columnas)
+        clave = tuple_(*columnas)
+        limite_cursor = tuple_(*[literal(v, type_=c.type) for c, v in zip(columnas, valores)])
+        query = query.filter(clave < limite_cursor if descendente else clave > limite_cursor)
+    orden = [c.desc() if descendente else c.asc() for c in columnas]
+    filas = query.order_by(*orden).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor([getattr(filas[-1], c.key) for c in columnas])
+    return filas, siguiente
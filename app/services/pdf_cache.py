@@ -0,0 +1,144 @@
+# Caché en disco de PDFs de comprobantes, direccionada por contenido
+import hashlib
+import os
+import threading
+import time
+from flask import current_app
+from app.services.pdf_render import DIRECTORIO_ESTATICOS, HOJAS_PDF
+
+MAX_BYTES_POR_DEFECTO = 512 * 1024 * 1024  # 512MB
+INTERVALO_BARRIDO = 300  # segundos entre recorridos completos del directorio
+
+
+class CachePDF:
+    """Guarda cada PDF bajo el hash de (compra_id, versión de plantilla).
+
+    Una compra terminada no cambia, así que la clave sirve también como ETag.
+    El tamaño total se acota expulsando los archivos usados hace más tiempo
+    (LRU por mtime, que se actualiza en cada lectura).
+
+    Guardar no recorre el directorio: se lleva un total estimado y solo se
+    recorre (y se expulsa) cuando supera max_bytes o cada
+    `intervalo_barrido` segundos, que es cuando se ven los PDFs escritos
+    por otros procesos.
+    """
+
+    def __init__(self, directorio, max_bytes=MAX_BYTES_POR_DEFECTO, intervalo_barrido=INTERVALO_BARRIDO,
+                 reloj=time.monotonic):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.intervalo_barrido = intervalo_barrido
+        self.barridos = 0
+        self._reloj = reloj
+        self._lock = threading.Lock()          # total estimado
+        self._lock_barrido = threading.Lock()  # un solo recorrido a la vez
+        self._total = None                     # None hasta el primer recorrido
+        self._ultimo_barrido = None
+        os.makedirs(directorio, exist_ok=True)
+
+    @staticmethod
+    def clave(compra_id, version_plantilla):
+        return hashlib.sha256(f"{compra_id}:{version_plantilla}".encode()).hexdigest()
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def existe(self, clave):
+        return os.path.exists(self.ruta(clave))
+
+    def obtener(self, clave):
+        ruta = self.ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                pdf = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(ruta)  # marca como usado recientemente
+        except FileNotFoundError:
+            pass
+        return pdf
+
+    def guardar(self, clave, pdf):
+        ruta = self.ruta(clave)
+        try:
+            anterior = os.path.getsize(ruta)
+        except FileNotFoundError:
+            anterior = 0
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(pdf)
+        os.replace(temporal, ruta)  # escritura atómica
+
+        with self._lock:
+            if self._total is not None:
+                self._total += len(pdf) - anterior
+            pendiente = (
+                self._total is None
+                or self._total > self.max_bytes
+                or self._reloj() - self._ultimo_barrido >= self.intervalo_barrido
+            )
+        # Si otro hilo ya está recorriendo el directorio, su resultado basta
+        if pendiente and self._lock_barrido.acquire(blocking=False):
+            try:
+                self._expulsar()
+            finally:
+                self._lock_barrido.release()
+
+    def expulsar(self):
+        """Elimina los PDFs menos usados hasta quedar dentro de max_bytes."""
+        with self._lock_barrido:
+            return self._expulsar()
+
+    def _expulsar(self):
+        archivos = []
+        total = 0
+        for entrada in os.scandir(self.directorio):
+            if not entrada.name.endswith(".pdf"):
+                continue
+            try:
+                info = entrada.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, entrada.path))
+            total += info.st_size
+
+        archivos.sort()
+        for _, tamano, ruta in archivos:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except FileNotFoundError:
+                pass
+
+        with self._lock:
+            self._total = total
+            self._ultimo_barrido = self._reloj()
+            self.barridos += 1
+        return total
+
+
+def version_plantilla(nombre):
+    """Hash corto de la plantilla y de las hojas de estilo del PDF; cambia si se edita el diseño."""
+    versiones = current_app.extensions.setdefault("versiones_plantilla_pdf", {})
+    if nombre not in versiones:
+        fuente, _, _ = current_app.jinja_loader.get_source(current_app.jinja_env, nombre)
+        h = hashlib.sha256(fuente.encode())
+        for hoja in HOJAS_PDF:
+            with open(os.path.join(DIRECTORIO_ESTATICOS, hoja), "rb") as f:
+                h.update(f.read())
+        versiones[nombre] = h.hexdigest()[:16]
+    return versiones[nombre]
+
+
+def obtener_cache_pdf():
+    """Caché del proceso, configurada con PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES y PDF_CACHE_INTERVALO_BARRIDO."""
+    cache = current_app.extensions.get("cache_pdf")
+    if cache is None:
+        directorio = current_app.config.get("PDF_CACHE_DIR") or os.path.join(current_app.instance_path, "pdf_cache")
+        max_bytes = current_app.config.get("PDF_CACHE_MAX_BYTES", MAX_BYTES_POR_DEFECTO)
+        intervalo = current_app.config.get("PDF_CACHE_INTERVALO_BARRIDO", INTERVALO_BARRIDO)
+        cache = current_app.extensions["cache_pdf"] = CachePDF(directorio, max_bytes, intervalo)
+    return cache
@@ -0,0 +1,192 @@
+# Pool de procesos dedicado al renderizado de PDFs con WeasyPrint
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from app.services.pdf_render import obtener_contexto
+
+logger = logging.getLogger("flask_backend")
+
+HTML_CALENTAMIENTO = "<html><body style='font-family: Arial, sans-serif'><p>S/. 0.00</p></body></html>"
+
+
+class ColaPDFLlena(Exception):
+    """Hay demasiados PDFs pendientes; el cliente debe reintentar más tarde."""
+
+
+class TiempoAgotadoPDF(Exception):
+    """El renderizado superó el tiempo máximo configurado."""
+
+
+def _inicializar_worker():
+    # Se ejecuta una vez por proceso: importa WeasyPrint, parsea CSS y carga fuentes
+    obtener_contexto().renderizar(HTML_CALENTAMIENTO)
+
+
+def _renderizar(html):
+    return obtener_contexto().renderizar(html)
+
+
+def _listo():
+    return os.getpid()
+
+
+def _procesos(executor):
+    """Procesos vivos de `executor`, o [] si esta versión de Python no los expone.
+
+    ProcessPoolExecutor no tiene API pública para sus procesos; se lee el
+    atributo privado _processes (dict pid -> Process) con cuidado.
+    """
+    procesos = getattr(executor, "_processes", None)
+    if not isinstance(procesos, dict):
+        return []
+    return [p for p in list(procesos.values()) if hasattr(p, "kill")]
+
+
+def detener_executor(executor):
+    """Cancela lo pendiente de `executor` y mata sus procesos si puede.
+
+    Devuelve False si no pudo matarlos: un render colgado sigue hasta
+    terminar (o hasta el fin del worker), pero ya fuera del pool en uso.
+    """
+    procesos = _procesos(executor)
+    for proceso in procesos:
+        try:
+            proceso.kill()
+        except Exception as e:
+            logger.warning(f"[PoolPDF] No se pudo matar el proceso {getattr(proceso, 'pid', '?')}: {e}")
+    executor.shutdown(wait=False, cancel_futures=True)
+    return bool(procesos)
+
+
+class PoolPDF:
+    """ProcessPoolExecutor acotado: tamaño fijo, límite de trabajos pendientes
+    y timeout por trabajo, para que el renderizado (CPU y GIL) no bloquee al
+    worker web.
+
+    Un trabajo que ya empezó no se puede cancelar: si agota el timeout se
+    reemplaza el pool y se matan sus procesos, para que un render colgado no
+    ocupe un proceso (y un cupo) para siempre.
+    """
+
+    def __init__(self, procesos=2, max_pendientes=16, timeout=30, inicializador=_inicializar_worker,
+                 contexto="spawn"):
+        self.procesos = procesos
+        self.timeout = timeout
+        self.reciclados = 0
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+        self._inicializador = inicializador
+        self._contexto = multiprocessing.get_context(contexto)
+        self._lock = threading.Lock()
+        self._executor = self._nuevo_executor()
+
+    def _nuevo_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.procesos,
+            mp_context=self._contexto,
+            initializer=self._inicializador
+        )
+
+    def _reciclar(self, executor):
+        """Reemplaza `executor` (si sigue siendo el actual) y mata sus procesos.
+
+        Los demás trabajos que corrían en él terminan con BrokenProcessPool y
+        se reintentan una vez en el pool nuevo.
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = nuevo = self._nuevo_executor()
+            self.reciclados += 1
+        # Los procesos nuevos arrancan ya, no con el próximo PDF
+        for _ in range(self.procesos):
+            nuevo.submit(_listo)
+        if detener_executor(executor):
+            logger.warning("[PoolPDF] Render colgado: pool de procesos reciclado")
+        else:
+            logger.warning("[PoolPDF] Render colgado: pool reemplazado; el proceso anterior termina por su cuenta")
+
+    def calentar(self):
+        """Arranca todos los procesos para que el primer PDF no pague el import."""
+        futuros = [self._executor.submit(_listo) for _ in range(self.procesos)]
+        return {f.result() for f in futuros}
+
+    def ejecutar(self, funcion, *args):
+        if not self._cupos.acquire(blocking=False):
+            raise ColaPDFLlena("Cola de PDFs llena")
+        try:
+            return self._ejecutar(funcion, args, reintentar=True)
+        finally:
+            self._cupos.release()
+
+    def _ejecutar(self, funcion, args, reintentar):
+        executor = self._executor
+        try:
+            futuro = executor.submit(funcion, *args)
+        except RuntimeError:
+            # Se recicló entre leer el executor y enviar el trabajo
+            if reintentar and self._executor is not executor:
+                return self._ejecutar(funcion, args, reintentar=False)
+            raise
+        try:
+            return futuro.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            if not futuro.cancel():
+                self._reciclar(executor)
+            raise TiempoAgotadoPDF(f"El PDF no se generó en {self.timeout} s")
+        except BrokenProcessPool:
+            # Otro trabajo colgado hizo reciclar el pool mientras este corría
+            if reintentar and self._executor is not executor:
+                return self._ejecutar(funcion, args, reintentar=False)
+            raise
+
+    def renderizar(self, html):
+        return self.ejecutar(_renderizar, html)
+
+    def cerrar(self):
+        with self._lock:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool_pdf():
+    """Pool del worker actual, configurado con PDF_POOL_PROCESOS, PDF_POOL_MAX_PENDIENTES
+    y PDF_POOL_TIMEOUT. Con PDF_POOL_PROCESOS=0 se renderiza en el mismo proceso."""
+    global _pool, _pool_pid
+    procesos = current_app.config.get("PDF_POOL_PROCESOS", 2)
+    if not procesos:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = PoolPDF(
+                procesos=procesos,
+                max_pendientes=current_app.config.get("PDF_POOL_MAX_PENDIENTES", 16),
+                timeout=current_app.config.get("PDF_POOL_TIMEOUT", 30)
+            )
+            _pool_pid = os.getpid()
+            _pool.calentar()
+            logger.info(f"[obtener_pool_pdf] Pool de {procesos} procesos listo")
+        return _pool
+
+
+def renderizar_en(pool, html):
+    """Renderiza en `pool` o, si es None, en el proceso actual.
+
+    No toca current_app: sirve en hilos sin contexto de aplicación si el pool
+    se obtuvo antes con obtener_pool_pdf().
+    """
+    if pool is None:
+        return _renderizar(html)
+    return pool.renderizar(html)
+
+
+def renderizar_pdf(html):
+    """Renderiza en el pool si está habilitado; si no, en el proceso actual."""
+    return renderizar_en(obtener_pool_pdf(), html)
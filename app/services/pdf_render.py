@@ -0,0 +1,84 @@
+# Contexto de renderizado de WeasyPrint compartido por todo el proceso
+import mimetypes
+import os
+import posixpath
+import threading
+
+DIRECTORIO_ESTATICOS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+BASE_ESTATICOS = "http://estaticos.local/"
+HOJAS_PDF = ("pdf/comprobante.css",)
+
+
+class CacheEstaticos:
+    """url_fetcher que sirve app/static desde memoria en lugar de pedirlo por HTTP.
+
+    Cada archivo se lee de disco una sola vez por proceso. Las URLs fuera de
+    BASE_ESTATICOS se delegan al fetcher de respaldo (por defecto el de WeasyPrint).
+    """
+
+    def __init__(self, directorio=DIRECTORIO_ESTATICOS, respaldo=None):
+        self.directorio = os.path.abspath(directorio)
+        self.respaldo = respaldo
+        self._archivos = {}
+        self._lock = threading.Lock()
+
+    def leer(self, ruta):
+        ruta = posixpath.normpath(ruta.lstrip("/"))
+        if ruta.startswith("..") or os.path.isabs(ruta):
+            raise ValueError(f"Ruta fuera de static: {ruta}")
+        with self._lock:
+            if ruta not in self._archivos:
+                with open(os.path.join(self.directorio, ruta), "rb") as f:
+                    self._archivos[ruta] = f.read()
+            return self._archivos[ruta]
+
+    def __call__(self, url, *args, **kwargs):
+        if url.startswith(BASE_ESTATICOS):
+            ruta = url[len(BASE_ESTATICOS):].split("?", 1)[0].split("#", 1)[0]
+            return {
+                "string": self.leer(ruta),
+                "mime_type": mimetypes.guess_type(ruta)[0] or "application/octet-stream",
+                "redirected_url": url,
+            }
+        respaldo = self.respaldo
+        if respaldo is None:
+            from weasyprint.urls import default_url_fetcher as respaldo
+        return respaldo(url, *args, **kwargs)
+
+
+class ContextoRender:
+    """FontConfiguration, hojas de estilo ya parseadas y fetcher en memoria,
+    creados una vez por proceso: cada PDF solo paga el layout."""
+
+    def __init__(self, directorio=DIRECTORIO_ESTATICOS, hojas=HOJAS_PDF):
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.url_fetcher = CacheEstaticos(directorio)
+        self.font_config = FontConfiguration()
+        self.hojas = [
+            CSS(
+                string=self.url_fetcher.leer(hoja).decode("utf-8"),
+                base_url=BASE_ESTATICOS + hoja,
+                url_fetcher=self.url_fetcher,
+                font_config=self.font_config
+            )
+            for hoja in hojas
+        ]
+
+    def renderizar(self, html):
+        from weasyprint import HTML
+        documento = HTML(string=html, base_url=BASE_ESTATICOS, url_fetcher=self.url_fetcher)
+        return documento.write_pdf(stylesheets=self.hojas, font_config=self.font_config)
+
+
+_contexto = None
+_contexto_lock = threading.Lock()
+
+
+def obtener_contexto():
+    global _contexto
+    with _contexto_lock:
+        if _contexto is None:
+            _contexto = ContextoRender()
+        return _contexto
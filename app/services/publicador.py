@@ -0,0 +1,97 @@
+# Publicador persistente de mensajes de comprobantes hacia RabbitMQ
+import json
+import os
+import threading
+import pika
+from pika.exceptions import AMQPError, AMQPConnectionError, ChannelClosed, ChannelWrongStateError
+
+COLAS_COMPROBANTE = {"boleta": "cola_boletas", "factura": "cola_facturas"}
+
+
+class PublicadorRabbit:
+    """Mantiene una conexión y un canal abiertos por proceso.
+
+    Las colas se declaran una sola vez por canal, el canal usa publisher
+    confirms y, si la conexión se cae, se reconecta y reintenta una vez.
+    """
+
+    def __init__(self, host=None, port=5672, usuario="guest", clave="guest", conexion_factory=None):
+        self.parametros = pika.ConnectionParameters(
+            host=host or os.getenv("RABBITMQ_HOST", "rabbitmq"),
+            port=port,
+            credentials=pika.PlainCredentials(usuario, clave),
+            heartbeat=60,
+        )
+        self.conexion_factory = conexion_factory or pika.BlockingConnection
+        self._conexion = None
+        self._canal = None
+        self._colas_declaradas = set()
+        self._lock = threading.Lock()
+
+    def _obtener_canal(self):
+        if self._conexion is None or not self._conexion.is_open:
+            self._conexion = self.conexion_factory(self.parametros)
+            self._canal = None
+        if self._canal is None or not self._canal.is_open:
+            self._canal = self._conexion.channel()
+            self._canal.confirm_delivery()
+            self._colas_declaradas.clear()
+        # Atiende heartbeats pendientes de la conexión ociosa
+        self._conexion.process_data_events(time_limit=0)
+        return self._canal
+
+    def _declarar(self, canal, cola):
+        if cola not in self._colas_declaradas:
+            canal.queue_declare(queue=cola, durable=True)
+            self._colas_declaradas.add(cola)
+
+    def _enviar(self, cola, cuerpo):
+        canal = self._obtener_canal()
+        self._declarar(canal, cola)
+        canal.basic_publish(
+            exchange="",
+            routing_key=cola,
+            body=cuerpo,
+            properties=pika.BasicProperties(delivery_mode=2),
+            mandatory=True
+        )
+
+    def publicar(self, cola, mensaje):
+        """Publica un mensaje persistente; lanza AMQPError si el broker no lo confirma (nack/unroutable)."""
+        cuerpo = mensaje if isinstance(mensaje, (bytes, str)) else json.dumps(mensaje)
+        with self._lock:
+            try:
+                self._enviar(cola, cuerpo)
+            except (AMQPConnectionError, ChannelClosed, ChannelWrongStateError):
+                # Conexión rota o canal cerrado: se reconecta una vez
+                self._descartar()
+                self._enviar(cola, cuerpo)
+
+    def _descartar(self):
+        try:
+            if self._conexion is not None and self._conexion.is_open:
+                self._conexion.close()
+        except AMQPError:
+            pass
+        self._conexion = None
+        self._canal = None
+        self._colas_declaradas.clear()
+
+    def cerrar(self):
+        with self._lock:
+            self._descartar()
+
+
+_publicador = None
+_publicador_pid = None
+_publicador_lock = threading.Lock()
+
+
+def obtener_publicador():
+    """Devuelve el publicador del worker actual (uno por proceso tras el fork de gunicorn)."""
+    global _publicador, _publicador_pid
+    with _publicador_lock:
+        if _publicador is None or _publicador_pid != os.getpid():
+            _publicador = PublicadorRabbit()
+            _publicador_pid = os.getpid()
+        return _publicador
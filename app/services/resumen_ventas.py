@@ -0,0 +1,298 @@
+# Resumen horario de ventas: se acumula en la misma transacción que la compra y el dashboard lee de él
+from collections import defaultdict
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import delete, func, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.estado_resumen_ventas import EstadoResumenVentas
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.resumen_ventas import ResumenVentaHora
+from app.models.tipo_comprobante import TipoComprobante
+from app.services.cache import CacheTTL
+from app.services.fechas import a_local, a_utc, desfase_minutos
+from app.services import ventas_agregadas
+from app.services.ventas_agregadas import a_datetime, expresion_bucket, rellenar_serie
+
+CLAVE = ("hora", "tipo_comprobante_id", "producto_id", "marca", "categoria_id")
+ACUMULADOS = ("monto", "cantidad", "ventas")
+DIMENSIONES = ("producto", "marca", "categoria")
+TTL_CORTE = 60
+
+
+def truncar_hora(fecha):
+    return fecha.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert():
+    """INSERT ... ON CONFLICT (clave) DO UPDATE que suma los acumulados."""
+    tabla = ResumenVentaHora.__table__
+    if db.session.get_bind().dialect.name == "sqlite":
+        sentencia = sqlite.insert(tabla)
+    else:
+        sentencia = postgresql.insert(tabla)
+    return sentencia.on_conflict_do_update(
+        index_elements=list(CLAVE),
+        set_={col: tabla.c[col] + sentencia.excluded[col] for col in ACUMULADOS}
+    )
+
+
+def _escribir(acumulado):
+    # Orden fijo de claves: dos compras concurrentes bloquean las filas en el mismo orden
+    if not acumulado:
+        return
+    db.session.execute(_upsert(), [
+        dict(zip(CLAVE, clave), **dict(zip(ACUMULADOS, valores)))
+        for clave, valores in sorted(acumulado.items())
+    ])
+
+
+def acumular_ventas(fecha_venta, tipo_comprobante_id, lineas):
+    """Suma las líneas de una compra al resumen horario, sin hacer commit.
+
+    `lineas` es una lista de (producto, cantidad), igual que en registrar_lineas;
+    la marca y la categoría se toman del producto al momento de la venta. Todas
+    las líneas se escriben con un único upsert.
+    """
+    acumulado = defaultdict(lambda: [0.0, 0, 0])
+    for producto, cantidad in lineas:
+        clave = (
+            truncar_hora(fecha_venta),
+            tipo_comprobante_id or 0,
+            producto.id,
+            producto.marca or "",
+            producto.categoria_id or 0
+        )
+        valores = acumulado[clave]
+        valores[0] += producto.precio * cantidad
+        valores[1] += cantidad
+        valores[2] += 1
+    _escribir(acumulado)
+
+
+def reconstruir_resumen(lote=1000):
+    """Recalcula todo el resumen desde historial_ventas y hace commit.
+
+    En PostgreSQL bloquea la tabla en modo EXCLUSIVE: las compras que llegan
+    durante la reconstrucción esperan y se suman después, sin perderse ni
+    contarse dos veces. Al terminar el resumen queda completo desde el
+    principio y el dashboard deja de leer historial_ventas. Devuelve la
+    cantidad de filas escritas.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(text("LOCK TABLE resumen_ventas_hora IN EXCLUSIVE MODE"))
+    db.session.execute(delete(ResumenVentaHora))
+
+    columnas = [
+        expresion_bucket(HistorialVenta.fecha_venta, "hora", 0),
+        func.coalesce(HistorialVenta.tipo_comprobante_id, 0),
+        func.coalesce(HistorialVenta.producto_id, 0),
+        func.coalesce(Producto.marca, ""),
+        func.coalesce(Producto.categoria_id, 0),
+    ]
+    query = (
+        db.session.query(
+            *columnas,
+            func.sum(HistorialVenta.total_venta),
+            func.sum(HistorialVenta.cantidad),
+            func.count(HistorialVenta.id)
+        )
+        .outerjoin(Producto, HistorialVenta.producto_id == Producto.id)
+        .filter(HistorialVenta.fecha_venta.isnot(None))
+        .group_by(*columnas)
+    )
+
+    escritas = 0
+    pendientes = {}
+    for hora, tipo, producto_id, marca, categoria_id, monto, cantidad, ventas in query.yield_per(lote):
+        clave = (a_datetime(hora), int(tipo), int(producto_id), marca, int(categoria_id))
+        pendientes[clave] = (float(monto or 0), int(cantidad or 0), int(ventas))
+        if len(pendientes) >= lote:
+            _escribir(pendientes)
+            escritas += len(pendientes)
+            pendientes = {}
+    _escribir(pendientes)
+    escritas += len(pendientes)
+
+    resultado = db.session.execute(update(EstadoResumenVentas).where(EstadoResumenVentas.id == 1).values(completo_desde=None))
+    if resultado.rowcount == 0:
+        db.session.add(EstadoResumenVentas(id=1, completo_desde=None))
+    db.session.commit()
+    _cache_corte().invalidar()
+    return escritas
+
+
+# ---------- Lectura: resumen desde que está completo, historial_ventas antes ----------
+
+def _cache_corte():
+    cache = current_app.extensions.get("corte_resumen_ventas")
+    if cache is None:
+        cache = current_app.extensions["corte_resumen_ventas"] = CacheTTL(TTL_CORTE)
+    return cache
+
+
+def corte_resumen():
+    """Hora local (naive) desde la que el resumen tiene todas las ventas.
+
+    None si las tiene todas (tras reconstruir_resumen). La hora en que empezó
+    a mantenerse quedó incompleta, así que el corte es la hora siguiente.
+    Sin fila de estado no se confía en el resumen: se devuelve False.
+
+    Se guarda TTL_CORTE segundos por proceso: el corte solo retrocede (con el
+    backfill) y mientras tanto leer del historial da el mismo resultado.
+    """
+    return _cache_corte().obtener("corte", _leer_corte)
+
+
+def _leer_corte():
+    fila = db.session.query(EstadoResumenVentas.completo_desde).filter_by(id=1).first()
+    if fila is None:
+        return False
+    if fila.completo_desde is None:
+        return None
+    corte = truncar_hora(fila.completo_desde)
+    if corte < fila.completo_desde:
+        corte += timedelta(hours=1)
+    return a_local(corte)
+
+
+def _tramos(inicio_local, fin_local):
+    """(tramo_historial, tramo_resumen) de [inicio_local, fin_local); None si el tramo queda vacío."""
+    corte = corte_resumen()
+    if corte is None or (corte is not False and corte <= inicio_local):
+        return None, (inicio_local, fin_local)
+    if corte is False or corte >= fin_local:
+        return (inicio_local, fin_local), None
+    return (inicio_local, corte), (corte, fin_local)
+
+
+def _sumar(*partes):
+    """Une listas de (clave, *números) sumando las de igual clave; ordenadas por clave."""
+    suma = {}
+    for filas in partes:
+        for clave, *valores in filas:
+            previos = suma.get(clave)
+            suma[clave] = valores if previos is None else [a + b for a, b in zip(previos, valores)]
+    return [(clave, *valores) for clave, valores in sorted(suma.items())]
+
+
+def _filtro_rango(query, inicio_local, fin_local):
+    return query.filter(
+        ResumenVentaHora.hora >= a_utc(inicio_local),
+        ResumenVentaHora.hora < a_utc(fin_local)
+    )
+
+
+def serie_ventas(inicio_local, fin_local, granularidad):
+    """Como ventas_agregadas.serie_ventas, pero leyendo del resumen horario.
+
+    La granularidad mínima es la hora. Devuelve [(inicio_bucket_local, monto, cantidad, ventas)].
+    """
+    if granularidad == "minuto":
+        raise ValueError("El resumen de ventas no tiene granularidad de minutos")
+    historial, resumen = _tramos(inicio_local, fin_local)
+    return _sumar(
+        ventas_agregadas.serie_ventas(*historial, granularidad) if historial else [],
+        _serie_resumen(*resumen, granularidad) if resumen else []
+    )
+
+
+def _serie_resumen(inicio_local, fin_local, granularidad):
+    bucket = expresion_bucket(ResumenVentaHora.hora, granularidad, desfase_minutos(inicio_local))
+    query = db.session.query(
+        bucket.label("bucket"),
+        func.sum(ResumenVentaHora.monto),
+        func.sum(ResumenVentaHora.cantidad),
+        func.sum(ResumenVentaHora.ventas)
+    )
+    query = _filtro_rango(query, inicio_local, fin_local).group_by(bucket).order_by(bucket)
+    return [
+        (a_datetime(b), float(monto or 0), int(cantidad or 0), int(ventas or 0))
+        for b, monto, cantidad, ventas in query.all()
+    ]
+
+
+def serie_densa(inicio_local, fin_local, granularidad):
+    """Serie con todos los buckets de [inicio_local, fin_local), en cero los que no tienen ventas.
+
+    Desde la hora en adelante se lee del resumen; por minuto, de historial_ventas.
+    """
+    if granularidad == "minuto":
+        serie = ventas_agregadas.serie_ventas(inicio_local, fin_local, granularidad)
+    else:
+        serie = serie_ventas(inicio_local, fin_local, granularidad)
+    return rellenar_serie(serie, inicio_local, fin_local, granularidad)
+
+
+def totales_por_comprobante(inicio_local, fin_local):
+    """[(nombre_comprobante, monto, ventas)] en el rango, ordenado por nombre."""
+    historial, resumen = _tramos(inicio_local, fin_local)
+    return _sumar(
+        ventas_agregadas.totales_por_comprobante(*historial) if historial else [],
+        _totales_por_comprobante_resumen(*resumen) if resumen else []
+    )
+
+
+def _totales_por_comprobante_resumen(inicio_local, fin_local):
+    query = (
+        db.session.query(
+            TipoComprobante.nombre,
+            func.sum(ResumenVentaHora.monto),
+            func.sum(ResumenVentaHora.ventas)
+        )
+        .select_from(ResumenVentaHora)
+        .join(TipoComprobante, ResumenVentaHora.tipo_comprobante_id == TipoComprobante.id)
+    )
+    query = _filtro_rango(query, inicio_local, fin_local)
+    query = query.group_by(TipoComprobante.nombre).order_by(TipoComprobante.nombre)
+    return [(nombre, float(monto or 0), int(ventas or 0)) for nombre, monto, ventas in query.all()]
+
+
+def totales_por_dimension(inicio_local, fin_local, dimension):
+    """[(nombre, monto, cantidad)] por producto, marca o categoría en el rango, ordenado por nombre.
+
+    En el tramo leído de historial_ventas la marca y la categoría son las
+    actuales del producto.
+    """
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"Dimensión inválida: {dimension}")
+    historial, resumen = _tramos(inicio_local, fin_local)
+    return _sumar(
+        _totales_por_dimension_historial(*historial, dimension) if historial else [],
+        _totales_por_dimension_resumen(*resumen, dimension) if resumen else []
+    )
+
+
+def _totales_por_dimension_historial(inicio_local, fin_local, dimension):
+    nombre = {"producto": Producto.nombre, "marca": Producto.marca, "categoria": Categoria.nombre}[dimension]
+    query = db.session.query(nombre).select_from(HistorialVenta).join(Producto, HistorialVenta.producto_id == Producto.id)
+    if dimension == "categoria":
+        query = query.join(Categoria, Producto.categoria_id == Categoria.id)
+    elif dimension == "marca":
+        query = query.filter(nombre.isnot(None), nombre != "")
+    query = query.add_columns(func.sum(HistorialVenta.total_venta), func.sum(HistorialVenta.cantidad)).filter(
+        HistorialVenta.fecha_venta >= a_utc(inicio_local),
+        HistorialVenta.fecha_venta < a_utc(fin_local)
+    )
+    query = query.group_by(nombre).order_by(nombre)
+    return [(n, float(monto or 0), int(cantidad or 0)) for n, monto, cantidad in query.all()]
+
+
+def _totales_por_dimension_resumen(inicio_local, fin_local, dimension):
+    if dimension == "producto":
+        nombre = Producto.nombre
+        query = db.session.query(nombre).select_from(ResumenVentaHora).join(Producto, ResumenVentaHora.producto_id == Producto.id)
+    elif dimension == "marca":
+        nombre = ResumenVentaHora.marca
+        query = db.session.query(nombre).filter(nombre != "")
+    elif dimension == "categoria":
+        nombre = Categoria.nombre
+        query = db.session.query(nombre).select_from(ResumenVentaHora).join(Categoria, ResumenVentaHora.categoria_id == Categoria.id)
+    else:
+        raise ValueError(f"Dimensión inválida: {dimension}")
+
+    query = query.add_columns(func.sum(ResumenVentaHora.monto), func.sum(ResumenVentaHora.cantidad))
+    query = _filtro_rango(query, inicio_local, fin_local).group_by(nombre).order_by(nombre)
+    return [(n, float(monto or 0), int(cantidad or 0)) for n, monto, cantidad in query.all()]
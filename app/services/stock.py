@@ -0,0 +1,63 @@
+# Acceso a productos y stock en el flujo de compra
+from sqlalchemy import case, update
+from app.extensions import db
+from app.models.producto import Producto
+
+
+def soporta_bloqueo_filas():
+    """SQLite no tiene SELECT ... FOR UPDATE; bloquea la base completa al escribir."""
+    return db.session.get_bind().dialect.name != "sqlite"
+
+
+def cargar_productos(ids, bloquear=True):
+    """Carga todos los productos del carrito en una sola consulta.
+
+    En PostgreSQL las filas quedan bloqueadas (FOR UPDATE) hasta el commit,
+    ordenadas por id para evitar deadlocks entre compras simultáneas.
+    Devuelve un diccionario {producto_id: Producto}.
+    """
+    ids = sorted(set(ids))
+    if not ids:
+        return {}
+
+    query = Producto.query.filter(Producto.id.in_(ids)).order_by(Producto.id)
+    if bloquear and soporta_bloqueo_filas():
+        query = query.with_for_update()
+
+    return {producto.id: producto for producto in query.all()}
+
+
+def reservar_stock(cantidades):
+    """Descuenta stock de forma atómica sin leer-modificar-escribir en Python.
+
+    Recibe {producto_id: cantidad} y emite un único
+    UPDATE productos SET stock = stock - n WHERE id = :id AND stock >= n
+    para todas las líneas, de modo que dos workers nunca vendan la misma unidad.
+    Devuelve la lista de producto_id que no pudieron reservarse; si no está
+    vacía, quien llama debe hacer rollback de la transacción.
+    """
+    cantidades = {int(pid): int(n) for pid, n in cantidades.items()}
+    if not cantidades:
+        return []
+
+    invalidos = sorted(pid for pid, n in cantidades.items() if n <= 0)
+    if invalidos:
+        return invalidos
+
+    tabla = Producto.__table__
+    descuento = case(cantidades, value=tabla.c.id)
+    stmt = (
+        update(tabla)
+        .where(tabla.c.id.in_(cantidades.keys()))
+        .where(tabla.c.stock >= descuento)
+        .values(stock=tabla.c.stock - descuento)
+        .returning(tabla.c.id)
+    )
+    reservados = {fila.id for fila in db.session.execute(stmt)}
+
+    # Los objetos Producto ya cargados en la sesión tienen el stock anterior
+    for obj in db.session.identity_map.values():
+        if isinstance(obj, Producto) and obj.id in reservados:
+            db.session.expire(obj, ["stock"])
+
+    return sorted(set(cantidades) - reservados)
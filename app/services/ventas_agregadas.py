@@ -0,0 +1,144 @@
+# Agregaciones de ventas calculadas en SQL (GROUP BY) sobre un rango de fecha_venta
+from datetime import datetime, timedelta
+from sqlalchemy import func, literal_column
+from app.extensions import db
+from app.models.historial_ventas import HistorialVenta
+from app.models.tipo_comprobante import TipoComprobante
+from app.services.fechas import a_utc, desfase_minutos, inicio_dia
+
+GRANULARIDADES = ("minuto", "hora", "dia", "semana", "mes")
+
+_UNIDADES_POSTGRES = {"minuto": "minute", "hora": "hour", "dia": "day", "semana": "week", "mes": "month"}
+
+# strftime de SQLite: formato del inicio del bucket y modificadores extra
+_FORMATOS_SQLITE = {
+    "minuto": ("%Y-%m-%d %H:%M:00", ()),
+    "hora": ("%Y-%m-%d %H:00:00", ()),
+    "dia": ("%Y-%m-%d 00:00:00", ()),
+    "semana": ("%Y-%m-%d 00:00:00", ("weekday 0", "-6 days")),  # lunes de la semana
+    "mes": ("%Y-%m-01 00:00:00", ()),
+}
+
+
+def expresion_bucket(columna, granularidad, desfase):
+    """Expresión SQL con el inicio (hora local) del bucket de `columna`.
+
+    `desfase` son los minutos a sumar a la fecha UTC para pasarla a hora local.
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida: {granularidad}")
+    desfase = int(desfase)
+    if db.session.get_bind().dialect.name == "sqlite":
+        formato, modificadores = _FORMATOS_SQLITE[granularidad]
+        return func.strftime(formato, columna, f"{desfase:+d} minutes", *modificadores)
+    local = columna + literal_column(f"interval '{desfase} minutes'")
+    return func.date_trunc(_UNIDADES_POSTGRES[granularidad], local)
+
+
+def a_datetime(valor):
+    """Inicio de bucket devuelto por la base (texto en SQLite) -> datetime naive."""
+    if isinstance(valor, str):
+        return datetime.strptime(valor, "%Y-%m-%d %H:%M:%S")
+    return valor.replace(tzinfo=None) if valor is not None else None
+
+
+def _filtro_rango(query, inicio_local, fin_local, cliente_id=None):
+    query = query.filter(
+        HistorialVenta.fecha_venta >= a_utc(inicio_local),
+        HistorialVenta.fecha_venta < a_utc(fin_local)
+    )
+    if cliente_id is not None:
+        query = query.filter(HistorialVenta.cliente_id == cliente_id)
+    return query
+
+
+def serie_ventas(inicio_local, fin_local, granularidad, cliente_id=None):
+    """Montos por bucket en [inicio_local, fin_local).
+
+    Devuelve una lista ordenada de (inicio_bucket_local, monto, cantidad, ventas);
+    solo aparecen los buckets con ventas.
+    """
+    bucket = expresion_bucket(HistorialVenta.fecha_venta, granularidad, desfase_minutos(inicio_local))
+    query = db.session.query(
+        bucket.label("bucket"),
+        func.sum(HistorialVenta.total_venta),
+        func.sum(HistorialVenta.cantidad),
+        func.count(HistorialVenta.id)
+    )
+    query = _filtro_rango(query, inicio_local, fin_local, cliente_id).group_by(bucket).order_by(bucket)
+    return [
+        (a_datetime(b), float(monto or 0), int(cantidad or 0), int(ventas))
+        for b, monto, cantidad, ventas in query.all()
+    ]
+
+
+def totales_por_comprobante(inicio_local, fin_local, cliente_id=None):
+    """[(nombre_comprobante, monto, ventas)] en el rango, ordenado por nombre."""
+    query = (
+        db.session.query(
+            TipoComprobante.nombre,
+            func.sum(HistorialVenta.total_venta),
+            func.count(HistorialVenta.id)
+        )
+        .join(TipoComprobante, HistorialVenta.tipo_comprobante_id == TipoComprobante.id)
+    )
+    query = _filtro_rango(query, inicio_local, fin_local, cliente_id)
+    query = query.group_by(TipoComprobante.nombre).order_by(TipoComprobante.nombre)
+    return [(nombre, float(monto or 0), int(ventas)) for nombre, monto, ventas in query.all()]
+
+
+_PASOS = {"minuto": timedelta(minutes=1), "hora": timedelta(hours=1), "dia": timedelta(days=1), "semana": timedelta(weeks=1)}
+
+
+def truncar(fecha, granularidad):
+    """Inicio del bucket que contiene `fecha` (misma regla que expresion_bucket)."""
+    if granularidad == "minuto":
+        return fecha.replace(second=0, microsecond=0)
+    if granularidad == "hora":
+        return fecha.replace(minute=0, second=0, microsecond=0)
+    dia = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularidad == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if granularidad == "mes":
+        return dia.replace(day=1)
+    return dia
+
+
+def siguiente_bucket(inicio, granularidad):
+    if granularidad == "mes":
+        return (inicio + timedelta(days=32)).replace(day=1)
+    return inicio + _PASOS[granularidad]
+
+
+def cantidad_buckets(inicio, fin, granularidad):
+    """Cantidad de buckets que cubren [inicio, fin), sin generarlos."""
+    primero = truncar(inicio, granularidad)
+    if fin <= primero:
+        return 0
+    if granularidad == "mes":
+        return (fin.year - primero.year) * 12 + fin.month - primero.month + (fin > truncar(fin, "mes"))
+    paso = _PASOS[granularidad]
+    return -(-(fin - primero) // paso)
+
+
+def rellenar_serie(serie, inicio, fin, granularidad):
+    """Serie densa: agrega los buckets sin ventas de [inicio, fin) con ceros."""
+    por_bucket = {bucket: (monto, cantidad, ventas) for bucket, monto, cantidad, ventas in serie}
+    densa = []
+    bucket = truncar(inicio, granularidad)
+    while bucket < fin:
+        densa.append((bucket, *por_bucket.get(bucket, (0.0, 0, 0))))
+        bucket = siguiente_bucket(bucket, granularidad)
+    return densa
+
+
+def ventana_agrupacion(agrupacion, ahora):
+    """Rango local [inicio, fin) y granularidad SQL de cada vista del dashboard."""
+    hoy = inicio_dia(ahora.date())
+    if agrupacion == "semana":
+        return hoy - timedelta(days=6), hoy + timedelta(days=1), "dia"
+    if agrupacion == "mes":
+        inicio = hoy.replace(day=1)
+        fin = (inicio + timedelta(days=32)).replace(day=1)
+        return inicio, fin, "dia"
+    return hoy, hoy + timedelta(days=1), "hora"
@@ -46,6 +46,14 @@ CREATE TABLE IF NOT EXISTS productos (
     imagen_url   VARCHAR(255)
 );
 
+-- Búsqueda de productos: texto completo (nombre + marca) y trigramas para ILIKE '%x%'
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_productos_busqueda ON productos
+    USING GIN (to_tsvector('simple', coalesce(nombre, '') || ' ' || coalesce(marca, '')));
+CREATE INDEX IF NOT EXISTS ix_productos_nombre_trgm ON productos USING GIN (nombre gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_productos_marca_trgm ON productos USING GIN (marca gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_categorias_nombre_trgm ON categorias USING GIN (nombre gin_trgm_ops);
+
 -- Crear secuencia para compras.id
 CREATE SEQUENCE IF NOT EXISTS compras_id_seq;
 
@@ -85,6 +93,68 @@ CREATE TABLE IF NOT EXISTS historial_ventas (
     tipo_comprobante_id BIGINT REFERENCES tipos_comprobante(id),
     fecha_venta         TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+CREATE INDEX IF NOT EXISTS ix_historial_ventas_fecha_venta ON historial_ventas (fecha_venta);
+CREATE INDEX IF NOT EXISTS ix_historial_ventas_cliente_fecha_id ON historial_ventas (cliente_id, fecha_venta, id);
+
+-- Outbox de eventos pendientes de publicar en RabbitMQ
+CREATE TABLE IF NOT EXISTS outbox (
+    id           BIGSERIAL PRIMARY KEY,
+    cola         VARCHAR(50) NOT NULL,
+    payload      TEXT NOT NULL,
+    creado_en    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    enviado_en   TIMESTAMP,
+    intentos     INT NOT NULL DEFAULT 0,
+    ultimo_error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_pendientes ON outbox (id) WHERE enviado_en IS NULL;
+
+-- Respuestas guardadas por Idempotency-Key
+CREATE TABLE IF NOT EXISTS claves_idempotencia (
+    id             BIGSERIAL PRIMARY KEY,
+    ambito         VARCHAR(120) NOT NULL,
+    clave          VARCHAR(255) NOT NULL,
+    hash_solicitud VARCHAR(32) NOT NULL,
+    estado_http    INT,
+    cuerpo         BYTEA,
+    mimetype       VARCHAR(100),
+    bloqueado_hasta TIMESTAMP,
+    creado_en      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expira_en      TIMESTAMP NOT NULL,
+    CONSTRAINT uq_idempotencia_ambito_clave UNIQUE (ambito, clave)
+);
+ALTER TABLE claves_idempotencia ADD COLUMN IF NOT EXISTS bloqueado_hasta TIMESTAMP;
+CREATE INDEX IF NOT EXISTS ix_claves_idempotencia_expira_en ON claves_idempotencia (expira_en);
+
+-- Ventas acumuladas por hora (UTC) y dimensión; se mantiene en la misma transacción que la compra
+CREATE TABLE IF NOT EXISTS resumen_ventas_hora (
+    id                  BIGSERIAL PRIMARY KEY,
+    hora                TIMESTAMP NOT NULL,
+    tipo_comprobante_id INT NOT NULL DEFAULT 0,
+    producto_id         BIGINT NOT NULL DEFAULT 0,
+    marca               VARCHAR(100) NOT NULL DEFAULT '',
+    categoria_id        INT NOT NULL DEFAULT 0,
+    monto               DOUBLE PRECISION NOT NULL DEFAULT 0,
+    cantidad            INT NOT NULL DEFAULT 0,
+    ventas              INT NOT NULL DEFAULT 0,
+    CONSTRAINT uq_resumen_ventas_hora UNIQUE (hora, tipo_comprobante_id, producto_id, marca, categoria_id)
+);
+CREATE INDEX IF NOT EXISTS ix_resumen_ventas_hora_hora ON resumen_ventas_hora (hora);
+
+-- Desde cuándo el resumen tiene todas las ventas (NULL: todas, tras backfill-resumen-ventas);
+-- antes de esa hora el dashboard lee historial_ventas
+CREATE TABLE IF NOT EXISTS estado_resumen_ventas (
+    id             INT PRIMARY KEY,
+    completo_desde TIMESTAMP
+);
+INSERT INTO estado_resumen_ventas (id, completo_desde) VALUES (1, now() AT TIME ZONE 'utc') ON CONFLICT (id) DO NOTHING;
+
+-- Versión del catálogo (ETag / Last-Modified y claves de caché); una sola fila
+CREATE TABLE IF NOT EXISTS estado_catalogo (
+    id            INT PRIMARY KEY,
+    version       BIGINT NOT NULL DEFAULT 0,
+    modificado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO estado_catalogo (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
 
 -- Insertar usuarios si no existen
 INSERT INTO usuarios (id, google_id, nombre, email, rol, estado)
@@ -0,0 +1,84 @@
+#Lanza muchos hilos simultaneos comprando el mismo producto para verificar que el descuento
+#de stock es atómico (nunca se vende más de lo disponible ni el stock queda negativo)
+import os
+import sys
+import pytest
+from flask import Flask
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.services.stock import reservar_stock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+STOCK_INICIAL = 25
+HILOS = 20
+INTENTOS = 100
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test_stock_concurrente.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        "connect_args": {"check_same_thread": False, "timeout": 30}
+    }
+    app.config['TESTING'] = True
+    db.init_app(app)
+    return app
+
+@pytest.fixture(scope="module")
+def app():
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        usuario = Usuario(nombre="Vendedor", email="vendedor@gmail.com", rol="cliente", estado="activo")
+        db.session.add(usuario)
+        db.session.flush()
+        db.session.add(Producto(nombre="Consola", precio=1500.0, stock=STOCK_INICIAL, cliente_id=usuario.id))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+    try:
+        os.remove(os.path.join(app.instance_path, "test_stock_concurrente.db"))
+    except FileNotFoundError:
+        pass
+
+# Cada intento reserva una unidad en su propia transacción
+def comprar_una_unidad(app, producto_id, cantidad=1):
+    with app.app_context():
+        fallidos = reservar_stock({producto_id: cantidad})
+        if fallidos:
+            db.session.rollback()
+            return False
+        db.session.commit()
+        return True
+
+def test_stock_nunca_negativo(app):
+    with app.app_context():
+        producto_id = Producto.query.first().id
+
+    with ThreadPoolExecutor(max_workers=HILOS) as executor:
+        futures = [executor.submit(comprar_una_unidad, app, producto_id) for _ in range(INTENTOS)]
+        resultados = [f.result() for f in as_completed(futures)]
+
+    with app.app_context():
+        stock_final = db.session.get(Producto, producto_id).stock
+
+    assert stock_final >= 0
+    assert sum(resultados) == STOCK_INICIAL
+    assert stock_final == STOCK_INICIAL - sum(resultados)
+
+def test_reserva_rechaza_cantidad_mayor_al_stock(app):
+    with app.app_context():
+        producto = Producto.query.first()
+        producto_id, stock = producto.id, producto.stock
+
+    assert comprar_una_unidad(app, producto_id, stock + 1) is False
+
+    with app.app_context():
+        assert db.session.get(Producto, producto_id).stock == stock
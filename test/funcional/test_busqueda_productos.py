@@ -0,0 +1,234 @@
+import os
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.categoria import Categoria
+from app.routes.producto import producto_bp
+from app.services.busqueda import buscar_productos
+from app.services.facetas import calcular_facetas, facetas_productos
+
+TEMPLATES_PATH = os.path.abspath("app/templates")
+
+
+# Configura la aplicación Flask para pruebas
+@pytest.fixture
+def app():
+    app = Flask(__name__, template_folder=TEMPLATES_PATH)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+
+    db.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(Usuario, int(user_id))
+
+    app.register_blueprint(producto_bp)
+
+    # Mock de la ruta cliente_dashboard para evitar BuildError en los tests
+    @app.route("/cliente/dashboard")
+    def cliente_dashboard():
+        return "Dashboard de prueba"
+
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+# Cliente autenticado con un catálogo pequeño en dos categorías
+@pytest.fixture
+def client(app):
+    usuario = Usuario(nombre="Cliente Test", email="cliente@test.com", rol="cliente", estado="activo")
+    usuario.set_password("123456")
+    audio, perifericos = Categoria(nombre="Audio"), Categoria(nombre="Perifericos")
+    db.session.add_all([usuario, audio, perifericos])
+    db.session.flush()
+    db.session.add_all([
+        Producto(nombre="Audifonos Gamer", marca="Hyperx", precio=100, stock=5, cliente_id=usuario.id, categoria_id=audio.id),
+        Producto(nombre="Audífonos inalámbricos", marca="Sony", precio=250, stock=2, cliente_id=usuario.id, categoria_id=audio.id),
+        Producto(nombre="Parlante portátil", marca="JBL", precio=180, stock=9, cliente_id=usuario.id, categoria_id=audio.id),
+        Producto(nombre="Mouse gamer", marca="Logitech", precio=60, stock=7, cliente_id=usuario.id, categoria_id=perifericos.id),
+        Producto(nombre="Teclado mecánico", marca="Hyperx", precio=120, stock=3, cliente_id=usuario.id, categoria_id=perifericos.id),
+    ])
+    db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(usuario.id)
+    return client
+
+
+def nombres(texto="", filtros=None, **kwargs):
+    productos, _ = buscar_productos(texto, filtros, limite=50, **kwargs)
+    return [p.nombre for p in productos]
+
+# Busca por prefijo en nombre y marca, sin distinguir tildes ni mayúsculas
+def test_busqueda_por_prefijo(client):
+    assert sorted(nombres("audi")) == ["Audifonos Gamer", "Audífonos inalámbricos"]
+    assert sorted(nombres("HYPER")) == ["Audifonos Gamer", "Teclado mecánico"]
+    assert nombres("hyperx gam") == ["Audifonos Gamer"]
+    assert nombres("inexistente") == []
+    assert len(nombres("¿?")) == 5  # sin palabras: catálogo completo
+
+# Los resultados van por relevancia y respetan los filtros por campo
+def test_busqueda_relevancia_y_filtros(client):
+    assert nombres("gamer")[0] in ("Audifonos Gamer", "Mouse gamer")
+    assert nombres("gamer", {"categoria": "perif"}) == ["Mouse gamer"]
+    assert nombres("hyperx", {"precio_max": 110}) == ["Audifonos Gamer"]
+    assert nombres("", orden_stock="desc")[0] == "Parlante portátil"
+
+# El índice sigue a los productos creados, renombrados y eliminados
+def test_indice_sincronizado(client):
+    producto = Producto.query.filter_by(nombre="Mouse gamer").one()
+    producto.nombre = "Raton optico"
+    db.session.commit()
+    assert nombres("mouse") == []
+    assert nombres("raton") == ["Raton optico"]
+
+    db.session.delete(producto)
+    db.session.commit()
+    assert nombres("raton") == []
+
+    db.session.add(Producto(nombre="Mousepad XL", marca="Razer", precio=40, stock=1,
+                            cliente_id=producto.cliente_id, categoria_id=producto.categoria_id))
+    db.session.commit()
+    assert nombres("mouse") == ["Mousepad XL"]
+
+# drop_all()/create_all() sobre la misma base no deja un índice FTS con ids viejos
+def test_indice_tras_recrear_tablas(client):
+    db.drop_all()
+    db.create_all()
+    usuario = Usuario(nombre="Otro", email="otro@test.com", rol="cliente", estado="activo")
+    usuario.set_password("123456")
+    categoria = Categoria(nombre="Video")
+    db.session.add_all([usuario, categoria])
+    db.session.flush()
+    db.session.add_all([
+        Producto(nombre="Monitor", marca="LG", precio=500, stock=1, cliente_id=usuario.id, categoria_id=categoria.id),
+        Producto(nombre="Mouse", marca="Logitech", precio=50, stock=1, cliente_id=usuario.id, categoria_id=categoria.id),
+    ])
+    db.session.commit()
+    assert nombres("mouse") == ["Mouse"]
+    assert nombres("audifonos") == []
+
+# La búsqueda se pagina con cursor sin repetir ni perder resultados
+def test_filtro_productos_paginado(client):
+    response = client.get("/filtro-productos?q=a&limite=2")
+    assert response.status_code == 200
+
+    vistos, pagina = [], buscar_productos("", limite=2)
+    while True:
+        productos, siguiente = pagina
+        vistos += [p.id for p in productos]
+        if not siguiente:
+            break
+        pagina = buscar_productos("", limite=2, cursor=siguiente)
+    assert len(vistos) == len(set(vistos)) == 5
+
+    audio, siguiente = buscar_productos("audifonos", limite=1)
+    resto, ultimo = buscar_productos("audifonos", limite=1, cursor=siguiente)
+    assert ultimo is None
+    assert {audio[0].nombre, resto[0].nombre} == {"Audifonos Gamer", "Audífonos inalámbricos"}
+
+    response = client.get("/filtro-productos?q=audifonos&limite=1")
+    html = response.get_data(as_text=True)
+    assert "Siguiente página" in html and "q=audifonos" in html
+    assert client.get("/filtro-productos?q=audifonos&cursor=xyz").status_code == 400
+
+# El autocompletado responde desde memoria y sigue las escrituras confirmadas
+def test_autocompletar_productos(client):
+    response = client.get("/productos/autocompletar?q=audi")
+    assert response.status_code == 200
+    assert sorted(s["texto"] for s in response.get_json()["sugerencias"]) == ["Audifonos Gamer", "Audífonos inalámbricos"]
+
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        response = client.get("/productos/autocompletar?q=hyp")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+    assert response.get_json()["sugerencias"] == [{"texto": "Hyperx", "tipo": "marca"}]
+    assert consultas == []
+
+    producto = Producto.query.filter_by(nombre="Parlante portátil").one()
+    producto.marca = "Bose"
+    db.session.commit()
+    assert client.get("/productos/autocompletar?q=jbl").get_json()["sugerencias"] == []
+    assert client.get("/productos/autocompletar?q=bos").get_json()["sugerencias"] == [{"texto": "Bose", "tipo": "marca"}]
+
+    # Un cambio revertido no llega al índice
+    producto.nombre = "Temporal"
+    db.session.flush()
+    db.session.rollback()
+    assert client.get("/productos/autocompletar?q=temp").get_json()["sugerencias"] == []
+
+    assert len(client.get("/productos/autocompletar?q=a&limite=1").get_json()["sugerencias"]) == 1
+    assert client.get("/productos/autocompletar?q=a&limite=x").status_code == 400
+
+# Cuenta las sentencias SQL emitidas por `funcion`
+def contar_consultas(funcion, *args):
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        resultado = funcion(*args)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+    return resultado, len(consultas)
+
+# Las tres facetas salen de una sola consulta y respetan búsqueda y filtros
+def test_facetas(client):
+    facetas, consultas = contar_consultas(calcular_facetas)
+    assert consultas == 1
+    assert facetas["categoria"] == [{"valor": "Audio", "cantidad": 3}, {"valor": "Perifericos", "cantidad": 2}]
+    assert facetas["marca"][0] == {"valor": "Hyperx", "cantidad": 2}
+    assert len(facetas["marca"]) == 4
+    assert facetas["precio"] == [
+        {"desde": 50, "hasta": 100, "cantidad": 1},
+        {"desde": 100, "hasta": 250, "cantidad": 3},
+        {"desde": 250, "hasta": 500, "cantidad": 1},
+    ]
+
+    facetas = calcular_facetas("hyperx", {"precio_max": 110})
+    assert facetas["categoria"] == [{"valor": "Audio", "cantidad": 1}]
+    assert facetas["marca"] == [{"valor": "Hyperx", "cantidad": 1}]
+    assert facetas["precio"] == [{"desde": 100, "hasta": 250, "cantidad": 1}]
+
+    assert calcular_facetas("", {"categoria": "perif"})["marca"] == [
+        {"valor": "Hyperx", "cantidad": 1}, {"valor": "Logitech", "cantidad": 1}
+    ]
+    assert calcular_facetas("inexistente") == {"categoria": [], "marca": [], "precio": []}
+
+# Las facetas se guardan en la caché del catálogo y se invalidan al escribir productos
+def test_facetas_en_cache(client):
+    facetas_productos("", {"marca": ""})
+    _, consultas = contar_consultas(facetas_productos, "", {"marca": ""})
+    assert consultas == 0  # la versión del catálogo ya está en el proceso
+
+    producto = Producto.query.filter_by(nombre="Mouse gamer").one()
+    producto.precio = 700
+    db.session.commit()
+    assert {"desde": 500, "hasta": 1000, "cantidad": 1} in facetas_productos("", {"marca": ""})["precio"]
+
+# La página de filtro muestra los conteos con enlaces que conservan los filtros activos
+def test_filtro_productos_facetas(client):
+    html = client.get("/filtro-productos?q=audifonos").get_data(as_text=True)
+    assert "Audio (2)" in html
+    assert "Perifericos (" not in html
+    assert "categoria=Audio" in html and "q=audifonos" in html
@@ -1,9 +1,11 @@
 import pytest
+from datetime import datetime
 from flask import Flask
 from flask_login import LoginManager, login_user, current_user
 from app.extensions import db
 from app.models.usuario import Usuario
 from app.models.producto import Producto
+from app.models.historial_ventas import HistorialVenta
 from app.routes.cliente import bp_cliente
 
 
@@ -153,3 +155,41 @@ def test_actualizar_producto_ajeno(client, app, cliente_autenticado):
             "precio": 180
         })
         assert response.status_code == 403  
+
+
+# Test para recorrer el historial de ventas por cursor, de la venta más reciente a la más antigua
+def test_historial_ventas_paginado(client, app, cliente_autenticado):
+    with app.app_context():
+        producto = Producto(nombre="Mouse", precio=50, stock=10, cliente_id=cliente_autenticado.id)
+        db.session.add(producto)
+        db.session.flush()
+        # Dos ventas con la misma fecha: el id desempata
+        fechas = [datetime(2025, 3, d, 12, 0) for d in (1, 2, 3, 3, 4, 5, 6)]
+        for fecha in fechas:
+            db.session.add(HistorialVenta(cliente_id=cliente_autenticado.id, producto_id=producto.id,
+                                          cantidad=1, total_venta=50, fecha_venta=fecha))
+        db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(cliente_autenticado.id)
+
+    vistas, paginas, cursor = [], 0, None
+    while True:
+        url = "/cliente/ventas?limite=3" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert isinstance(response.get_json(), list)
+        vistas += response.get_json()
+        paginas += 1
+        cursor = response.headers.get("X-Siguiente-Cursor")
+        if cursor is None:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+
+    assert paginas == 3
+    assert len({v["id"] for v in vistas}) == 7
+    assert [v["fecha"][:10] for v in vistas] == [
+        "2025-03-06", "2025-03-05", "2025-03-04", "2025-03-03", "2025-03-03", "2025-03-02", "2025-03-01"
+    ]
+
+    assert client.get("/cliente/ventas?cursor=no-es-un-cursor").status_code == 400
+    assert client.get("/cliente/ventas?limite=diez").status_code == 400
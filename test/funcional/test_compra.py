@@ -0,0 +1,118 @@
+import os
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.routes.compra import compra_bp
+from app.services import comprobantes
+
+TEMPLATES_PATH = os.path.abspath("app/templates")
+STATIC_PATH = os.path.abspath("app/static")
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, template_folder=TEMPLATES_PATH, static_folder=STATIC_PATH)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+    app.config['PDF_POOL_PROCESOS'] = 0
+    app.config['PDF_CACHE_DIR'] = str(tmp_path / "pdf_cache")
+
+    db.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(Usuario, int(user_id))
+
+    app.register_blueprint(compra_bp)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+
+# Sustituye WeasyPrint por un render falso
+@pytest.fixture(autouse=True)
+def render_falso(monkeypatch):
+    monkeypatch.setattr(comprobantes, "renderizar_pdf", lambda html: b"%PDF-falso")
+
+# Crea un cliente y dos compras: una con 1 línea y otra con 10
+@pytest.fixture
+def compras(app):
+    with app.app_context():
+        usuario = Usuario(nombre="Comprador", email="compra@prueba.com", rol="cliente", estado="activo")
+        db.session.add_all([usuario, TipoComprobante(id=1, nombre="boleta"), TipoComprobante(id=2, nombre="factura")])
+        db.session.flush()
+        productos = [Producto(nombre=f"Producto {i}", marca="Marca", precio=10.0, stock=100, cliente_id=usuario.id)
+                     for i in range(10)]
+        db.session.add_all(productos)
+        db.session.flush()
+
+        ids = []
+        for lineas, tipo in ((1, 1), (10, 2)):
+            compra = Compra(cliente_id=usuario.id, tipo_comprobante_id=tipo, dni="72257140", ruc="10722571402",
+                            total=10.0 * lineas, email_destino=usuario.email)
+            db.session.add(compra)
+            db.session.flush()
+            db.session.add_all([CompraProducto(compra_id=compra.id, producto_id=p.id, cantidad=1)
+                                for p in productos[:lineas]])
+            ids.append(compra.id)
+        db.session.commit()
+        return usuario.id, ids
+
+@pytest.fixture
+def client(app, compras):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(compras[0])
+    return client
+
+# Cuenta las sentencias SQL emitidas durante la solicitud
+def contar_consultas(app, client, url, **kwargs):
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        response = client.get(url, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+    return response, len(consultas)
+
+# El detalle carga compra, tipo, líneas y productos en un número fijo de consultas
+def test_detalle_compra_consultas_fijas(app, client, compras):
+    _, (compra_1, compra_10) = compras
+    r1, n1 = contar_consultas(app, client, f"/detalle/{compra_1}")
+    r10, n10 = contar_consultas(app, client, f"/detalle/{compra_10}")
+
+    assert r1.status_code == r10.status_code == 200
+    assert b"Producto 9" in r10.data
+    # usuario + compra/tipo + líneas/productos, sin importar la cantidad de líneas
+    assert n1 <= 3 and n10 <= 3
+
+# El PDF también se arma con consultas fijas y luego se sirve con ETag
+def test_compra_pdf_consultas_fijas_y_etag(app, client, compras):
+    _, (compra_1, compra_10) = compras
+    r1, n1 = contar_consultas(app, client, f"/compra/{compra_1}/pdf")
+    r10, n10 = contar_consultas(app, client, f"/compra/{compra_10}/pdf")
+
+    assert r1.status_code == r10.status_code == 200
+    assert r10.data == b"%PDF-falso"
+    assert n1 <= 3 and n10 <= 3
+
+    etag = r10.headers["ETag"].strip('"')
+    r304 = client.get(f"/compra/{compra_10}/pdf", headers={"If-None-Match": f'"{etag}"'})
+    assert r304.status_code == 304
@@ -0,0 +1,121 @@
+import io
+import os
+import zipfile
+from datetime import datetime
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.compra import Compra
+from app.routes.admin import bp_admin
+from app.services import exportar_comprobantes, pdf_pool
+from app.services.comprobantes import clave_pdf
+from app.services.pdf_cache import obtener_cache_pdf
+
+TEMPLATES_PATH = os.path.abspath("app/templates")
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, template_folder=TEMPLATES_PATH)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+    app.config['PDF_POOL_PROCESOS'] = 0
+    app.config['PDF_CACHE_DIR'] = str(tmp_path / "pdf_cache")
+
+    db.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(Usuario, int(user_id))
+
+    app.register_blueprint(bp_admin)
+
+    with app.app_context():
+        db.create_all()
+        admin = Usuario(nombre="Juan Pérez", email="juan.perez@gmail.com", rol="administrador", estado="activo")
+        cliente = Usuario(nombre="María López", email="maria.lopez@gmail.com", rol="cliente", estado="activo")
+        db.session.add_all([admin, cliente, TipoComprobante(id=1, nombre="boleta"), TipoComprobante(id=2, nombre="factura")])
+        db.session.flush()
+        for i in range(5):
+            db.session.add(Compra(cliente_id=cliente.id, tipo_comprobante_id=1, dni="72257140", total=10.0 + i,
+                                  email_destino=cliente.email, fecha=datetime(2025, 3, 10, 15, 0)))
+        db.session.add(Compra(cliente_id=cliente.id, tipo_comprobante_id=2, ruc="10722571402", total=99.0,
+                              email_destino=cliente.email, fecha=datetime(2025, 3, 10, 15, 0)))
+        db.session.add(Compra(cliente_id=cliente.id, tipo_comprobante_id=1, dni="72257140", total=1.0,
+                              email_destino=cliente.email, fecha=datetime(2025, 5, 1, 15, 0)))
+        db.session.commit()
+        yield app
+
+@pytest.fixture
+def login_admin(app):
+    client = app.test_client()
+    with app.app_context():
+        admin = Usuario.query.filter_by(rol="administrador").first()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin.id)
+    return client
+
+# Sustituye solo WeasyPrint: el hilo del executor recorre el camino real del pool
+@pytest.fixture
+def renders(monkeypatch):
+    llamadas = []
+
+    def renderizar(html):
+        llamadas.append(html)
+        return b"%PDF-falso " + str(len(llamadas)).encode()
+
+    monkeypatch.setattr(pdf_pool, "_renderizar", renderizar)
+    return llamadas
+
+# El ZIP contiene solo las boletas del rango y reutiliza los PDFs en caché
+def test_exportar_boletas_en_zip(app, login_admin, renders):
+    with app.test_request_context():
+        primera = Compra.query.order_by(Compra.id).first()
+        obtener_cache_pdf().guardar(clave_pdf(primera), b"%PDF-cacheado")
+
+    response = login_admin.get("/admin/comprobantes/exportar?desde=2025-03-01&hasta=2025-03-31&tipo=boleta")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+
+    archivo = zipfile.ZipFile(io.BytesIO(response.data))
+    nombres = sorted(archivo.namelist())
+    assert len(nombres) == 5
+    assert all(n.startswith("boleta_") for n in nombres)
+    assert archivo.read(f"boleta_{primera.id}.pdf") == b"%PDF-cacheado"
+    assert len(renders) == 4
+
+# Parámetros inválidos devuelven 400
+def test_exportar_parametros_invalidos(login_admin):
+    assert login_admin.get("/admin/comprobantes/exportar?desde=2025-03-01").status_code == 400
+    assert login_admin.get("/admin/comprobantes/exportar?desde=2025-03-31&hasta=2025-03-01").status_code == 400
+    assert login_admin.get("/admin/comprobantes/exportar?desde=2025-03-01&hasta=2025-03-31&tipo=nota").status_code == 400
+
+# Con pool, los hilos del ZIP renderizan sin contexto de aplicación
+def test_exportar_con_pool_sin_contexto(app, login_admin, monkeypatch):
+    from flask import has_app_context
+
+    class PoolFalso:
+        procesos = 2
+
+        def __init__(self):
+            self.contextos = []
+
+        def renderizar(self, html):
+            self.contextos.append(has_app_context())
+            return b"%PDF-pool"
+
+    pool = PoolFalso()
+    monkeypatch.setattr(exportar_comprobantes, "obtener_pool_pdf", lambda: pool)
+
+    response = login_admin.get("/admin/comprobantes/exportar?desde=2025-03-01&hasta=2025-03-31")
+    archivo = zipfile.ZipFile(io.BytesIO(response.data))
+    assert "errores.txt" not in archivo.namelist()
+    assert len(archivo.namelist()) == 6
+    assert pool.contextos == [False] * 6
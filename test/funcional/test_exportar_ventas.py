@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from datetime import datetime
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.categoria import Categoria
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.historial_ventas import HistorialVenta
+from app.routes.admin import bp_admin
+from app.services.exportar_ventas import COLUMNAS, exportar_ventas
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+
+    db.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(Usuario, int(user_id))
+
+    app.register_blueprint(bp_admin)
+
+    with app.app_context():
+        db.create_all()
+        admin = Usuario(nombre="Juan Pérez", email="juan.perez@gmail.com", rol="administrador", estado="activo")
+        vendedor_a = Usuario(nombre="María López", email="maria.lopez@gmail.com", rol="cliente", estado="activo")
+        vendedor_b = Usuario(nombre="Luis Díaz", email="luis.diaz@gmail.com", rol="cliente", estado="activo")
+        categoria = Categoria(nombre="Tecnología")
+        db.session.add_all([admin, vendedor_a, vendedor_b, categoria, TipoComprobante(id=1, nombre="boleta")])
+        db.session.flush()
+        laptop = Producto(nombre="Laptop", marca="Lenovo", precio=3000, stock=50, cliente_id=vendedor_a.id, categoria_id=categoria.id)
+        mouse = Producto(nombre="Mouse", precio=50, stock=50, cliente_id=vendedor_b.id)
+        db.session.add_all([laptop, mouse])
+        db.session.flush()
+        # 25 ventas en marzo (20 de la laptop, 5 del mouse) y una en mayo
+        for i in range(25):
+            producto = laptop if i < 20 else mouse
+            db.session.add(HistorialVenta(cliente_id=admin.id, producto_id=producto.id, cantidad=1,
+                                          total_venta=producto.precio, tipo_comprobante_id=1,
+                                          fecha_venta=datetime(2025, 3, 10, 15, i)))
+        db.session.add(HistorialVenta(cliente_id=admin.id, producto_id=laptop.id, cantidad=2, total_venta=6000,
+                                      tipo_comprobante_id=1, fecha_venta=datetime(2025, 5, 1, 15, 0)))
+        db.session.commit()
+        yield app
+
+@pytest.fixture
+def login_admin(app):
+    client = app.test_client()
+    admin = Usuario.query.filter_by(rol="administrador").first()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin.id)
+    return client
+
+# CSV completo con encabezado y las dimensiones de cada venta
+def test_exportar_csv(login_admin):
+    response = login_admin.get("/admin/ventas/exportar?formato=csv&desde=2025-03-01&hasta=2025-03-31")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert "attachment" in response.headers["Content-Disposition"]
+
+    filas = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert len(filas) == 25
+    assert filas[0]["producto"] == "Laptop"
+    assert filas[0]["categoria"] == "Tecnología"
+    assert filas[0]["fecha_venta_utc"] == "2025-03-10T15:00:00"
+    assert filas[-1]["producto"] == "Mouse"
+
+# JSON Lines filtrado por vendedor (dueño del producto)
+def test_exportar_jsonl_por_vendedor(login_admin):
+    vendedor = Usuario.query.filter_by(email="luis.diaz@gmail.com").first()
+    response = login_admin.get(f"/admin/ventas/exportar?formato=jsonl&vendedor_id={vendedor.id}")
+    assert response.status_code == 200
+    filas = [json.loads(linea) for linea in response.data.decode().splitlines()]
+    assert len(filas) == 5
+    assert {f["producto"] for f in filas} == {"Mouse"}
+    assert set(filas[0]) == set(COLUMNAS)
+
+# La salida se entrega por lotes de filas, no toda junta
+def test_exportar_por_lotes(app):
+    partes = list(exportar_ventas("jsonl", lote=10))
+    assert [parte.count("\n") for parte in partes] == [10, 10, 6]
+    partes = list(exportar_ventas("csv", lote=10))
+    assert len(partes) == 3
+
+@pytest.mark.parametrize("query", [
+    "formato=xml",
+    "desde=2025-13-01",
+    "desde=2025-03-31&hasta=2025-03-01",
+    "vendedor_id=abc",
+])
+def test_exportar_parametros_invalidos(login_admin, query):
+    response = login_admin.get(f"/admin/ventas/exportar?{query}")
+    assert response.status_code == 400
+
+# Solo administradores
+def test_exportar_requiere_admin(app):
+    client = app.test_client()
+    vendedor = Usuario.query.filter_by(rol="cliente").first()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(vendedor.id)
+    assert client.get("/admin/ventas/exportar").status_code == 403
@@ -2,6 +2,7 @@ import os
 import pytest
 from flask import Flask
 from flask_login import LoginManager
+from sqlalchemy import event
 from app.extensions import db
 from app.models.usuario import Usuario
 from app.models.historial_ventas import HistorialVenta
@@ -9,6 +10,7 @@ from app.models.producto import Producto
 from app.models.categoria import Categoria
 from app.models.tipo_comprobante import TipoComprobante
 from app.routes.historial_ventas import historial_ventas_bp, dashboard_ventas_bp
+from app.services.resumen_ventas import reconstruir_resumen
 from datetime import datetime
 
 TEMPLATES_PATH = os.path.abspath("app/templates")
@@ -37,6 +39,10 @@ def app():
     def cliente_dashboard():
         return "Dashboard de prueba"
 
+    @app.route("/detalle/<int:compra_id>", endpoint="compra.detalle_compra")
+    def detalle_compra(compra_id):
+        return "Detalle de prueba"
+
     with app.app_context():
         db.create_all()
         yield app
@@ -80,6 +86,8 @@ def cliente_autenticado(app):
         )
         db.session.add(venta)
         db.session.commit()
+        # El dashboard lee del resumen horario (como tras backfill-resumen-ventas)
+        reconstruir_resumen()
 
         return usuario.id
 
@@ -109,3 +117,76 @@ def test_dashboard_ventas_por_mes(client, app, cliente_autenticado):
     response = client.get("/api/dashboard_ventas?agrupacion=mes&filtro=tipo_comprobante")
     assert response.status_code == 200
     assert b"Enero" in response.data or b"Febrero" in response.data or b"Boleta" in response.data or b"Laptop" in response.data
+
+# Ventas de muchos productos y categorías distintas, para detectar consultas por fila
+def agregar_ventas(cliente_id, tipo_id, cantidad):
+    categorias = [Categoria(nombre=f"Categoria {i}") for i in range(cantidad // 4 + 1)]
+    db.session.add_all(categorias)
+    db.session.flush()
+    productos = [
+        Producto(nombre=f"Producto {i}", marca=f"Marca {i}", precio=10, stock=100,
+                 categoria_id=categorias[i % len(categorias)].id, cliente_id=cliente_id)
+        for i in range(cantidad)
+    ]
+    db.session.add_all(productos)
+    db.session.flush()
+    db.session.add_all([
+        HistorialVenta(cliente_id=cliente_id, producto_id=producto.id, tipo_comprobante_id=tipo_id,
+                       total_venta=10, cantidad=1, fecha_venta=datetime.utcnow())
+        for producto in productos
+    ])
+    db.session.commit()
+    reconstruir_resumen()
+
+# Cuenta las sentencias SQL emitidas durante la solicitud
+def contar_consultas(client, url):
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+    return response, len(consultas)
+
+# Regresión N+1: agrupar por producto/marca/categoría no consulta la base por cada venta
+@pytest.mark.parametrize("filtro", ["producto", "marca", "categoria", "tipo_comprobante"])
+def test_dashboard_consultas_fijas(client, app, cliente_autenticado, filtro):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(cliente_autenticado)
+
+    tipo_id = TipoComprobante.query.first().id
+    agregar_ventas(cliente_autenticado, tipo_id, 60)
+    db.session.expunge_all()
+
+    for agrupacion in ("dia", "semana", "mes"):
+        response, consultas = contar_consultas(client, f"/api/dashboard_ventas?agrupacion={agrupacion}&filtro={filtro}")
+        assert response.status_code == 200
+        # usuario + serie + comprobantes + agrupación del gráfico circular
+        # (+ la cobertura del resumen, leída una vez por proceso)
+        assert consultas <= 5, f"{agrupacion}/{filtro}: {consultas} consultas"
+
+    if filtro == "categoria":
+        assert b"Categoria 14" in response.data
+
+# El historial se muestra por páginas con enlace a las ventas anteriores
+def test_historial_paginado(client, app, cliente_autenticado):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(cliente_autenticado)
+
+    producto_id = Producto.query.first().id
+    for dia in range(1, 5):
+        db.session.add(HistorialVenta(cliente_id=cliente_autenticado, producto_id=producto_id, cantidad=1,
+                                      total_venta=10, fecha_venta=datetime(2025, 1, dia)))
+    db.session.commit()
+
+    response = client.get("/api/historial_ventas?limite=2")
+    assert response.status_code == 200
+    assert response.data.count(b"<tr>") == 3  # encabezado + 2 ventas
+    assert b"Ventas anteriores" in response.data
+    assert b"cursor=" in response.data
+
+    assert client.get("/api/historial_ventas?cursor=%%%").status_code == 400
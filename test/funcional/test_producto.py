@@ -1,12 +1,18 @@
 import os
+from datetime import timedelta
 import pytest
 from flask import Flask
 from flask_login import LoginManager
+from sqlalchemy import event
 from app.extensions import db
 from app.models.usuario import Usuario
 from app.models.producto import Producto
 from app.models.categoria import Categoria
+from app.models.estado_catalogo import EstadoCatalogo
 from app.routes.producto import producto_bp
+from app.services.cache import CacheTTL
+from app.services.catalogo import obtener_cache_catalogo, recibir_version_catalogo, version_catalogo
+from app.services.stock import reservar_stock
 
 TEMPLATES_PATH = os.path.abspath("app/templates")
 
@@ -173,3 +179,184 @@ def test_eliminar_producto_propio(client, app, cliente_autenticado):
     # Verifica que el producto ya no exista
     with app.app_context():
         assert db.session.get(Producto, producto_id) is None
+
+
+# Catálogo público con 25 productos en 3 categorías
+@pytest.fixture
+def catalogo(app, cliente_autenticado):
+    categorias = [Categoria(nombre=f"Categoria {i}") for i in range(3)]
+    db.session.add_all(categorias)
+    db.session.flush()
+    db.session.add_all([
+        Producto(nombre=f"Producto {i}", precio=10 + i, stock=5, cliente_id=cliente_autenticado,
+                 categoria_id=categorias[i % 3].id)
+        for i in range(25)
+    ])
+    db.session.commit()
+    db.session.expunge_all()
+
+# Cuenta las sentencias SQL emitidas durante la solicitud
+def contar_consultas(client, url, headers=None):
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+    return response, len(consultas)
+
+# Se recorre el catálogo por páginas; cada página es una sola consulta con la categoría incluida
+# (la versión del catálogo se lee una vez y queda en el proceso)
+def test_api_productos_paginada(client, catalogo):
+    vistos, paginas, url = [], 0, "/productos?limite=10"
+    while url:
+        response, consultas = contar_consultas(client, url)
+        assert response.status_code == 200
+        assert consultas == (2 if paginas == 0 else 1)
+        datos = response.get_json()
+        assert isinstance(datos, list)
+        assert all(p["categoria_nombre"].startswith("Categoria") for p in datos)
+        vistos += [p["id"] for p in datos]
+        paginas += 1
+        cursor = response.headers.get("X-Siguiente-Cursor")
+        url = f"/productos?limite=10&cursor={cursor}" if cursor else None
+        if cursor:
+            assert 'rel="next"' in response.headers["Link"]
+
+    assert paginas == 3
+    assert vistos == sorted(vistos) and len(set(vistos)) == 25
+
+    assert client.get("/productos?cursor=xyz").status_code == 400
+    assert client.get("/productos?limite=mucho").status_code == 400
+
+# Fija el reloj de la ventana de stock
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [1_700_000_000.5]
+    monkeypatch.setattr(version_catalogo, "reloj", lambda: ahora[0])
+    return ahora
+
+# Una página repetida sale de la caché sin consultas; escribir productos la invalida
+def test_api_productos_cache_versionada(client, catalogo, reloj):
+    client.get("/productos?limite=5")
+    response, consultas = contar_consultas(client, "/productos?limite=5")
+    assert consultas == 0
+    assert obtener_cache_catalogo().estadisticas()["aciertos"] == 1
+
+    producto = Producto.query.order_by(Producto.id).first()
+    producto.nombre = "Renombrado"
+    db.session.commit()
+    assert client.get("/productos?limite=5").get_json()[0]["nombre"] == "Renombrado"
+    version = db.session.get(EstadoCatalogo, 1).version
+
+    # El descuento de stock de una compra no sube la versión: se ve al pasar la ventana
+    assert reservar_stock({producto.id: 2}) == []
+    db.session.commit()
+    assert db.session.get(EstadoCatalogo, 1).version == version
+    assert client.get("/productos?limite=5").get_json()[0]["stock"] == 5
+    reloj[0] += 60
+    assert client.get("/productos?limite=5").get_json()[0]["stock"] == 3
+
+    db.session.delete(Producto.query.order_by(Producto.id).first())
+    db.session.commit()
+    assert client.get("/productos?limite=5").get_json()[0]["id"] != producto.id
+
+# Con CATALOGO_STOCK_SEGUNDOS=0 el stock sube la versión como cualquier otra escritura
+def test_api_productos_stock_sin_ventana(app, client, catalogo):
+    app.config["CATALOGO_STOCK_SEGUNDOS"] = 0
+    etag = client.get("/productos?limite=5").headers["ETag"]
+    producto = Producto.query.order_by(Producto.id).first()
+    assert reservar_stock({producto.id: 2}) == []
+    db.session.commit()
+    response = client.get("/productos?limite=5", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]["stock"] == 3
+
+# Un rollback no cambia la versión del catálogo
+def test_api_productos_rollback_no_invalida(client, catalogo):
+    client.get("/productos?limite=5")
+    producto = Producto.query.first()
+    producto.nombre = "Temporal"
+    db.session.flush()
+    db.session.rollback()
+    _, consultas = contar_consultas(client, "/productos?limite=5")
+    assert consultas == 0
+
+# Deja la última escritura del catálogo `segundos` atrás, como si la hubiera hecho otro proceso
+def envejecer_catalogo(segundos=5):
+    db.session.query(EstadoCatalogo).update({"modificado_en": version_catalogo.ahora() - timedelta(seconds=segundos)})
+    db.session.commit()
+    recibir_version_catalogo(None)
+
+# Con el ETag vigente se responde 304 sin consultas; una escritura lo cambia
+def test_api_productos_etag(client, catalogo, reloj):
+    response = client.get("/productos?limite=5")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    response, consultas = contar_consultas(client, "/productos?limite=5", {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert consultas == 0
+    assert response.headers["ETag"] == etag
+    assert response.data == b""
+
+    # Otra página tiene su propio ETag
+    assert client.get("/productos?limite=10").headers["ETag"] != etag
+
+    producto = Producto.query.order_by(Producto.id).first()
+    producto.precio = 99
+    db.session.commit()
+    response = client.get("/productos?limite=5", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()[0]["precio"] == 99
+
+# La versión está en la base: una escritura hecha por otro proceso cambia el ETag
+# al llegar su aviso o, si se pierde, al vencer la lectura guardada
+def test_api_productos_etag_compartido(app, client, catalogo, reloj):
+    segundos = [0.0]
+    app.extensions["version_catalogo"] = CacheTTL(5, reloj=lambda: segundos[0])
+    etag = client.get("/productos").headers["ETag"]
+
+    db.session.query(EstadoCatalogo).update({"version": EstadoCatalogo.version + 1})
+    db.session.commit()
+    assert client.get("/productos", headers={"If-None-Match": etag}).status_code == 304
+    segundos[0] += 5
+    response = client.get("/productos", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    db.session.query(EstadoCatalogo).update({"version": EstadoCatalogo.version + 1})
+    db.session.commit()
+    recibir_version_catalogo("")
+    assert client.get("/productos", headers={"If-None-Match": etag}).status_code == 200
+
+# If-Modified-Since también vale para clientes que no guardan el ETag
+def test_api_productos_if_modified_since(client, catalogo, reloj):
+    envejecer_catalogo()
+    ultima = client.get("/productos").headers["Last-Modified"]
+    assert client.get("/productos", headers={"If-Modified-Since": ultima}).status_code == 304
+    assert client.get("/productos", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+
+    # Las respuestas de error no llevan validadores
+    response = client.get("/productos?cursor=xyz")
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
+
+# Mientras no termina el segundo de la última escritura no se envía Last-Modified:
+# otra escritura en ese mismo segundo quedaría oculta tras un 304
+def test_api_productos_last_modified_mismo_segundo(client, catalogo, reloj):
+    producto = Producto.query.first()
+    producto.stock = 1
+    db.session.commit()
+    assert "Last-Modified" not in client.get("/productos").headers
+
+    envejecer_catalogo()
+    ultima = client.get("/productos").headers["Last-Modified"]
+    producto.stock = 2
+    db.session.commit()
+    assert client.get("/productos", headers={"If-Modified-Since": ultima}).status_code == 200
@@ -0,0 +1,110 @@
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.historial_ventas import HistorialVenta
+from app.routes.historial_ventas import dashboard_ventas_bp
+from app.services.cache_dashboard import obtener_cache_series
+from app.services.fechas import a_utc, ahora_local
+from app.services.resumen_ventas import reconstruir_resumen
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+
+    db.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(Usuario, int(user_id))
+
+    app.register_blueprint(dashboard_ventas_bp)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+# Usuario autenticado y ventas en hora local de Lima (2025-03-03 10:15 y 2025-03-05 23:30)
+@pytest.fixture
+def ventas(app, client):
+    usuario = Usuario(nombre="Finanzas", email="finanzas@prueba.com", rol="cliente", estado="activo")
+    db.session.add_all([usuario, TipoComprobante(id=1, nombre="boleta")])
+    db.session.flush()
+    producto = Producto(nombre="Laptop", precio=100, stock=10, cliente_id=usuario.id)
+    db.session.add(producto)
+    db.session.flush()
+    for fecha_local, total in [(datetime(2025, 3, 3, 10, 15), 100.0), (datetime(2025, 3, 5, 23, 30), 250.0)]:
+        db.session.add(HistorialVenta(cliente_id=usuario.id, producto_id=producto.id, cantidad=1,
+                                      total_venta=total, tipo_comprobante_id=1, fecha_venta=a_utc(fecha_local)))
+    db.session.commit()
+    reconstruir_resumen()
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(usuario.id)
+
+# Serie diaria densa de un periodo cerrado: ceros incluidos y cacheable indefinidamente
+def test_serie_diaria_periodo_cerrado(client, ventas):
+    response = client.get("/api/dashboard/serie?desde=2025-03-01&hasta=2025-03-07&granularidad=dia")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+
+    datos = response.get_json()
+    assert datos["fechas"][0] == "2025-03-01T00:00:00"
+    assert len(datos["fechas"]) == 7
+    assert datos["montos"] == [0, 0, 100.0, 0, 250.0, 0, 0]
+    assert (datos["total_ventas"], datos["cantidad_ventas"]) == (350.0, 2)
+
+    client.get("/api/dashboard/serie?desde=2025-03-01&hasta=2025-03-07&granularidad=dia")
+    stats = obtener_cache_series().estadisticas()
+    assert (stats["aciertos"], stats["fallos"]) == (1, 1)
+
+# Por minuto se lee del historial; por mes se agrupa en el mes local
+@pytest.mark.parametrize("granularidad,puntos,indice,monto", [
+    ("minuto", 1440, 23 * 60 + 30, 250.0),
+    ("hora", 24, 23, 250.0),
+])
+def test_serie_granularidad_fina(client, ventas, granularidad, puntos, indice, monto):
+    datos = client.get(f"/api/dashboard/serie?desde=2025-03-05&hasta=2025-03-05&granularidad={granularidad}").get_json()
+    assert len(datos["montos"]) == puntos
+    assert datos["montos"][indice] == monto
+    assert sum(datos["montos"]) == monto
+
+def test_serie_mensual(client, ventas):
+    datos = client.get("/api/dashboard/serie?desde=2025-01-01&hasta=2025-12-31&granularidad=mes").get_json()
+    assert len(datos["fechas"]) == 12
+    assert datos["montos"][2] == 350.0
+
+# Un periodo que incluye hoy no se guarda sin vencimiento
+def test_serie_periodo_abierto(client, ventas):
+    hoy = ahora_local().date()
+    response = client.get(f"/api/dashboard/serie?desde={hoy - timedelta(days=1)}&hasta={hoy}&granularidad=hora")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert len(response.get_json()["fechas"]) == 48
+    assert obtener_cache_series().estadisticas()["entradas"] == 0
+
+@pytest.mark.parametrize("query", [
+    "hasta=2025-03-07",
+    "desde=2025-03-07&hasta=2025-03-01",
+    "desde=2025-03-01&hasta=2025-03-07&granularidad=trimestre",
+    "desde=2024-01-01&hasta=2025-01-01&granularidad=minuto",
+])
+def test_serie_parametros_invalidos(client, ventas, query):
+    response = client.get(f"/api/dashboard/serie?{query}")
+    assert response.status_code == 400
+    assert "msg" in response.get_json()
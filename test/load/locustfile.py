@@ -1,5 +1,6 @@
 from locust import HttpUser, task, between
 import random
+import uuid
 
 class PublicProductUser(HttpUser):
     wait_time = between(1, 2)
@@ -100,7 +101,10 @@ class CompraTestUser(HttpUser):
         else:
             datos_compra["ruc"] = "20123456789"
 
-        with self.client.post("/api/test/compra", json=datos_compra, catch_response=True) as response:
+        # Una clave por compra: los reintentos de Locust no duplican la compra
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+        with self.client.post("/api/test/compra", json=datos_compra, headers=headers, catch_response=True) as response:
             if response.status_code == 200:
                 response.success()
             else:
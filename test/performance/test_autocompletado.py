@@ -0,0 +1,52 @@
+# Micro-benchmark del índice de autocompletado: construcción, memoria y tiempo por consulta
+import random
+import string
+import time
+from app.services.autocompletado import IndicePrefijos
+
+PRODUCTOS = 200_000
+CONSULTAS = 20_000
+MARCAS = [f"Marca{i}" for i in range(500)]
+PALABRAS = ["audifonos", "mouse", "teclado", "monitor", "parlante", "gamer", "inalambrico",
+            "usb", "bluetooth", "pro", "mini", "rgb", "mecanico", "portatil", "cargador"]
+
+
+def catalogo_sintetico():
+    azar = random.Random(7)
+    for i in range(PRODUCTOS):
+        nombre = " ".join(azar.sample(PALABRAS, 3)) + f" {i}"
+        yield i, nombre, azar.choice(MARCAS)
+
+
+def test_autocompletado_rendimiento():
+    indice = IndicePrefijos(256 * 1024 * 1024)
+
+    inicio = time.perf_counter()
+    indice.cargar(catalogo_sintetico())
+    construccion = time.perf_counter() - inicio
+
+    azar = random.Random(11)
+    prefijos = [azar.choice(PALABRAS + MARCAS)[:azar.randint(1, 6)] for _ in range(CONSULTAS)]
+    inicio = time.perf_counter()
+    for prefijo in prefijos:
+        indice.buscar(prefijo, 10)
+    consulta = (time.perf_counter() - inicio) / CONSULTAS
+
+    inicio = time.perf_counter()
+    for i in range(1000):
+        indice.agregar(PRODUCTOS + i, "Producto nuevo " + "".join(azar.choices(string.ascii_lowercase, k=8)), "Nueva")
+    alta = (time.perf_counter() - inicio) / 1000
+
+    estadisticas = indice.estadisticas()
+    print(f"\n🔤 {estadisticas['sugerencias']} sugerencias, {estadisticas['claves']} claves")
+    print(f"🧠 Memoria estimada: {estadisticas['bytes_estimados'] / 1024 / 1024:.1f} MB")
+    print(f"🏗️ Construcción: {construccion:.2f} s")
+    print(f"⏱️ Consulta promedio: {consulta * 1e6:.1f} µs")
+    print(f"➕ Alta incremental promedio: {alta * 1e6:.1f} µs\n")
+
+    assert estadisticas["descartadas"] == 0
+    sugerencias = indice.buscar("audi")
+    assert len(sugerencias) == 10
+    assert all("audifonos" in s["texto"].split() for s in sugerencias)
+    assert consulta < 0.001
+    assert alta < 0.01
@@ -0,0 +1,105 @@
+# Mide las sentencias SQL y el tiempo de escritura de una compra con carritos de 1, 10 y 100 líneas
+import os
+import time
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.models.historial_ventas import HistorialVenta
+from app.models.resumen_ventas import ResumenVentaHora
+from app.services.compra import registrar_lineas
+from app.services.stock import cargar_productos, reservar_stock
+
+REPETICIONES = 20
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///test_compra_lineas.db"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["TESTING"] = True
+    db.init_app(app)
+    return app
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(TipoComprobante(id=1, nombre="boleta"))
+        user = Usuario(nombre="Denilson", email="denilson0@gmail.com", rol="cliente", estado="activo")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([
+            Producto(nombre=f"Producto {i}", precio=10.0, stock=1_000_000, cliente_id=user.id)
+            for i in range(100)
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+    try:
+        os.remove(os.path.join(app.instance_path, "test_compra_lineas.db"))
+    except FileNotFoundError:
+        pass
+
+
+# Mismo flujo de escritura que /api/comprar
+def registrar_compra(cliente_id, cantidades):
+    productos = cargar_productos(cantidades.keys())
+    total = sum(productos[pid].precio * n for pid, n in cantidades.items())
+    assert reservar_stock(cantidades) == []
+    compra = Compra(cliente_id=cliente_id, tipo_comprobante_id=1, dni="72257140",
+                    total=total, email_destino="denilson0@gmail.com")
+    db.session.add(compra)
+    db.session.flush()
+    registrar_lineas(compra, [(productos[pid], n) for pid, n in cantidades.items()], cliente_id, 1)
+    db.session.commit()
+
+
+def medir(cliente_id, cantidades):
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        inicio = time.perf_counter()
+        for _ in range(REPETICIONES):
+            registrar_compra(cliente_id, cantidades)
+        duracion = time.perf_counter() - inicio
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+    return len(sentencias) / REPETICIONES, duracion / REPETICIONES
+
+
+@pytest.mark.parametrize("lineas", [1, 10, 100])
+def test_sentencias_constantes_por_compra(app, lineas):
+    with app.app_context():
+        cliente_id = Usuario.query.first().id
+        ids = [p.id for p in Producto.query.order_by(Producto.id).limit(lineas)]
+        antes = CompraProducto.query.count()
+
+        sentencias, promedio = medir(cliente_id, {pid: 1 for pid in ids})
+
+        print(f"\n🛒 Carrito de {lineas} líneas")
+        print(f"🧮 Sentencias SQL por compra: {sentencias:.0f}")
+        print(f"⏱️ Promedio por compra: {promedio * 1000:.2f} ms\n")
+
+        assert CompraProducto.query.count() - antes == lineas * REPETICIONES
+        assert HistorialVenta.query.count() >= lineas * REPETICIONES
+        # SELECT productos + UPDATE stock + INSERT compra + INSERT detalle + INSERT historial
+        # + UPSERT resumen horario + UPDATE versión del catálogo (el stock cambió)
+        assert sentencias <= 7
+        assert ResumenVentaHora.query.with_entities(db.func.sum(ResumenVentaHora.ventas)).scalar() \
+            == HistorialVenta.query.count()
@@ -0,0 +1,67 @@
+from app.services.autocompletado import IndicePrefijos, claves, normalizar
+
+
+def textos(indice, prefijo, limite=10):
+    return [s["texto"] for s in indice.buscar(prefijo, limite)]
+
+# Se encuentra por el inicio de cualquier palabra, sin tildes ni mayúsculas
+def test_buscar_por_palabra():
+    indice = IndicePrefijos(1024 * 1024)
+    indice.agregar(1, "Audífonos Gamer", "Hyperx")
+    indice.agregar(2, "Mouse gamer", "Logitech")
+
+    assert normalizar("  Audífonos ") == "audifonos"
+    assert claves("Mouse  gamer") == {"mouse gamer", "gamer"}
+    assert textos(indice, "AUDI") == ["Audífonos Gamer"]
+    assert sorted(textos(indice, "gam")) == ["Audífonos Gamer", "Mouse gamer"]
+    assert indice.buscar("hyp") == [{"texto": "Hyperx", "tipo": "marca"}]
+    assert textos(indice, "mouse g") == ["Mouse gamer"]
+    assert textos(indice, "udi") == []
+    assert textos(indice, "  ") == []
+    assert len(textos(indice, "g", limite=1)) == 1
+
+# Una marca compartida sigue sugiriéndose hasta que se quita su último producto
+def test_quitar_producto():
+    indice = IndicePrefijos(1024 * 1024)
+    indice.agregar(1, "Teclado", "Hyperx")
+    indice.agregar(2, "Audifonos", "Hyperx")
+    indice.agregar(2, "Audifonos", "Hyperx")  # repetir no duplica
+
+    indice.quitar(1, "Teclado", "Hyperx")
+    assert textos(indice, "tec") == []
+    assert textos(indice, "hyp") == ["Hyperx"]
+
+    indice.quitar(2, "Audifonos", "Hyperx")
+    indice.quitar(2, "Audifonos", "Hyperx")
+    assert textos(indice, "hyp") == []
+    assert indice.estadisticas()["claves"] == 0
+    assert indice.estadisticas()["bytes_estimados"] == 0
+
+# Al llegar al presupuesto de memoria las sugerencias nuevas se descartan
+def test_presupuesto_de_memoria():
+    indice = IndicePrefijos(4096)
+    for i in range(100):
+        indice.agregar(i, f"Producto {i}", None)
+    estadisticas = indice.estadisticas()
+    assert 0 < estadisticas["sugerencias"] < 100
+    assert estadisticas["bytes_estimados"] <= 4096
+    assert estadisticas["descartadas"] == 100 - estadisticas["sugerencias"]
+
+# Los cambios que llegan durante la carga se aplican sobre la foto leída
+def test_cargar_con_cambios_concurrentes():
+    indice = IndicePrefijos(1024 * 1024)
+    indice.agregar(9, "Viejo", None)
+
+    def filas():
+        yield (1, "Parlante", "JBL")
+        # Mientras se lee la base, otro proceso renombra el producto 1 y agrega el 2
+        indice.quitar(1, "Parlante", "JBL")
+        indice.agregar(1, "Parlante portatil", "JBL")
+        indice.agregar(2, "Microfono", "Shure")
+        yield (2, "Microfono", "Shure")
+
+    indice.cargar(filas())
+    assert textos(indice, "viejo") == []
+    assert textos(indice, "par") == ["Parlante portatil"]
+    assert textos(indice, "mic") == ["Microfono"]
+    assert not indice._construyendo
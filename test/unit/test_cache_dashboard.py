@@ -0,0 +1,179 @@
+import threading
+import time
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.compra import Compra
+from app.models.tipo_comprobante import TipoComprobante
+from app.routes.historial_ventas import dashboard_ventas_bp
+from app.services.cache import CacheTTL
+from app.services import cache_dashboard
+from app.services.cache_dashboard import obtener_cache_dashboard, recibir_ventas_nuevas
+from app.services.compra import registrar_lineas
+
+# Reloj manual para controlar el vencimiento
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+# Las entradas se sirven hasta que vence el TTL
+def test_ttl():
+    reloj = Reloj()
+    cache = CacheTTL(ttl=10, reloj=reloj)
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        return len(calculos)
+
+    assert cache.obtener("k", calcular) == 1
+    reloj.ahora = 9.9
+    assert cache.obtener("k", calcular) == 1
+    reloj.ahora = 10.1
+    assert cache.obtener("k", calcular) == 2
+    assert cache.estadisticas()["aciertos"] == 1
+    assert cache.estadisticas()["fallos"] == 2
+
+# Solo una petición calcula una clave fría; las demás esperan su resultado
+def test_single_flight():
+    cache = CacheTTL(ttl=60)
+    calculos = []
+    barrera = threading.Barrier(10)
+
+    def calcular():
+        calculos.append(1)
+        time.sleep(0.2)
+        return "valor"
+
+    resultados = []
+
+    def pedir():
+        barrera.wait()
+        resultados.append(cache.obtener("k", calcular))
+
+    hilos = [threading.Thread(target=pedir) for _ in range(10)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados == ["valor"] * 10
+    assert len(calculos) == 1
+    assert cache.estadisticas()["fallos"] == 1
+
+# Un cálculo que empezó antes de invalidar no queda guardado
+def test_invalidar_durante_calculo():
+    cache = CacheTTL(ttl=60)
+
+    def calcular():
+        cache.invalidar()
+        return "viejo"
+
+    assert cache.obtener("k", calcular) == "viejo"
+    assert cache.obtener("k", lambda: "nuevo") == "nuevo"
+    assert cache.obtener("k", lambda: "otro") == "nuevo"
+
+# Si el cálculo falla no se guarda nada y el error llega al que pidió
+def test_error_no_se_guarda():
+    cache = CacheTTL(ttl=60)
+
+    def fallar():
+        raise RuntimeError("base caída")
+
+    with pytest.raises(RuntimeError):
+        cache.obtener("k", fallar)
+    assert cache.obtener("k", lambda: 1) == 1
+
+# Sin TTL las entradas no vencen; con max_entradas se descarta la menos usada
+def test_sin_vencimiento_con_limite():
+    reloj = Reloj()
+    cache = CacheTTL(ttl=None, reloj=reloj, max_entradas=2)
+    cache.obtener("a", lambda: 1)
+    cache.obtener("b", lambda: 2)
+    reloj.ahora = 10 ** 9
+    assert cache.obtener("a", lambda: 0) == 1
+    cache.obtener("c", lambda: 3)
+    assert cache.obtener("b", lambda: "recalculado") == "recalculado"
+    assert cache.estadisticas()["entradas"] == 2
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+    app.register_blueprint(dashboard_ventas_bp)
+
+    with app.app_context():
+        db.init_app(app)
+        db.create_all()
+        usuario = Usuario(nombre="Vendedor", email="vendedor@prueba.com", rol="cliente")
+        db.session.add_all([usuario, TipoComprobante(id=1, nombre="boleta")])
+        db.session.flush()
+        db.session.add(Producto(nombre="Mouse", precio=50.0, stock=100, cliente_id=usuario.id))
+        db.session.commit()
+        yield app
+
+# El endpoint del dashboard se sirve desde la caché hasta que una compra agrega ventas
+def test_compra_invalida_el_dashboard(app):
+    client = app.test_client()
+
+    assert client.get("/api/dashboard/ventas").get_json()["total_ventas"] == 0
+    assert client.get("/api/dashboard/ventas").get_json()["total_ventas"] == 0
+    stats = client.get("/api/dashboard/cache").get_json()
+    assert (stats["aciertos"], stats["fallos"]) == (1, 1)
+
+    usuario = Usuario.query.first()
+    producto = Producto.query.first()
+    compra = Compra(cliente_id=usuario.id, tipo_comprobante_id=1, dni="72257140",
+                    total=100.0, email_destino="vendedor@prueba.com")
+    db.session.add(compra)
+    db.session.flush()
+    registrar_lineas(compra, [(producto, 2)], usuario.id, 1)
+    db.session.commit()
+
+    assert obtener_cache_dashboard().estadisticas()["invalidaciones"] == 1
+    assert client.get("/api/dashboard/ventas").get_json()["total_ventas"] == 100.0
+
+# Un commit sin ventas nuevas no invalida
+def test_commit_sin_ventas_no_invalida(app):
+    client = app.test_client()
+    client.get("/api/dashboard/ventas")
+    producto = Producto.query.first()
+    producto.stock = 99
+    db.session.commit()
+    assert obtener_cache_dashboard().estadisticas()["invalidaciones"] == 0
+
+# En PostgreSQL la venta se avisa por NOTIFY y cada worker invalida su caché al recibirla
+def test_venta_avisa_a_los_demas_workers(app, monkeypatch):
+    avisos = []
+    monkeypatch.setattr(cache_dashboard, "es_postgres", lambda session=None: True)
+    monkeypatch.setattr(cache_dashboard, "notificar", lambda session, canal, payload="": avisos.append(canal))
+    client = app.test_client()
+    client.get("/api/dashboard/ventas")
+
+    producto = Producto.query.first()
+    producto.stock = 99
+    db.session.commit()
+    assert avisos == []
+
+    usuario = Usuario.query.first()
+    compra = Compra(cliente_id=usuario.id, tipo_comprobante_id=1, dni="72257140",
+                    total=100.0, email_destino="vendedor@prueba.com")
+    db.session.add(compra)
+    db.session.flush()
+    registrar_lineas(compra, [(producto, 1)], usuario.id, 1)
+    db.session.commit()
+    assert avisos == ["cache_dashboard"]
+
+    # Aviso llegado de otro worker
+    client.get("/api/dashboard/ventas")
+    invalidaciones = obtener_cache_dashboard().estadisticas()["invalidaciones"]
+    recibir_ventas_nuevas("")
+    assert obtener_cache_dashboard().estadisticas()["invalidaciones"] == invalidaciones + 1
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.compra import Compra
+from app.models.tipo_comprobante import TipoComprobante
+from app.routes.historial_ventas import dashboard_ventas_bp
+from app.services.compra import registrar_lineas
+from app.services.eventos_ventas import DemasiadosSuscriptores, DifusorVentas, obtener_difusor
+
+# Cada evento publicado llega a todas las suscripciones
+def test_difusor_reparte_a_todos():
+    difusor = DifusorVentas()
+    a, b = difusor.suscribir(), difusor.suscribir()
+    difusor.publicar({"monto": 10})
+    assert a.siguiente(timeout=0) == {"monto": 10}
+    assert b.siguiente(timeout=0) == {"monto": 10}
+    assert a.siguiente(timeout=0) is None
+    a.cancelar()
+    assert difusor.suscriptores == 1
+
+# Un cliente lento que llena su cola se marca como desbordado y se quita
+def test_suscripcion_lenta_se_descarta():
+    difusor = DifusorVentas()
+    lenta = difusor.suscribir(max_pendientes=2)
+    for i in range(3):
+        difusor.publicar({"i": i})
+    assert lenta.desbordada
+    assert difusor.suscriptores == 0
+
+# Por encima del tope se rechaza la suscripción; al cancelar una se libera el cupo
+def test_difusor_limita_suscriptores():
+    difusor = DifusorVentas(max_suscriptores=2)
+    a, _ = difusor.suscribir(), difusor.suscribir()
+    with pytest.raises(DemasiadosSuscriptores):
+        difusor.suscribir()
+    a.cancelar()
+    difusor.suscribir()
+    assert difusor.suscriptores == 2
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+    app.register_blueprint(dashboard_ventas_bp)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(Usuario, int(user_id))
+
+    with app.app_context():
+        db.init_app(app)
+        db.create_all()
+        usuario = Usuario(nombre="Vendedor", email="vendedor@prueba.com", rol="cliente", estado="activo")
+        db.session.add_all([usuario, TipoComprobante(id=1, nombre="boleta")])
+        db.session.flush()
+        db.session.add(Producto(nombre="Mouse", precio=50.0, stock=100, cliente_id=usuario.id))
+        db.session.commit()
+        yield app
+
+def registrar_compra(cantidad):
+    usuario = Usuario.query.first()
+    producto = Producto.query.first()
+    compra = Compra(cliente_id=usuario.id, tipo_comprobante_id=1, dni="72257140",
+                    total=producto.precio * cantidad, email_destino="vendedor@prueba.com")
+    db.session.add(compra)
+    db.session.flush()
+    registrar_lineas(compra, [(producto, cantidad)], usuario.id, 1)
+
+# El delta se difunde solo cuando la compra se confirma
+def test_compra_confirmada_publica_delta(app):
+    suscripcion = obtener_difusor().suscribir()
+
+    registrar_compra(1)
+    db.session.rollback()
+    assert suscripcion.siguiente(timeout=0) is None
+
+    registrar_compra(3)
+    db.session.commit()
+    evento = suscripcion.siguiente(timeout=0)
+    assert evento["monto"] == 150.0
+    assert evento["ventas"] == 1
+    assert evento["tipo_comprobante_id"] == 1
+    datetime.strptime(evento["fecha"], "%Y-%m-%d")
+    assert 0 <= evento["hora"] <= 23
+
+# El stream SSE entrega los eventos con el nombre del comprobante
+def test_stream_envia_ventas(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(Usuario.query.first().id)
+
+    response = client.get("/dashboard_ventas/stream", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    partes = iter(response.response)
+    assert next(partes).startswith(b"retry:")
+    assert obtener_difusor().suscriptores == 1
+
+    registrar_compra(2)
+    db.session.commit()
+
+    bloque = next(partes).decode()
+    assert bloque.startswith("event: venta\n")
+    datos = json.loads(bloque.split("data: ", 1)[1])
+    assert (datos["monto"], datos["comprobante"]) == (100.0, "boleta")
+
+    response.close()
+    assert obtener_difusor().suscriptores == 0
+
+# Con el cupo de streams lleno el worker responde 503 en lugar de ocupar otro hilo
+def test_stream_lleno_responde_503(app):
+    app.config['SSE_MAX_SUSCRIPTORES'] = 1
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(Usuario.query.first().id)
+
+    abierto = client.get("/dashboard_ventas/stream", buffered=False)
+    next(iter(abierto.response))
+    response = client.get("/dashboard_ventas/stream")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "60"
+
+    abierto.close()
+    assert obtener_difusor().suscriptores == 0
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+import pytest
+from flask import Flask, jsonify, request
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.idempotencia import ClaveIdempotencia
+from app.services.idempotencia import iniciar_barrido, idempotente, purgar_claves_vencidas
+
+# App mínima con un endpoint idempotente que cuenta sus ejecuciones
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TESTING'] = True
+    app.ejecuciones = 0
+
+    db.init_app(app)
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(Usuario, int(user_id))
+
+    @app.route("/api/test/compra", methods=["POST"])
+    @idempotente
+    def compra():
+        app.ejecuciones += 1
+        if request.get_json().get("fallar"):
+            return jsonify({"msg": "error"}), 500
+        if request.get_json().get("sin_stock"):
+            return jsonify({"msg": "Stock insuficiente"}), 409
+        return jsonify({"compra_id": app.ejecuciones}), 200
+
+    with app.app_context():
+        db.create_all()
+        yield app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+# Sin cabecera cada solicitud se ejecuta normalmente
+def test_sin_clave_no_cachea(client, app):
+    client.post("/api/test/compra", json={"dni": "12345678"})
+    client.post("/api/test/compra", json={"dni": "12345678"})
+    assert app.ejecuciones == 2
+
+# La repetición devuelve la respuesta guardada sin ejecutar la vista
+def test_repeticion_devuelve_respuesta_guardada(client, app):
+    headers = {"Idempotency-Key": "abc-123"}
+    r1 = client.post("/api/test/compra", json={"dni": "12345678"}, headers=headers)
+    r2 = client.post("/api/test/compra", json={"dni": "12345678"}, headers=headers)
+
+    assert app.ejecuciones == 1
+    assert r2.status_code == r1.status_code == 200
+    assert r2.get_json() == r1.get_json()
+    assert r2.headers["Idempotent-Replayed"] == "true"
+
+# Misma clave con otro cuerpo se rechaza
+def test_clave_reutilizada_con_otro_cuerpo(client, app):
+    headers = {"Idempotency-Key": "abc-456"}
+    client.post("/api/test/compra", json={"dni": "12345678"}, headers=headers)
+    r = client.post("/api/test/compra", json={"dni": "87654321"}, headers=headers)
+    assert r.status_code == 422
+    assert app.ejecuciones == 1
+
+# Los errores 5xx no se guardan para permitir reintentos
+def test_error_del_servidor_permite_reintento(client, app):
+    headers = {"Idempotency-Key": "abc-789"}
+    client.post("/api/test/compra", json={"fallar": True}, headers=headers)
+    client.post("/api/test/compra", json={"fallar": True}, headers=headers)
+    assert app.ejecuciones == 2
+
+# El barrido elimina solo las claves vencidas
+def test_purgar_claves_vencidas(client, app):
+    client.post("/api/test/compra", json={"dni": "12345678"}, headers={"Idempotency-Key": "vigente"})
+    with app.app_context():
+        db.session.add(ClaveIdempotencia(
+            ambito="compra:anonimo", clave="vencida", hash_solicitud="0" * 32,
+            estado_http=200, expira_en=datetime.utcnow() - timedelta(seconds=1)
+        ))
+        db.session.commit()
+        assert purgar_claves_vencidas() == 1
+        assert [c.clave for c in ClaveIdempotencia.query.all()] == ["vigente"]
+
+# Los 4xx tampoco se guardan: el reintento vuelve a evaluar la compra (p. ej. tras reponer stock)
+def test_error_del_cliente_permite_reintento(client, app):
+    headers = {"Idempotency-Key": "abc-stock"}
+    r1 = client.post("/api/test/compra", json={"sin_stock": True}, headers=headers)
+    r2 = client.post("/api/test/compra", json={"sin_stock": True}, headers=headers)
+    assert r1.status_code == r2.status_code == 409
+    assert "Idempotent-Replayed" not in r2.headers
+    assert app.ejecuciones == 2
+
+# Una clave reservada por un worker que murió se retoma cuando vence su bloqueo
+def test_reserva_vencida_se_retoma(client, app):
+    headers = {"Idempotency-Key": "huerfana"}
+    client.post("/api/test/compra", json={"dni": "12345678"}, headers={"Idempotency-Key": "modelo"})
+    with app.app_context():
+        modelo = ClaveIdempotencia.query.filter_by(clave="modelo").one()
+        reserva = ClaveIdempotencia(
+            ambito=modelo.ambito, clave="huerfana", hash_solicitud=modelo.hash_solicitud,
+            bloqueado_hasta=datetime.utcnow() + timedelta(seconds=60),
+            expira_en=datetime.utcnow() + timedelta(hours=24)
+        )
+        db.session.add(reserva)
+        db.session.commit()
+
+    # Mientras dura el bloqueo, la solicitud original podría seguir en curso
+    assert client.post("/api/test/compra", json={"dni": "12345678"}, headers=headers).status_code == 409
+
+    with app.app_context():
+        reserva = ClaveIdempotencia.query.filter_by(clave="huerfana").one()
+        reserva.bloqueado_hasta = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    response = client.post("/api/test/compra", json={"dni": "12345678"}, headers=headers)
+    assert response.status_code == 200
+    assert app.ejecuciones == 2
+    with app.app_context():
+        reserva = ClaveIdempotencia.query.filter_by(clave="huerfana").one()
+        assert (reserva.estado_http, reserva.bloqueado_hasta) == (200, None)
+
+# El barrido arranca una sola vez por proceso
+def test_barrido_uno_por_proceso(app):
+    hilo = iniciar_barrido(app, intervalo=3600)
+    assert iniciar_barrido(app, intervalo=3600) is hilo
+    assert hilo.is_alive() and hilo.daemon
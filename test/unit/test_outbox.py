@@ -0,0 +1,65 @@
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.outbox import Outbox
+from app.services.outbox import encolar_evento, drenar_outbox, ejecutar_relay
+
+# Configura una aplicación Flask y base de datos SQLite en memoria para pruebas
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    with app.app_context():
+        db.init_app(app)
+        db.create_all()
+        yield app
+
+# Publicador en memoria; puede simular un broker caído
+class PublicadorFalso:
+    def __init__(self, caido=False):
+        self.caido = caido
+        self.mensajes = []
+
+    def publicar(self, cola, mensaje):
+        if self.caido:
+            raise ConnectionError("broker no disponible")
+        self.mensajes.append((cola, mensaje))
+
+# El evento solo existe si la transacción de la compra se confirma
+def test_evento_se_descarta_con_rollback(app):
+    with app.app_context():
+        encolar_evento("cola_boletas", {"compra_id": 1})
+        db.session.rollback()
+        assert Outbox.query.count() == 0
+
+# El relay publica en orden y marca los eventos como enviados
+def test_drenar_outbox_publica_en_lotes(app):
+    with app.app_context():
+        for i in range(5):
+            encolar_evento("cola_boletas", {"compra_id": i})
+        db.session.commit()
+
+        publicador = PublicadorFalso()
+        assert drenar_outbox(publicador, lote=3) == 3
+        assert drenar_outbox(publicador, lote=3) == 2
+        assert drenar_outbox(publicador, lote=3) == 0
+        assert [m[0] for m in publicador.mensajes] == ["cola_boletas"] * 5
+        assert Outbox.query.filter(Outbox.enviado_en.is_(None)).count() == 0
+
+# Con el broker caído los eventos quedan pendientes para el siguiente intento
+def test_broker_caido_no_pierde_eventos(app):
+    with app.app_context():
+        encolar_evento("cola_facturas", {"compra_id": 7})
+        db.session.commit()
+
+        assert drenar_outbox(PublicadorFalso(caido=True)) == 0
+        evento = Outbox.query.one()
+        assert evento.enviado_en is None
+        assert evento.intentos == 1
+        assert "broker no disponible" in evento.ultimo_error
+
+        publicador = PublicadorFalso()
+        assert ejecutar_relay(publicador, lote=10, una_vez=True) == 1
+        assert publicador.mensajes[0][0] == "cola_facturas"
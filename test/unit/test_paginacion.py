@@ -0,0 +1,27 @@
+from datetime import datetime
+import pytest
+from app.models.historial_ventas import HistorialVenta
+from app.services.paginacion import (
+    CursorInvalido, codificar_cursor, decodificar_cursor, leer_limite, LIMITE_MAXIMO, LIMITE_POR_DEFECTO
+)
+
+COLUMNAS = [HistorialVenta.fecha_venta, HistorialVenta.id]
+
+# El cursor conserva los tipos de las columnas de orden
+def test_cursor_ida_y_vuelta():
+    cursor = codificar_cursor([datetime(2025, 3, 10, 15, 30, 5, 120), 42])
+    assert decodificar_cursor(cursor, COLUMNAS) == [datetime(2025, 3, 10, 15, 30, 5, 120), 42]
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", codificar_cursor([1]), codificar_cursor(["ayer", 1])])
+def test_cursor_invalido(cursor):
+    with pytest.raises(CursorInvalido):
+        decodificar_cursor(cursor, COLUMNAS)
+
+# El tamaño de página se acota
+def test_leer_limite():
+    assert leer_limite(None) == LIMITE_POR_DEFECTO
+    assert leer_limite("10") == 10
+    assert leer_limite("0") == 1
+    assert leer_limite("100000") == LIMITE_MAXIMO
+    with pytest.raises(ValueError):
+        leer_limite("diez")
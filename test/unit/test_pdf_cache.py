@@ -0,0 +1,61 @@
+import os
+import time
+import pytest
+from app.services.pdf_cache import CachePDF
+
+@pytest.fixture
+def cache(tmp_path):
+    return CachePDF(str(tmp_path / "pdf_cache"), max_bytes=300)
+
+# La clave depende solo de la compra y la versión de la plantilla
+def test_clave_estable(cache):
+    assert cache.clave(1, "v1") == cache.clave(1, "v1")
+    assert cache.clave(1, "v1") != cache.clave(1, "v2")
+    assert cache.clave(1, "v1") != cache.clave(2, "v1")
+
+# Guardar y leer devuelve los mismos bytes
+def test_guardar_y_obtener(cache):
+    clave = cache.clave(1, "v1")
+    assert cache.obtener(clave) is None
+    cache.guardar(clave, b"%PDF-1.7 boleta")
+    assert cache.obtener(clave) == b"%PDF-1.7 boleta"
+    assert cache.existe(clave)
+
+# Al superar el tamaño máximo se expulsa el PDF usado hace más tiempo
+def test_expulsion_lru(cache):
+    claves = [cache.clave(i, "v1") for i in range(3)]
+    for i, clave in enumerate(claves):
+        cache.guardar(clave, b"x" * 100)
+        os.utime(cache.ruta(clave), (time.time() - 100 + i, time.time() - 100 + i))
+
+    cache.obtener(claves[0])  # la más antigua pasa a ser la más reciente
+    cache.guardar(cache.clave(3, "v1"), b"x" * 100)
+
+    assert cache.existe(claves[0])
+    assert not cache.existe(claves[1])
+    assert cache.existe(claves[2])
+
+# Guardar bajo el límite no recorre el directorio; se recorre al superarlo o al pasar el intervalo
+def test_guardar_no_recorre_el_directorio(tmp_path):
+    ahora = [0.0]
+    cache = CachePDF(str(tmp_path / "pdf_cache"), max_bytes=1000, intervalo_barrido=60, reloj=lambda: ahora[0])
+    for i in range(9):
+        cache.guardar(cache.clave(i, "v1"), b"x" * 100)
+    assert cache.barridos == 1  # el primero, para conocer el tamaño inicial
+
+    # Reescribir una clave no cuenta dos veces su tamaño
+    cache.guardar(cache.clave(0, "v1"), b"x" * 100)
+    assert cache.barridos == 1
+
+    cache.guardar(cache.clave(9, "v1"), b"x" * 100)
+    cache.guardar(cache.clave(10, "v1"), b"x" * 100)
+    assert cache.barridos == 2
+    assert len(os.listdir(cache.directorio)) == 10
+
+    # Otro proceso escribió en el directorio: se ve al pasar el intervalo
+    with open(os.path.join(cache.directorio, "ajeno.pdf"), "wb") as f:
+        f.write(b"x" * 500)
+    ahora[0] += 60
+    cache.guardar(cache.clave(0, "v1"), b"x" * 100)
+    assert cache.barridos == 3
+    assert cache.expulsar() <= 1000
@@ -0,0 +1,99 @@
+import threading
+import time
+import pytest
+from app.services.pdf_pool import PoolPDF, ColaPDFLlena, TiempoAgotadoPDF
+
+# Trabajos de prueba (deben poder serializarse para enviarse a otro proceso)
+def duplicar(valor):
+    return valor * 2
+
+def dormir(segundos):
+    time.sleep(segundos)
+    return segundos
+
+@pytest.fixture
+def pool():
+    pool = PoolPDF(procesos=1, max_pendientes=1, timeout=0.5, inicializador=None)
+    yield pool
+    pool.cerrar()
+
+# El trabajo se ejecuta en un proceso distinto y devuelve su resultado
+def test_ejecuta_en_otro_proceso(pool):
+    import os
+    assert os.getpid() not in pool.calentar()
+    assert pool.ejecutar(duplicar, 21) == 42
+
+# Un trabajo que excede el timeout lanza TiempoAgotadoPDF
+def test_timeout_por_trabajo(pool):
+    with pytest.raises(TiempoAgotadoPDF):
+        pool.ejecutar(dormir, 2)
+
+# Con la cola llena se rechaza de inmediato en lugar de bloquear al worker web
+def test_cola_llena():
+    pool = PoolPDF(procesos=1, max_pendientes=1, timeout=10, inicializador=None)
+    try:
+        pool.calentar()
+        hilo = threading.Thread(target=pool.ejecutar, args=(dormir, 1))
+        hilo.start()
+        time.sleep(0.2)
+        with pytest.raises(ColaPDFLlena):
+            pool.ejecutar(duplicar, 1)
+        hilo.join()
+        assert pool.ejecutar(duplicar, 1) == 2
+    finally:
+        pool.cerrar()
+
+# Un render colgado no retiene su proceso ni su cupo: el pool se recicla
+def test_timeout_recicla_el_pool(pool):
+    antes = pool.calentar()
+    with pytest.raises(TiempoAgotadoPDF):
+        pool.ejecutar(dormir, 30)
+    assert pool.reciclados == 1
+    assert pool.calentar().isdisjoint(antes)  # el proceso colgado ya no es parte del pool
+    assert pool.ejecutar(duplicar, 21) == 42
+
+# Executor de prueba: registra el apagado y, si se le dan, expone procesos como CPython
+class ExecutorFalso:
+    def __init__(self, procesos=None):
+        if procesos is not None:
+            self._processes = procesos
+        self.apagado = None
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.apagado = (wait, cancel_futures)
+
+class ProcesoFalso:
+    pid = 1234
+    muerto = False
+
+    def kill(self):
+        self.muerto = True
+
+# Con los procesos a la vista se matan; sin _processes (otra versión de Python) se apaga igual
+def test_detener_executor_con_y_sin_procesos():
+    from app.services.pdf_pool import detener_executor
+
+    proceso = ProcesoFalso()
+    executor = ExecutorFalso({proceso.pid: proceso})
+    assert detener_executor(executor) is True
+    assert proceso.muerto
+    assert executor.apagado == (False, True)
+
+    executor = ExecutorFalso()
+    assert detener_executor(executor) is False
+    assert executor.apagado == (False, True)
+
+# El pool se recicla aunque el executor no exponga sus procesos
+def test_reciclar_sin_procesos_visibles():
+    pool = PoolPDF(procesos=1, timeout=10, inicializador=None)
+    try:
+        viejo = ExecutorFalso()
+        pool._executor.shutdown()
+        pool._executor = viejo
+        pool._reciclar(viejo)
+        assert pool.reciclados == 1
+        assert pool._executor is not viejo
+        assert viejo.apagado == (False, True)
+        assert pool.ejecutar(duplicar, 21) == 42
+    finally:
+        pool.cerrar()
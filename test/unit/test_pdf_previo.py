@@ -0,0 +1,60 @@
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.compra import Compra
+from app.services import comprobantes
+
+# App con generación anticipada de PDFs habilitada
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['PDF_PREVIO'] = True
+
+    with app.app_context():
+        db.init_app(app)
+        db.create_all()
+        usuario = Usuario(nombre="Juan", email="juan@gmail.com", rol="cliente")
+        db.session.add_all([usuario, TipoComprobante(id=1, nombre="boleta")])
+        db.session.commit()
+        yield app
+
+# Registra las compras programadas en lugar de renderizar
+@pytest.fixture
+def programadas(monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(comprobantes, "programar_pdfs", lambda ids: llamadas.append(list(ids)))
+    return llamadas
+
+def nueva_compra():
+    usuario = Usuario.query.first()
+    return Compra(cliente_id=usuario.id, tipo_comprobante_id=1, dni="12345678",
+                  total=10.0, email_destino=usuario.email)
+
+# Al confirmar una compra se encola su PDF
+def test_commit_programa_pdf(app, programadas):
+    with app.app_context():
+        compra = nueva_compra()
+        db.session.add(compra)
+        db.session.commit()
+        assert programadas == [[compra.id]]
+
+# Si la transacción se revierte no se genera nada
+def test_rollback_no_programa_pdf(app, programadas):
+    with app.app_context():
+        db.session.add(nueva_compra())
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert programadas == []
+
+# Con PDF_PREVIO deshabilitado no se encola nada
+def test_deshabilitado(app, programadas):
+    app.config['PDF_PREVIO'] = False
+    with app.app_context():
+        db.session.add(nueva_compra())
+        db.session.commit()
+        assert programadas == []
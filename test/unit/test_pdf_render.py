@@ -0,0 +1,34 @@
+import pytest
+from app.services.pdf_render import CacheEstaticos, BASE_ESTATICOS
+
+@pytest.fixture
+def estaticos(tmp_path):
+    (tmp_path / "pdf").mkdir()
+    (tmp_path / "pdf" / "comprobante.css").write_text("body { margin: 20px; }")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    respaldo = []
+    fetcher = CacheEstaticos(str(tmp_path), respaldo=lambda url, *a, **kw: respaldo.append(url) or {"string": b""})
+    return tmp_path, fetcher, respaldo
+
+# Los archivos de static se sirven desde memoria con su tipo MIME
+def test_sirve_estaticos_desde_memoria(estaticos):
+    directorio, fetcher, _ = estaticos
+    resultado = fetcher(BASE_ESTATICOS + "logo.png")
+    assert resultado["string"] == b"\x89PNG"
+    assert resultado["mime_type"] == "image/png"
+
+    # Se leyó una vez: borrar el archivo no afecta a las siguientes solicitudes
+    (directorio / "logo.png").unlink()
+    assert fetcher(BASE_ESTATICOS + "logo.png?v=2")["string"] == b"\x89PNG"
+
+# Las URLs externas van al fetcher de respaldo
+def test_delega_urls_externas(estaticos):
+    _, fetcher, respaldo = estaticos
+    fetcher("https://cdn.example.com/fuente.woff2")
+    assert respaldo == ["https://cdn.example.com/fuente.woff2"]
+
+# No se puede salir del directorio static
+def test_bloquea_rutas_fuera_de_static(estaticos):
+    _, fetcher, _ = estaticos
+    with pytest.raises(ValueError):
+        fetcher(BASE_ESTATICOS + "../main.py")
@@ -0,0 +1,81 @@
+import json
+import pytest
+from pika.exceptions import StreamLostError
+from app.services.publicador import PublicadorRabbit
+
+# Broker en memoria que imita BlockingConnection/BlockingChannel de pika
+class BrokerFalso:
+    def __init__(self):
+        self.conexiones = 0
+        self.declaraciones = []
+        self.mensajes = []
+        self.caer_en_proxima_publicacion = False
+
+    def conectar(self, parametros):
+        self.conexiones += 1
+        return ConexionFalsa(self)
+
+class ConexionFalsa:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return CanalFalso(self)
+
+    def process_data_events(self, time_limit=None):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+class CanalFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.broker = conexion.broker
+        self.is_open = True
+        self.confirmaciones = False
+
+    def confirm_delivery(self):
+        self.confirmaciones = True
+
+    def queue_declare(self, queue, durable=False):
+        self.broker.declaraciones.append(queue)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if self.broker.caer_en_proxima_publicacion:
+            self.broker.caer_en_proxima_publicacion = False
+            self.conexion.is_open = False
+            self.is_open = False
+            raise StreamLostError("conexión perdida")
+        assert self.confirmaciones
+        self.broker.mensajes.append((routing_key, json.loads(body), properties.delivery_mode))
+
+@pytest.fixture
+def broker():
+    return BrokerFalso()
+
+@pytest.fixture
+def publicador(broker):
+    return PublicadorRabbit(host="localhost", conexion_factory=broker.conectar)
+
+# Varias publicaciones reutilizan la misma conexión y declaran cada cola una vez
+def test_reutiliza_conexion_y_declaraciones(broker, publicador):
+    for i in range(5):
+        publicador.publicar("cola_boletas", {"compra_id": i})
+    publicador.publicar("cola_facturas", {"compra_id": 99})
+
+    assert broker.conexiones == 1
+    assert broker.declaraciones == ["cola_boletas", "cola_facturas"]
+    assert len(broker.mensajes) == 6
+    assert all(modo == 2 for _, _, modo in broker.mensajes)
+
+# Si la conexión se cae se reconecta y el mensaje no se pierde
+def test_reconecta_si_la_conexion_se_cae(broker, publicador):
+    publicador.publicar("cola_boletas", {"compra_id": 1})
+    broker.caer_en_proxima_publicacion = True
+    publicador.publicar("cola_boletas", {"compra_id": 2})
+
+    assert broker.conexiones == 2
+    assert [m[1]["compra_id"] for m in broker.mensajes] == [1, 2]
+    assert broker.declaraciones == ["cola_boletas", "cola_boletas"]
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.categoria import Categoria
+from app.models.compra import Compra
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.historial_ventas import HistorialVenta
+from app.models.estado_resumen_ventas import EstadoResumenVentas
+from app.models.resumen_ventas import ResumenVentaHora
+from app.services.compra import registrar_lineas
+from app.services.fechas import a_local, ahora_local
+from app.services.resumen_ventas import (
+    corte_resumen, reconstruir_resumen, serie_ventas, totales_por_comprobante, totales_por_dimension
+)
+from app.services.ventas_agregadas import ventana_agrupacion
+
+# Configura una aplicación Flask y base de datos SQLite en memoria para pruebas
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    with app.app_context():
+        db.init_app(app)
+        db.create_all()
+        yield app
+
+# Dos productos de distinta categoría y marca
+@pytest.fixture
+def datos(app):
+    with app.app_context():
+        usuario = Usuario(nombre="Vendedor", email="vendedor@prueba.com", rol="cliente")
+        perifericos = Categoria(nombre="Periféricos")
+        db.session.add_all([usuario, perifericos, TipoComprobante(id=1, nombre="boleta"), TipoComprobante(id=2, nombre="factura")])
+        db.session.flush()
+        mouse = Producto(nombre="Mouse", marca="Logi", precio=50.0, stock=100, cliente_id=usuario.id, categoria_id=perifericos.id)
+        cable = Producto(nombre="Cable", precio=10.0, stock=100, cliente_id=usuario.id)
+        db.session.add_all([mouse, cable])
+        db.session.commit()
+        return usuario.id, mouse.id, cable.id
+
+def comprar(cliente_id, tipo, lineas):
+    compra = Compra(cliente_id=cliente_id, tipo_comprobante_id=tipo, dni="72257140",
+                    ruc="20123456789" if tipo == 2 else None,
+                    total=sum(p.precio * n for p, n in lineas), email_destino="vendedor@prueba.com")
+    db.session.add(compra)
+    db.session.flush()
+    registrar_lineas(compra, lineas, cliente_id, tipo)
+    db.session.commit()
+
+# Las compras de la misma hora y dimensiones se suman en una sola fila del resumen
+def test_compras_acumulan_en_el_resumen(app, datos):
+    cliente_id, mouse_id, cable_id = datos
+    with app.app_context():
+        mouse, cable = db.session.get(Producto, mouse_id), db.session.get(Producto, cable_id)
+        comprar(cliente_id, 1, [(mouse, 2), (cable, 1)])
+        comprar(cliente_id, 1, [(mouse, 1)])
+        comprar(cliente_id, 2, [(cable, 3)])
+
+        fila = ResumenVentaHora.query.filter_by(producto_id=mouse_id, tipo_comprobante_id=1).one()
+        assert (fila.monto, fila.cantidad, fila.ventas, fila.marca) == (150.0, 3, 2, "Logi")
+        assert fila.hora == HistorialVenta.query.first().fecha_venta.replace(minute=0, second=0, microsecond=0)
+        assert ResumenVentaHora.query.count() == 3
+
+        inicio, fin, _ = ventana_agrupacion("dia", ahora_local())
+        assert totales_por_comprobante(inicio, fin) == [("boleta", 160.0, 3), ("factura", 30.0, 1)]
+        assert totales_por_dimension(inicio, fin, "producto") == [("Cable", 40.0, 4), ("Mouse", 150.0, 3)]
+        assert totales_por_dimension(inicio, fin, "marca") == [("Logi", 150.0, 3)]
+        assert totales_por_dimension(inicio, fin, "categoria") == [("Periféricos", 150.0, 3)]
+        assert sum(monto for _, monto, _, _ in serie_ventas(inicio, fin, "hora")) == 190.0
+
+# El backfill reconstruye el mismo resumen a partir del historial
+def test_reconstruir_resumen_desde_historial(app, datos):
+    cliente_id, mouse_id, cable_id = datos
+    with app.app_context():
+        hace_dos_dias = datetime.utcnow() - timedelta(days=2)
+        db.session.add_all([
+            HistorialVenta(cliente_id=cliente_id, producto_id=mouse_id, cantidad=1, total_venta=50.0,
+                           tipo_comprobante_id=1, fecha_venta=hace_dos_dias.replace(minute=5)),
+            HistorialVenta(cliente_id=cliente_id, producto_id=mouse_id, cantidad=2, total_venta=100.0,
+                           tipo_comprobante_id=1, fecha_venta=hace_dos_dias.replace(minute=55)),
+        ])
+        db.session.commit()
+        comprar(cliente_id, 2, [(db.session.get(Producto, cable_id), 1)])
+
+        antes = {(r.hora, r.producto_id, r.tipo_comprobante_id): (r.monto, r.cantidad, r.ventas)
+                 for r in ResumenVentaHora.query}
+        assert reconstruir_resumen(lote=1) == 2
+        despues = {(r.hora, r.producto_id, r.tipo_comprobante_id): (r.monto, r.cantidad, r.ventas)
+                   for r in ResumenVentaHora.query}
+
+        hora = hace_dos_dias.replace(minute=0, second=0, microsecond=0)
+        assert despues[(hora, mouse_id, 1)] == (150.0, 3, 2)
+        assert {k: v for k, v in despues.items() if k[1] == cable_id} == antes
+
+# La granularidad de minutos no está disponible en el resumen
+def test_serie_sin_minutos(app):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            serie_ventas(datetime(2025, 3, 10), datetime(2025, 3, 11), "minuto")
+
+# Antes del backfill, las ventas anteriores al resumen se leen de historial_ventas
+def test_ventas_previas_al_resumen_sin_backfill(app, datos):
+    cliente_id, mouse_id, cable_id = datos
+    with app.app_context():
+        creado = db.session.get(EstadoResumenVentas, 1).completo_desde
+        assert creado is not None
+        # Ventas de antes del despliegue, que el resumen no tiene
+        antes = creado - timedelta(hours=3)
+        db.session.add(HistorialVenta(cliente_id=cliente_id, producto_id=mouse_id, cantidad=2, total_venta=100.0,
+                                      tipo_comprobante_id=1, fecha_venta=antes))
+        db.session.commit()
+        comprar(cliente_id, 2, [(db.session.get(Producto, cable_id), 1)])
+
+        inicio, fin = a_local(antes - timedelta(days=1)), a_local(datetime.utcnow() + timedelta(hours=1))
+        esperado = (
+            [("boleta", 100.0, 1), ("factura", 10.0, 1)],
+            [("Cable", 10.0, 1), ("Mouse", 100.0, 2)],
+            [("Logi", 100.0, 2)],
+            110.0,
+        )
+
+        def leer():
+            return (
+                totales_por_comprobante(inicio, fin),
+                totales_por_dimension(inicio, fin, "producto"),
+                totales_por_dimension(inicio, fin, "marca"),
+                sum(monto for _, monto, _, _ in serie_ventas(inicio, fin, "dia")),
+            )
+
+        assert leer() == esperado
+        reconstruir_resumen()
+        assert corte_resumen() is None
+        assert leer() == esperado
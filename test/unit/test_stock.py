@@ -0,0 +1,75 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.services.stock import cargar_productos, reservar_stock
+
+# Configura una aplicación Flask y base de datos SQLite en memoria para pruebas
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    with app.app_context():
+        db.init_app(app)
+        db.create_all()
+        yield app
+
+# Crea un usuario con 30 productos
+@pytest.fixture
+def productos(app):
+    with app.app_context():
+        usuario = Usuario(nombre="Vendedor", email="vendedor@prueba.com", rol="cliente")
+        db.session.add(usuario)
+        db.session.flush()
+        items = [
+            Producto(nombre=f"Producto {i}", precio=10.0 + i, stock=5, cliente_id=usuario.id)
+            for i in range(30)
+        ]
+        db.session.add_all(items)
+        db.session.commit()
+        return [p.id for p in items]
+
+# Cuenta las sentencias SELECT ejecutadas dentro del bloque
+def contar_selects(funcion):
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            consultas.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+    return resultado, consultas
+
+# Todo el carrito se carga con una sola consulta
+def test_cargar_productos_una_consulta(app, productos):
+    with app.app_context():
+        resultado, consultas = contar_selects(lambda: cargar_productos(productos))
+        assert len(consultas) == 1
+        assert set(resultado) == set(productos)
+
+# Los ids repetidos o inexistentes no rompen la carga
+def test_cargar_productos_ids_repetidos_e_inexistentes(app, productos):
+    with app.app_context():
+        resultado = cargar_productos([productos[0], productos[0], 99999])
+        assert list(resultado) == [productos[0]]
+        assert cargar_productos([]) == {}
+
+# La reserva se hace en una sola sentencia y reporta las líneas sin stock
+def test_reservar_stock_reporta_fallidos(app, productos):
+    with app.app_context():
+        cantidades = {productos[0]: 2, productos[1]: 6, productos[2]: 5}
+        fallidos, consultas = contar_selects(lambda: reservar_stock(cantidades))
+        assert fallidos == [productos[1]]
+        assert consultas == []
+        assert db.session.get(Producto, productos[0]).stock == 3
+        assert db.session.get(Producto, productos[1]).stock == 5
+        assert db.session.get(Producto, productos[2]).stock == 0
@@ -0,0 +1,91 @@
+from datetime import datetime
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.historial_ventas import HistorialVenta
+from app.services.ventas_agregadas import (
+    cantidad_buckets, rellenar_serie, serie_ventas, totales_por_comprobante, ventana_agrupacion
+)
+
+# Configura una aplicación Flask y base de datos SQLite en memoria para pruebas
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    with app.app_context():
+        db.init_app(app)
+        db.create_all()
+        yield app
+
+# Ventas guardadas en UTC alrededor del cambio de día en Lima (UTC-5)
+@pytest.fixture
+def ventas(app):
+    with app.app_context():
+        usuario = Usuario(nombre="Vendedor", email="vendedor@prueba.com", rol="cliente")
+        db.session.add_all([usuario, TipoComprobante(id=1, nombre="boleta"), TipoComprobante(id=2, nombre="factura")])
+        db.session.flush()
+        producto = Producto(nombre="Mouse", precio=50.0, stock=10, cliente_id=usuario.id)
+        db.session.add(producto)
+        db.session.flush()
+        for fecha, total, tipo in [
+            (datetime(2025, 3, 10, 3, 30), 100.0, 1),   # Lima: domingo 09/03 22:30
+            (datetime(2025, 3, 10, 15, 10), 50.0, 1),   # Lima: lunes 10/03 10:10
+            (datetime(2025, 3, 10, 15, 50), 25.0, 2),   # Lima: lunes 10/03 10:50
+            (datetime(2025, 4, 1, 12, 0), 999.0, 2),    # fuera del mes
+        ]:
+            db.session.add(HistorialVenta(cliente_id=usuario.id, producto_id=producto.id, cantidad=1,
+                                          total_venta=total, tipo_comprobante_id=tipo, fecha_venta=fecha))
+        db.session.commit()
+
+# La serie por hora usa la hora local y solo el rango pedido
+def test_serie_por_hora_en_hora_local(app, ventas):
+    with app.app_context():
+        serie = serie_ventas(datetime(2025, 3, 10), datetime(2025, 3, 11), "hora")
+        assert serie == [(datetime(2025, 3, 10, 10, 0), 75.0, 2, 2)]
+
+# Los buckets semanales empiezan el lunes local
+def test_serie_por_semana(app, ventas):
+    with app.app_context():
+        serie = serie_ventas(datetime(2025, 3, 1), datetime(2025, 4, 1), "semana")
+        assert [(b, m) for b, m, _, _ in serie] == [
+            (datetime(2025, 3, 3), 100.0),
+            (datetime(2025, 3, 10), 75.0),
+        ]
+
+# Totales por tipo de comprobante dentro del rango
+def test_totales_por_comprobante(app, ventas):
+    with app.app_context():
+        totales = totales_por_comprobante(datetime(2025, 3, 1), datetime(2025, 4, 1))
+        assert totales == [("boleta", 150.0, 2), ("factura", 25.0, 1)]
+
+# Ventanas de las vistas del dashboard
+def test_ventana_agrupacion():
+    ahora = datetime(2025, 3, 10, 18, 0)
+    assert ventana_agrupacion("dia", ahora) == (datetime(2025, 3, 10), datetime(2025, 3, 11), "hora")
+    assert ventana_agrupacion("semana", ahora) == (datetime(2025, 3, 4), datetime(2025, 3, 11), "dia")
+    assert ventana_agrupacion("mes", ahora) == (datetime(2025, 3, 1), datetime(2025, 4, 1), "dia")
+
+# Conteo de buckets sin generarlos, incluido el primero parcial
+def test_cantidad_buckets():
+    assert cantidad_buckets(datetime(2025, 3, 1), datetime(2025, 3, 2), "minuto") == 1440
+    assert cantidad_buckets(datetime(2025, 3, 1), datetime(2026, 3, 1), "dia") == 365
+    assert cantidad_buckets(datetime(2025, 3, 5), datetime(2025, 3, 11), "semana") == 2   # lunes 03 y 10
+    assert cantidad_buckets(datetime(2025, 1, 1), datetime(2025, 3, 1), "mes") == 2
+    assert cantidad_buckets(datetime(2025, 1, 15), datetime(2025, 3, 5), "mes") == 3
+
+# La serie densa tiene todos los buckets; los que no tienen ventas van en cero
+def test_rellenar_serie():
+    serie = [(datetime(2025, 3, 3), 10.0, 1, 1)]
+    densa = rellenar_serie(serie, datetime(2025, 3, 2), datetime(2025, 3, 5), "dia")
+    assert densa == [
+        (datetime(2025, 3, 2), 0.0, 0, 0),
+        (datetime(2025, 3, 3), 10.0, 1, 1),
+        (datetime(2025, 3, 4), 0.0, 0, 0),
+    ]
+    meses = rellenar_serie([], datetime(2025, 11, 10), datetime(2026, 2, 1), "mes")
+    assert [b for b, _, _, _ in meses] == [datetime(2025, 11, 1), datetime(2025, 12, 1), datetime(2026, 1, 1)]